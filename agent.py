@@ -0,0 +1,82 @@
+import os
+import threading
+
+# =========================================================================
+# AGENT FACTORY
+# Builds the model and the LangGraph agent the first time they are needed
+# and keeps the compiled graph for the rest of the session. The heavy
+# imports live inside the functions, so importing this module is cheap.
+# =========================================================================
+
+MODEL_NAME = "gemini-1.5-flash"
+FALLBACK_MODEL_NAME = "gemini-1.5-flash-8b"   # FALLBACK_MODEL=off in .env turns the fallback off
+
+_lock = threading.Lock()
+_agent = None
+llm_cache = None     # Set once the agent is built; None when caching is off
+tool_router = None   # Set once the agent is built
+gateway = None       # The ModelGateway in use, if any
+
+
+def build_agent(model=None):
+    """Creates the chat model (unless one is given) and compiles the agent graph with all the tools."""
+    global llm_cache, tool_router, gateway
+    from langgraph.prebuilt import create_react_agent
+
+    import assistant_tools
+    import conversation_memory
+    import model_gateway
+    import parallel_tools
+    import response_cache
+    import session
+    from tool_router import ToolRouter
+
+    # With temperature=0 the same conversation gets the same answer, so
+    # model responses are cached on disk and repeated prompts skip the API
+    # Calls to Gemini go through the gateway, which keeps them under the API
+    # quota and retries, hedges or falls back when the API is slow or failing
+    if model is None:
+        llm_cache = response_cache.make_llm_cache()
+        fallback_name = os.getenv("FALLBACK_MODEL", FALLBACK_MODEL_NAME)
+        if fallback_name.lower() in ("", "off", "none"):
+            fallback_name = None
+        model = model_gateway.make_gemini_gateway(MODEL_NAME, fallback_name, cache=llm_cache)
+    gateway = model if isinstance(model, model_gateway.ModelGateway) else None
+
+    # Each model call only sees the schemas of the tool groups that match
+    # the request; the tool node still knows every tool.
+    # Independent tool calls from one model message run in parallel.
+    # The checkpointer remembers earlier turns of this conversation and the
+    # memory hook keeps that history within a fixed token budget; its summary
+    # is saved with the session state, so the next conversation continues it.
+    tool_router = ToolRouter(assistant_tools.TOOL_GROUPS)
+    return create_react_agent(
+        tool_router.bind(model),
+        parallel_tools.make_tool_node(assistant_tools.TOOLS),
+        pre_model_hook=conversation_memory.make_memory_hook(
+            model, load_summary=session.load_conversation_summary, save_summary=session.save_conversation_summary),
+        checkpointer=conversation_memory.BoundedMemorySaver(),
+    ).with_config(max_concurrency=parallel_tools.max_parallel_tools())
+
+
+def get_agent():
+    """Returns the compiled agent, building it on the first call."""
+    global _agent
+    with _lock:
+        if _agent is None:
+            _agent = build_agent()
+        return _agent
+
+
+def cache_hits():
+    """Returns how many model responses and tool results were served from cache so far."""
+    import assistant_tools
+    return (llm_cache.hits if llm_cache else 0), assistant_tools.tool_result_cache.hits
+
+
+def preload():
+    """Builds the agent ahead of time; errors are raised again by get_agent()."""
+    try:
+        get_agent()
+    except Exception:
+        pass
@@ -0,0 +1,942 @@
+from langchain.tools import tool
+import os
+import math
+import time
+import datetime
+import shutil
+import random
+import calculator
+import file_index
+import file_organizer
+import file_reader
+import file_transfer
+import number_theory
+import numeric_stats
+import response_cache
+import shell_jobs
+import todo_store
+import tracing
+from session import (
+    session_memory, session_owner, shell_job_manager, timer_scheduler, format_shell_job,
+    save_todo_list, load_todo_list, format_todo_page,
+)
+
+# =========================================================================
+# TOOL REGISTRY
+# Every tool the assistant can use is defined once, at module level, and
+# collected in TOOLS at the bottom. Importing this module is the slow part
+# of startup (LangChain), so main.py only imports it in the background.
+# =========================================================================
+
+# Pure tools (same input, same answer) remember their recent results
+tool_result_cache = response_cache.ToolResultCache()
+
+# Name, size and modification time of the files under directories the assistant has searched
+file_metadata_index = file_index.FileIndex(os.getenv("FILE_INDEX_PATH", file_index.INDEX_PATH))
+INDEX_MAX_AGE = 60   # Seconds before find_files refreshes the index again
+
+# =========================================================================
+# MATH TOOLS SECTION
+# These tools help with various mathematical calculations
+# =========================================================================
+
+@tool
+@tool_result_cache.memoize
+def add(a: float, b: float) -> float:
+    """Adds two numbers."""
+    return f"The sum of {a} and {b} is {a + b}."
+
+@tool
+@tool_result_cache.memoize
+def subtract(a: float, b: float) -> float:
+    """Subtracts two numbers."""
+    return f"The difference of {a} and {b} is {a - b}."
+
+@tool
+@tool_result_cache.memoize
+def multiply(a: float, b: float) -> float:
+    """Multiplies two numbers."""
+    return f"The product of {a} and {b} is {a * b}."
+
+@tool
+@tool_result_cache.memoize
+def divide(a: float, b: float) -> float:
+    """Divides two numbers."""
+    if b == 0:
+        return "Error: Cannot divide by zero."
+    return f"The quotient of {a} and {b} is {a / b}."
+
+@tool
+@tool_result_cache.memoize
+def power(base: float, exponent: float) -> float:
+    """Calculates the power of a number."""
+    return f"The result of {base} raised to the power of {exponent} is {base ** exponent}."
+
+@tool
+@tool_result_cache.memoize
+def sqrt(number: float) -> float:
+    """Calculates the square root of a number."""
+    if number < 0:
+        return "Error: Cannot calculate the square root of a negative number."
+    return f"The square root of {number} is {math.sqrt(number)}."
+
+@tool
+@tool_result_cache.memoize
+def log(number: float, base: float = math.e) -> float:
+    """Calculates the logarithm of a number with a given base."""
+    if number <= 0:
+        return "Error: Cannot calculate the logarithm of a non-positive number."
+    return f"The logarithm of {number} with base {base} is {math.log(number, base)}."
+
+@tool
+@tool_result_cache.memoize
+def sin(angle: float) -> float:
+    """Calculates the sine of an angle in radians."""
+    return f"The sine of {angle} is {math.sin(angle)}."
+
+@tool
+@tool_result_cache.memoize
+def cos(angle: float) -> float:
+    """Calculates the cosine of an angle in radians."""
+    return f"The cosine of {angle} is {math.cos(angle)}."
+
+@tool
+@tool_result_cache.memoize
+def tan(angle: float) -> float:
+    """Calculates the tangent of an angle in radians."""
+    return f"The tangent of {angle} is {math.tan(angle)}."
+
+@tool
+@tool_result_cache.memoize
+def calculate(expression: str, variables: dict[str, float] | None = None) -> str:
+    """
+    Evaluates a whole math expression in a single step, e.g. "(3+4)*sqrt(9)/log(100, 10)".
+    Prefer this over the single-operation math tools when a question needs more than one step.
+    Supports + - * / // % ** (or ^), parentheses, the constants pi, e and tau, named variables,
+    and statements separated by ';' such as "r = 2; pi * r^2" or "v = [1, 2, 3]; mean(v)".
+    Lists like [1, 4, 9] are applied element-wise, e.g. sqrt([1, 4, 9]) or [1, 2] * 3.
+    Functions: sqrt, exp, log(x, base), log10, log2, pow, sin, cos, tan, asin, acos, atan, atan2,
+    sinh, cosh, tanh, degrees, radians, abs, floor, ceil, round, factorial, gcd, hypot,
+    sum, min, max, mean, len, prod. Angles are in radians.
+    """
+    try:
+        result = calculator.evaluate(expression, variables)
+    except calculator.CalculationError as e:
+        return f"Error: {str(e)}"
+    return f"{expression} = {result}"
+
+# =========================================================================
+# GENERAL PURPOSE TOOLS SECTION
+# These tools perform various general tasks
+# =========================================================================
+
+@tool
+@tool_result_cache.memoize
+def calculate_grade(score: float) -> str:
+    """Calculates the letter grade for a given score."""
+    return numeric_stats.grade_for(score)
+
+@tool
+@tool_result_cache.memoize
+def average(numbers: list[float]) -> float:
+    """Calculates the average of a list of numbers."""
+    if not numbers:
+        return "Error: Cannot average an empty list."
+    return f"The average of the {len(numbers)} numbers is {sum(numbers) / len(numbers)}."
+
+def _load_numbers(numbers, file_path, column="", binary_format=""):
+    """Returns (values, skipped) from inline text or from a file."""
+    if file_path:
+        return numeric_stats.load_file(file_path, column, binary_format)
+    return numeric_stats.parse_numbers(numbers)
+
+@tool
+def describe_numbers(numbers: str = "", file_path: str = "", column: str = "", binary_format: str = "",
+                     percentiles: str = "25, 50, 75, 90, 99", bins: int = 10) -> str:
+    """
+    Summarizes a set of numbers: count, mean, standard deviation, min, max, median,
+    percentiles and a histogram. Give either numbers (separated by commas or spaces)
+    or file_path. For CSV files, column is a header name or column number (default:
+    first numeric column). binary_format reads raw files: "float64", "float32",
+    "int64", "int32", "int16", "int8" or the "uint" versions. bins=0 skips the histogram.
+    Prefer this over average for more than a few numbers or for data in files.
+    """
+    try:
+        values, skipped = _load_numbers(numbers, file_path, column, binary_format)
+        wanted = [min(100.0, max(0.0, float(p))) for p in percentiles.replace(",", " ").split()]
+        summary = numeric_stats.describe(values, wanted, bins)
+    except (OSError, ValueError) as e:
+        return f"Error describing numbers: {str(e)}"
+
+    lines = [
+        f"Count: {summary['count']}" + (f" ({skipped} non-numeric values skipped)" if skipped else ""),
+        f"Mean: {summary['mean']:.10g}   Std dev: {summary['std']:.10g}   Sum: {summary['sum']:.10g}",
+        f"Min: {summary['min']:.10g}   Median: {summary['median']:.10g}   Max: {summary['max']:.10g}",
+        "Percentiles: " + ", ".join(f"p{p:g}={v:.10g}" for p, v in summary["percentiles"].items()),
+    ]
+    if summary["histogram"]:
+        lines.append("Histogram:")
+        lines += [f"  {low:.10g} to {high:.10g}: {count}" for low, high, count in summary["histogram"]]
+    return "\n".join(lines)
+
+@tool
+def grade_scores(scores: str = "", file_path: str = "", column: str = "") -> str:
+    """
+    Grades many scores at once with the same scale as calculate_grade. Give either
+    scores (separated by commas or spaces) or a file_path (CSV column by header name
+    or number, or a text file of numbers). Returns how many scores got each grade.
+    """
+    try:
+        values, skipped = _load_numbers(scores, file_path, column)
+    except (OSError, ValueError) as e:
+        return f"Error grading scores: {str(e)}"
+    if not values:
+        return "There are no scores to grade."
+
+    if len(values) <= 20:
+        lines = [f"{value:g}: {numeric_stats.grade_for(value)}" for value in values]
+    else:
+        counts = numeric_stats.grade_counts(values)
+        failed = counts[numeric_stats.FAIL_GRADE]
+        lines = [f"{grade}: {count}" for grade, count in counts.items()]
+        lines.append(f"Pass rate: {(len(values) - failed) / len(values):.1%} of {len(values)} scores")
+    if skipped:
+        lines.append(f"({skipped} non-numeric values skipped)")
+    return "\n".join(lines)
+
+@tool
+@tool_result_cache.memoize
+def is_prime(number: int) -> bool:
+    """Checks if a number is prime."""
+    try:
+        prime = number_theory.is_prime(number)
+    except number_theory.NumberTheoryError as e:
+        return f"Error: {str(e)}"
+    if not prime:
+        return f"{number} is not a prime number."
+    if number >= number_theory.DETERMINISTIC_LIMIT:
+        return f"{number} is a prime number (with overwhelming probability)."
+    return f"{number} is a prime number."
+
+MAX_BATCH_NUMBERS = 1000
+
+def _parse_integers(numbers):
+    """Reads whole numbers separated by commas (or spaces), allowing expressions like 2^61-1."""
+    items = numbers.split(",") if "," in numbers else numbers.split()
+    values = []
+    for item in items:
+        item = item.strip().replace("_", "")
+        if not item:
+            continue
+        value = int(item) if item.isdigit() else calculator.evaluate(item)
+        if not isinstance(value, int):
+            raise ValueError(f"{item} is not a whole number.")
+        values.append(value)
+    if len(values) > MAX_BATCH_NUMBERS:
+        raise ValueError(f"At most {MAX_BATCH_NUMBERS} numbers can be checked at once.")
+    return values
+
+@tool
+@tool_result_cache.memoize
+def check_primes(numbers: str) -> str:
+    """
+    Checks many numbers for primality at once. numbers: whole numbers separated by commas,
+    e.g. "97, 1000000007, 2^61-1". Pass them as text so long numbers keep every digit.
+    Exact for numbers below 3.3 * 10^24, with a vanishing error chance above.
+    """
+    try:
+        values = _parse_integers(numbers)
+        primes = [n for n in values if number_theory.is_prime(n)]
+    except (ValueError, calculator.CalculationError) as e:
+        return f"Error: {str(e)}"
+    if len(values) <= 20:
+        return "\n".join(f"{n}: {'prime' if n in primes else 'not prime'}" for n in values)
+    shown = ", ".join(str(n) for n in primes[:50])
+    return f"{len(primes)} of {len(values)} numbers are prime: {shown}{' ...' if len(primes) > 50 else ''}"
+
+@tool
+@tool_result_cache.memoize
+def find_primes(start: int, end: int, max_results: int = 50) -> str:
+    """
+    Finds the primes p with start <= p < end and counts all of them. Also use it to count
+    primes below N (start=0, end=N, max_results=0). Ranges up to 1,000,000,000 numbers wide;
+    above 10^14 up to 100,000 wide.
+    """
+    try:
+        primes, total = number_theory.primes_in_range(start, end, max(0, min(max_results, 1000)))
+    except number_theory.NumberTheoryError as e:
+        return f"Error: {str(e)}"
+    result = f"There are {total} primes from {start} up to (not including) {end}."
+    if primes:
+        result += f"\n{'First ' + str(len(primes)) if len(primes) < total else 'They are'}: " + ", ".join(map(str, primes))
+    return result
+
+@tool
+@tool_result_cache.memoize
+def factorize(numbers: str) -> str:
+    """
+    Finds the prime factors of one or more whole numbers, separated by commas,
+    e.g. "600851475143, 2^64+1". Pass them as text so long numbers keep every digit.
+    """
+    try:
+        values = _parse_integers(numbers)
+    except (ValueError, calculator.CalculationError) as e:
+        return f"Error: {str(e)}"
+    lines = []
+    for n in values:
+        try:
+            lines.append(f"{n} = {number_theory.format_factors(number_theory.factorize(n))}")
+        except number_theory.NumberTheoryError as e:
+            lines.append(f"{n}: {str(e)}")
+    return "\n".join(lines)
+
+# =========================================================================
+# FILE SYSTEM AUTOMATION TOOLS SECTION
+# These tools help automate file and directory operations
+# =========================================================================
+
+@tool
+def list_files(directory: str = ".") -> str:
+    """Lists all files and directories in a given directory."""
+    try:
+        return "\n".join(os.listdir(directory))
+    except Exception as e:
+        return str(e)
+
+@tool
+def read_file_content(filepath: str) -> str:
+    """
+    Reads the content of a file. Large files are cut off after the first part;
+    use read_file_lines, read_file_bytes, tail_file or search_file to see the rest.
+    """
+    try:
+        text, next_offset, size = file_reader.read_bytes(filepath)
+        if next_offset is None:
+            return text
+        return (f"{text}\n\n[Showing the first {next_offset} of {size} bytes. "
+                f"Continue with read_file_bytes(offset={next_offset}), or use read_file_lines, "
+                f"tail_file or search_file.]")
+    except Exception as e:
+        return str(e)
+
+@tool
+def read_file_lines(filepath: str, start_line: int = 1, num_lines: int = 100) -> str:
+    """Reads a range of lines from a file of any size. Line numbers start at 1."""
+    try:
+        lines, next_line = file_reader.read_lines(filepath, max(1, start_line), num_lines)
+        if not lines:
+            return f"{filepath} has fewer than {start_line} lines."
+        result = "\n".join(f"{number}: {text}" for number, text in lines)
+        if next_line is not None:
+            result += f"\n[More lines follow. Continue with start_line={next_line}.]"
+        return result
+    except Exception as e:
+        return f"Error reading lines: {str(e)}"
+
+@tool
+def read_file_bytes(filepath: str, offset: int = 0, length: int = file_reader.OUTPUT_BUDGET) -> str:
+    """Reads a range of bytes from a file of any size, starting at a byte offset."""
+    try:
+        text, next_offset, size = file_reader.read_bytes(filepath, max(0, offset), length)
+        if next_offset is None:
+            return f"{text}\n[End of file, {size} bytes in total.]"
+        return f"{text}\n[Read up to byte {next_offset} of {size}. Continue with offset={next_offset}.]"
+    except Exception as e:
+        return f"Error reading bytes: {str(e)}"
+
+@tool
+def tail_file(filepath: str, num_lines: int = 50) -> str:
+    """Shows the last lines of a file, like 'tail'. Works well on big log files."""
+    try:
+        return "\n".join(file_reader.tail(filepath, num_lines))
+    except Exception as e:
+        return f"Error reading end of file: {str(e)}"
+
+@tool
+def search_file(filepath: str, pattern: str, ignore_case: bool = False, start_offset: int = 0,
+                max_matches: int = 50, start_line: int = 0) -> str:
+    """
+    Searches a file of any size for lines matching a regular expression, like 'grep'.
+    Returns line numbers with the matching lines. If there are more matches,
+    the result says which start_offset and start_line to pass to continue the search.
+    """
+    try:
+        matches, next_offset, next_line = file_reader.search(filepath, pattern, ignore_case,
+                                                             max(0, start_offset), max_matches,
+                                                             start_line=max(0, start_line) or None)
+        if not matches:
+            return f"No lines in {filepath} match {pattern!r}."
+        result = "\n".join(f"{number}: {text}" for number, _, text in matches)
+        if next_offset is not None:
+            result += (f"\n[More matches may follow. Continue with start_offset={next_offset}, "
+                       f"start_line={next_line}.]")
+        return result
+    except Exception as e:
+        return f"Error searching file: {str(e)}"
+
+@tool
+def write_file_content(filepath: str, content: str) -> str:
+    """Writes content to a file."""
+    try:
+        with open(filepath, "w") as f:
+            f.write(content)
+        tracing.count("file_bytes_written", len(content.encode("utf-8")))
+        return f"Successfully wrote to {filepath}"
+    except Exception as e:
+        return str(e)
+
+@tool
+def create_directory(directory_path: str) -> str:
+    """Creates a new directory at the specified path."""
+    try:
+        os.makedirs(directory_path, exist_ok=True)
+        return f"Directory created successfully at {directory_path}"
+    except Exception as e:
+        return f"Error creating directory: {str(e)}"
+
+def _print_progress(label, unit):
+    """Returns an on_progress(done, total) callback that prints a progress line at most twice a second."""
+    last = [0.0]
+
+    def report(done, total):
+        now = time.monotonic()
+        if now - last[0] >= 0.5 or done == total:
+            last[0] = now
+            if unit == "bytes":
+                counts = f"{file_index.format_size(done)}/{file_index.format_size(total)}"
+            else:
+                counts = f"{done}/{total} {unit}"
+            print(f"\r{label}: {counts}", end="\n" if done == total else "", flush=True)
+
+    return report
+
+@tool
+def delete_file_or_directory(path: str) -> str:
+    """Deletes a file or directory at the specified path."""
+    try:
+        if os.path.isfile(path):
+            os.remove(path)
+            return f"File deleted: {path}"
+        elif os.path.isdir(path):
+            result = file_transfer.delete(path, on_progress=_print_progress("Deleting", "files"))
+            message = f"Directory deleted: {path} ({result['files']} files in {result['seconds']:.1f}s)"
+            if result["errors"]:
+                message += f"\n{len(result['errors'])} items could not be deleted, e.g. {result['errors'][0]}"
+            return message
+        else:
+            return f"Path not found: {path}"
+    except Exception as e:
+        return f"Error deleting: {str(e)}"
+
+@tool
+def copy_file_or_directory(source: str, destination: str, compare: str = "size_mtime") -> str:
+    """
+    Copies a file or directory from source to destination. Copying into an existing
+    directory updates it: files that already match are skipped, so repeating an
+    interrupted copy finishes it. compare: "size_mtime" (fast), "hash" (reads both
+    files) or "none" (copy everything).
+    """
+    try:
+        if not os.path.exists(source):
+            return f"Source not found: {source}"
+        result = file_transfer.copy(source, destination, compare,
+                                    on_progress=_print_progress("Copying", "bytes"))
+        tracing.count("file_bytes_written", result["bytes"])
+        kind = "Directory" if os.path.isdir(source) else "File"
+        speed = result["bytes"] / result["seconds"] if result["seconds"] else 0
+        message = (f"{kind} copied from {source} to {destination}: {result['copied']} files "
+                   f"({file_index.format_size(result['bytes'])}) copied, {result['skipped']} unchanged skipped, "
+                   f"in {result['seconds']:.1f}s ({file_index.format_size(speed)}/s)")
+        if result["errors"]:
+            message += f"\n{len(result['errors'])} files could not be copied, e.g. {result['errors'][0]}"
+        return message
+    except Exception as e:
+        return f"Error copying: {str(e)}"
+
+@tool
+def get_file_info(filepath: str) -> str:
+    """Gets information about a file (size, creation time, modification time)."""
+    try:
+        if not os.path.exists(filepath):
+            return f"File not found: {filepath}"
+
+        stat_info = os.stat(filepath)
+        size = stat_info.st_size
+        created = datetime.datetime.fromtimestamp(stat_info.st_ctime)
+        modified = datetime.datetime.fromtimestamp(stat_info.st_mtime)
+
+        return f"File: {filepath}\nSize: {size} bytes\nCreated: {created}\nModified: {modified}"
+    except Exception as e:
+        return f"Error getting file info: {str(e)}"
+
+@tool
+def index_directory(directory: str = ".", full_rescan: bool = False) -> str:
+    """
+    Indexes the files under a directory (recursively) so find_files can answer quickly.
+    Later calls only re-read folders that changed. Use full_rescan=True to also catch
+    files that were edited in place.
+    """
+    try:
+        result = file_metadata_index.refresh(directory, full=full_rescan)
+        return (f"Indexed {result['files']} files ({file_index.format_size(result['size'])}) in "
+                f"{result['directories']} folders under {result['root']} in {result['seconds']:.2f}s; "
+                f"{result['listed']} folders were read again, {result['removed']} removed, "
+                f"{result['errors']} could not be read.")
+    except Exception as e:
+        return f"Error indexing directory: {str(e)}"
+
+@tool
+def find_files(directory: str = ".", name_glob: str = "", extension: str = "", min_size: str = "",
+               max_size: str = "", modified_after: str = "", modified_before: str = "",
+               sort_by: str = "size", descending: bool = True, limit: int = 20, group_by: str = "") -> str:
+    """
+    Searches all files under a directory (recursively) using the file index.
+    name_glob: a pattern like "*.log" or "report_*" (case-sensitive).
+    min_size / max_size: sizes like "500KB", "10MB" or "2GB".
+    modified_after / modified_before: "today", "yesterday" or dates like "2025-01-31" or "2025-01-31 14:00".
+    sort_by: "size", "modified" or "name". Always reports the number and total size of all matches.
+    group_by: "extension" or "directory" to get totals per group instead of single files.
+    """
+    try:
+        refreshed = file_metadata_index.last_refresh(directory)
+        if refreshed is None or time.time() - refreshed > INDEX_MAX_AGE:
+            file_metadata_index.refresh(directory)
+
+        filters = dict(name_glob=name_glob, extension=extension, min_size=min_size, max_size=max_size,
+                       modified_after=modified_after, modified_before=modified_before)
+        limit = max(1, min(limit, 100))
+        if group_by:
+            groups = file_metadata_index.summarize(directory, group_by, limit, **filters)
+            if not groups:
+                return "No files match."
+            return "\n".join(f"{group or '(no extension)'}: {count} files, {file_index.format_size(size)}"
+                             for group, count, size in groups)
+
+        files, count, total = file_metadata_index.query(directory, sort_by=sort_by, descending=descending,
+                                                        limit=limit, **filters)
+        if not files:
+            return "No files match."
+        lines = [f"{count} files match, {file_index.format_size(total)} in total. Showing {len(files)}:"]
+        for path, size, mtime in files:
+            modified = datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+            lines.append(f"{path}  {file_index.format_size(size)}  modified {modified}")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error finding files: {str(e)}"
+
+# =========================================================================
+# SYSTEM INFORMATION TOOLS SECTION
+# These tools provide information about the system
+# =========================================================================
+
+@tool
+def get_system_info() -> str:
+    """Gets basic system information (platform, processor, etc.)."""
+    try:
+        platform_info = os.uname()
+        return f"System: {platform_info.sysname}\nNode: {platform_info.nodename}\nRelease: {platform_info.release}\nVersion: {platform_info.version}\nMachine: {platform_info.machine}"
+    except:
+        return f"Platform: {os.name}\nSystem info not available on this platform"
+
+@tool
+def get_disk_usage() -> str:
+    """Gets disk usage information."""
+    try:
+        disk_usage = shutil.disk_usage("/")
+        return f"Total: {disk_usage.total // (2**30)} GB\nUsed: {disk_usage.used // (2**30)} GB\nFree: {disk_usage.free // (2**30)} GB"
+    except Exception as e:
+        return f"Error getting disk usage: {str(e)}"
+
+@tool
+def get_current_datetime() -> str:
+    """Gets the current date and time."""
+    now = datetime.datetime.now()
+    return f"Current date and time: {now.strftime('%Y-%m-%d %H:%M:%S')}"
+
+# =========================================================================
+# PROCESS AUTOMATION TOOLS SECTION
+# These tools help automate various processes
+# =========================================================================
+
+@tool
+def run_shell_command(command: str, timeout: int = 300, wait_seconds: int = 30) -> str:
+    """
+    Executes a shell command and returns its exit code, stdout and stderr.
+    The command is stopped after `timeout` seconds. If it is still running after
+    `wait_seconds`, it keeps running as a background job; check on it with
+    check_background_command.
+    WARNING: This tool can execute any shell command and can be dangerous. Use with extreme caution.
+    """
+    try:
+        job = shell_job_manager.start(command, timeout, owner=session_owner())
+        shell_job_manager.wait(job, min(wait_seconds, timeout))
+        return format_shell_job(job)
+    except Exception as e:
+        return str(e)
+
+@tool
+def start_background_command(command: str, timeout: int = 3600) -> str:
+    """
+    Starts a long-running shell command (builds, downloads, ...) in the background
+    and returns a job ID right away. Several jobs can run at the same time.
+    WARNING: This tool can execute any shell command and can be dangerous. Use with extreme caution.
+    """
+    try:
+        job = shell_job_manager.start(command, timeout, owner=session_owner())
+        return f"Started background job #{job.id}: {command}"
+    except Exception as e:
+        return str(e)
+
+@tool
+def check_background_command(job_id: int) -> str:
+    """Shows the status of a background job and the output it produced since the last check."""
+    job = shell_job_manager.get(job_id, owner=session_owner())
+    if job is None:
+        return f"There is no background job #{job_id}."
+    return format_shell_job(job)
+
+@tool
+def cancel_background_command(job_id: int) -> str:
+    """Stops a running background job."""
+    job = shell_job_manager.cancel(job_id, owner=session_owner())
+    if job is None:
+        return f"There is no background job #{job_id}."
+    if shell_job_manager.wait(job, shell_jobs.KILL_GRACE_SECONDS * 2 + 1):
+        return f"Job #{job_id} stopped ({job.status})."
+    return f"Asked job #{job_id} to stop."
+
+@tool
+def list_background_commands() -> str:
+    """Lists the shell jobs started in this session and their status."""
+    jobs = shell_job_manager.owned(session_owner())
+    if not jobs:
+        return "No background jobs have been started."
+    lines = []
+    for job in jobs:
+        exit_code = f", exit code {job.returncode}" if job.returncode is not None else ""
+        lines.append(f"#{job.id} [{job.status}{exit_code}, {job.elapsed():.0f}s] {job.command}")
+    return "\n".join(lines)
+
+@tool
+def countdown_timer(seconds: int, label: str = "") -> str:
+    """
+    Starts a countdown timer for the specified number of seconds.
+    Returns right away; a notification is shown when the time is up.
+    """
+    try:
+        message = label or f"Your {seconds}-second timer is up!"
+        timer = timer_scheduler.add(time.time() + seconds, message, owner=session_owner())
+        return f"Timer #{timer['id']} set for {seconds} seconds."
+    except Exception as e:
+        return f"Error with timer: {str(e)}"
+
+@tool
+def set_reminder(message: str = "", at: str = "", in_minutes: float = 0, todo_id: int = 0) -> str:
+    """
+    Sets a reminder that is shown at a given time, even after the assistant restarts.
+    at: a date and time like "2025-01-31 14:30"; or use in_minutes instead.
+    todo_id: optionally ties the reminder to a to-do item; it is skipped if the item is done by then.
+    """
+    try:
+        if at:
+            due = datetime.datetime.strptime(at, "%Y-%m-%d %H:%M").timestamp()
+        elif in_minutes > 0:
+            due = time.time() + in_minutes * 60
+        else:
+            return "Please say when to remind you, either with 'at' or 'in_minutes'."
+        if todo_id:
+            item = session_memory["todo_list"].get(todo_id)
+            if item is None:
+                return f"There is no to-do item #{todo_id}."
+            message = message or f"To-do: {item['task']}"
+        if not message:
+            return "Please say what to remind you about."
+        timer = timer_scheduler.add(due, message, kind="reminder", todo_id=todo_id or None, owner=session_owner())
+        when = datetime.datetime.fromtimestamp(due).strftime("%Y-%m-%d %H:%M")
+        return f"Reminder #{timer['id']} set for {when}: {message}"
+    except ValueError:
+        return "Invalid time. Please use the format YYYY-MM-DD HH:MM."
+    except Exception as e:
+        return f"Error setting reminder: {str(e)}"
+
+@tool
+def list_timers() -> str:
+    """Lists the pending timers and reminders."""
+    timers = timer_scheduler.pending(session_owner())
+    if not timers:
+        return "There are no pending timers or reminders."
+    lines = []
+    for timer in timers[:todo_store.MAX_PAGE_SIZE]:
+        when = datetime.datetime.fromtimestamp(timer["due"]).strftime("%Y-%m-%d %H:%M:%S")
+        lines.append(f"#{timer['id']} {timer['kind']} at {when}: {timer['message']}")
+    if len(timers) > todo_store.MAX_PAGE_SIZE:
+        lines.append(f"... and {len(timers) - todo_store.MAX_PAGE_SIZE} more.")
+    return "\n".join(lines)
+
+@tool
+def cancel_timer(timer_id: int) -> str:
+    """Cancels a pending timer or reminder."""
+    timer = timer_scheduler.cancel(timer_id, owner=session_owner())
+    if timer is None:
+        return f"There is no pending timer or reminder #{timer_id}."
+    return f"Cancelled {timer['kind']} #{timer_id}: {timer['message']}"
+
+@tool
+def create_notes_file(filename: str, content: str) -> str:
+    """Creates a notes file with the given content in a notes directory."""
+    try:
+        # Create notes directory if it doesn't exist
+        notes_dir = "notes"
+        if not os.path.exists(notes_dir):
+            os.makedirs(notes_dir)
+
+        # Create the file
+        filepath = os.path.join(notes_dir, filename)
+        with open(filepath, "w") as f:
+            f.write(content)
+
+        return f"Notes file created successfully at {filepath}"
+    except Exception as e:
+        return f"Error creating notes file: {str(e)}"
+
+def _format_organize_summary(summary):
+    groups = sorted(summary["groups"].items(), key=lambda item: -item[1])
+    lines = [f"{count} files -> {group}/" for group, count in groups[:20]]
+    if len(groups) > 20:
+        lines.append(f"... and {len(groups) - 20} more folders")
+    if summary["dry_run"]:
+        header = f"Plan for {summary['directory']} (by {summary['rule']}): {summary['planned']} files to move."
+        examples = [f"  {source} -> {destination}" for source, destination in summary["examples"]]
+        return "\n".join([header] + lines + (["Examples:"] + examples if examples else []))
+    header = (f"Organized {summary['moved']} files by {summary['rule']} in {summary['directory']} "
+              f"in {summary['seconds']:.1f}s")
+    if summary["resumed"]:
+        header += " (finished an interrupted run)"
+    if summary["skipped"]:
+        header += f"; {summary['skipped']} were already moved or gone"
+    lines.insert(0, header + ".")
+    if summary["errors"]:
+        lines.append(f"{len(summary['errors'])} files could not be moved, e.g. {summary['errors'][0]}")
+    return "\n".join(lines)
+
+@tool
+def organize_files_by_extension(directory: str = ".") -> str:
+    """Organizes files in a directory into folders based on their extensions."""
+    try:
+        summary = file_organizer.organize(directory, "extension", on_progress=_print_progress("Organizing", "files"))
+        return _format_organize_summary(summary)
+    except Exception as e:
+        return f"Error organizing files: {str(e)}"
+
+@tool
+def organize_files(directory: str = ".", group_by: str = "extension", recursive: bool = False,
+                   dry_run: bool = False) -> str:
+    """Sorts files into folders by "extension", "date" (month modified) or "size".
+
+    recursive=True also gathers files from subdirectories. Use dry_run=True to see
+    the plan first. An interrupted run is finished the next time it is called.
+    """
+    try:
+        summary = file_organizer.organize(directory, group_by, recursive, dry_run,
+                                          on_progress=_print_progress("Organizing", "files"))
+        return _format_organize_summary(summary)
+    except Exception as e:
+        return f"Error organizing files: {str(e)}"
+
+# =========================================================================
+# MEMORY AND PERSONALIZATION TOOLS
+# These tools help the assistant remember things about the user
+# =========================================================================
+
+@tool
+def remember_name(name: str) -> str:
+    """Remembers the assistant's name, also after a restart."""
+    global session_memory
+    session_memory["assistant_name"] = name
+    if session_memory["state"] is not None:
+        session_memory["state"]["assistant_name"] = name
+    return f"I'll remember that my name is {name}."
+
+@tool
+def get_remembered_name() -> str:
+    """Retrieves the name the user wants to call the assistant."""
+    global session_memory
+    return f"You asked me to remember that my name is {session_memory['assistant_name']}."
+
+@tool
+def add_todo_item(task: str) -> str:
+    """Adds an item to the to-do list."""
+    global session_memory
+    # The store adds a timestamp and writes the change to disk right away
+    item = session_memory["todo_list"].add(task)
+
+    return f"Added '{task}' to your to-do list as item #{item['id']}. You now have {len(session_memory['todo_list'])} items."
+
+@tool
+def show_todo_list(cursor: str = "") -> str:
+    """
+    Shows the to-do list one page at a time, with the item ID of each one.
+    If there are more items, pass the returned cursor to see the next page.
+    Use query_todo_list to filter, search or sort the list.
+    """
+    global session_memory
+    if not session_memory["todo_list"]:
+        return "Your to-do list is empty!"
+
+    return format_todo_page(cursor=cursor)
+
+@tool
+def query_todo_list(status: str = "all", search: str = "", added_from: str = "", added_to: str = "",
+                    sort_by: str = "id", descending: bool = False, cursor: str = "",
+                    limit: int = todo_store.DEFAULT_PAGE_SIZE) -> str:
+    """
+    Finds to-do items and returns one page of results.
+    status: "all", "open" or "completed".
+    search: words that must all appear in the task (partial words match too).
+    added_from / added_to: dates like "2025-01-31" or "2025-01-31 14:00" (both inclusive).
+    sort_by: "id", "added", "task" or "completed_at".
+    cursor: the value returned with the previous page, to get the next one.
+    """
+    return format_todo_page(status, search, added_from, added_to, sort_by, descending, cursor, limit)
+
+@tool
+def complete_todo_item(item_id: int) -> str:
+    """Marks a to-do item as completed. Takes the item ID shown by show_todo_list."""
+    global session_memory
+    item = session_memory["todo_list"].complete(item_id)
+    if item is None:
+        return f"There is no to-do item #{item_id}."
+
+    return f"Marked '{item['task']}' as completed at {item['completed_at']}."
+
+@tool
+def delete_todo_item(item_id: int) -> str:
+    """Deletes an item from the to-do list. Takes the item ID shown by show_todo_list."""
+    global session_memory
+    removed_task = session_memory["todo_list"].delete(item_id)
+    if removed_task is None:
+        return f"There is no to-do item #{item_id}."
+
+    return f"Removed '{removed_task['task']}' from your to-do list."
+
+@tool
+def clear_todo_list() -> str:
+    """Clears all items from the to-do list."""
+    global session_memory
+    count = session_memory["todo_list"].clear()
+
+    return f"Cleared all {count} items from your to-do list."
+
+@tool
+def save_todo_list_tool() -> str:
+    """Compacts the saved to-do list into a single snapshot (changes are saved automatically)."""
+    save_todo_list()
+    return "To-do list saved to file."
+
+@tool
+def load_todo_list_tool() -> str:
+    """Loads the to-do list from a file (manually triggered)."""
+    return load_todo_list()
+
+@tool
+def remember_preference(key: str, value: str) -> str:
+    """Remembers a user preference, also after a restart."""
+    global session_memory
+    session_memory["user_preferences"][key] = value
+    return f"I'll remember that you prefer {key} = {value}."
+
+@tool
+def get_preference(key: str) -> str:
+    """Retrieves a remembered user preference."""
+    global session_memory
+    if key in session_memory["user_preferences"]:
+        return f"You prefer {key} = {session_memory['user_preferences'][key]}."
+    else:
+        return f"I don't remember any preference for {key}."
+
+# =========================================================================
+# COOL AUTOMATION TOOLS
+# These tools do something fun or interesting
+# =========================================================================
+
+@tool
+def tell_joke() -> str:
+    """Tells a random joke."""
+    jokes = [
+        "Why don't scientists trust atoms? Because they make up everything!",
+        "Why did the scarecrow win an award? Because he was outstanding in his field!",
+        "What do you call a fake noodle? An impasta!",
+        "How does a penguin build its house? Igloos it together!",
+        "Why did the math book look so sad? Because it had too many problems!"
+    ]
+    return random.choice(jokes)
+
+@tool
+def random_advice() -> str:
+    """Gives random advice."""
+    advice_list = [
+        "Take breaks when working long hours. Your productivity will thank you.",
+        "Drink more water! It's good for your health and concentration.",
+        "Don't forget to back up your important files regularly.",
+        "A 5-minute walk outside can refresh your mind more than you think.",
+        "Learn something new every day, even if it's small."
+    ]
+    return random.choice(advice_list)
+
+@tool
+def motivational_quote() -> str:
+    """Shares a motivational quote."""
+    quotes = [
+        "The only way to do great work is to love what you do. - Steve Jobs",
+        "It always seems impossible until it's done. - Nelson Mandela",
+        "Don't count the days, make the days count. - Muhammad Ali",
+        "Quality is not an act, it is a habit. - Aristotle",
+        "The future belongs to those who believe in the beauty of their dreams. - Eleanor Roosevelt"
+    ]
+    return random.choice(quotes)
+
+@tool
+def roll_dice(sides: int = 6) -> str:
+    """Rolls a dice with the specified number of sides."""
+    result = random.randint(1, sides)
+    return f"You rolled a {result} on a {sides}-sided die!"
+
+# =========================================================================
+# TOOLS LIST
+# Add all tools to a group so the agent can use them. The groups follow the
+# sections above; the tool router picks the groups each message needs.
+# =========================================================================
+
+TOOL_GROUPS = {
+    "math": [
+        calculate, add, subtract, multiply, divide, power, sqrt, log, sin, cos, tan,
+    ],
+    "general": [
+        calculate_grade, average, describe_numbers, grade_scores,
+        is_prime, check_primes, find_primes, factorize,
+    ],
+    "files": [
+        list_files, read_file_content, read_file_lines, read_file_bytes, tail_file, search_file,
+        write_file_content, create_directory,
+        delete_file_or_directory, copy_file_or_directory, get_file_info, index_directory, find_files,
+    ],
+    "system": [
+        get_system_info, get_disk_usage, get_current_datetime,
+    ],
+    "process": [
+        run_shell_command, start_background_command, check_background_command,
+        cancel_background_command, list_background_commands, countdown_timer, set_reminder,
+        list_timers, cancel_timer, create_notes_file, organize_files_by_extension,
+        organize_files,
+    ],
+    "memory": [
+        remember_name, get_remembered_name, add_todo_item, show_todo_list,
+        query_todo_list, complete_todo_item, delete_todo_item, clear_todo_list, save_todo_list_tool,
+        load_todo_list_tool, remember_preference, get_preference,
+    ],
+    "fun": [
+        tell_joke, random_advice, motivational_quote, roll_dice,
+    ],
+}
+
+TOOLS = [tool for group in TOOL_GROUPS.values() for tool in group]
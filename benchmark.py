@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import contextvars
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import agent
+import benchmark_suites
+import console
+import parallel_tools
+import state_store
+import todo_store
+import tracing
+from persistence import Journal
+from session import new_session_memory, session_memory, shell_job_manager
+
+# =========================================================================
+# BENCHMARK
+# Replays recorded conversations through the real agent graph (tool
+# router, parallel tool node, memory hook, checkpointer and real tools)
+# with ReplayChatModel standing in for Gemini, so the assistant's own speed
+# can be measured without API calls and compared between versions. Turns
+# go through console.stream_turn on one event loop, as in the chat loop. Each
+# scenario runs a few times in a scratch directory with its own session
+# memory; the results are appended to benchmarks.jsonl and compared with
+# the previous run that used the same settings. --suite runs one of the
+# component benchmarks of benchmark_suites.py instead.
+# =========================================================================
+
+RESULTS_PATH = "benchmarks.jsonl"
+DEFAULT_REPEAT = 5             # Timed runs of every scenario
+DEFAULT_LATENCY = 0.0          # Seconds before the replayed model's first token
+LOG_LINES = 20000              # Size of the log file used by the file scenario
+
+# Each scenario is a recorded conversation: for every user message, the
+# replies the model gave, tool calls included. {workdir} is replaced by the
+# scratch directory of the run.
+SCENARIOS = {
+    "math": [
+        {"user": "What is 17 * 23, and is the result prime?", "replies": [
+            {"tool_calls": [{"name": "multiply", "args": {"a": 17, "b": 23}}]},
+            {"tool_calls": [{"name": "is_prime", "args": {"number": 391}}]},
+            {"content": "17 * 23 = 391, which is not prime (it is 17 × 23)."},
+        ]},
+        {"user": "Factorize 2^61-1 and 600851475143, and evaluate sqrt(2) * pi.", "replies": [
+            {"tool_calls": [{"name": "factorize", "args": {"numbers": "2^61-1, 600851475143"}},
+                            {"name": "calculate", "args": {"expression": "sqrt(2) * pi"}}]},
+            {"content": "2^61-1 is prime; 600851475143 = 71 × 839 × 1471 × 6857. sqrt(2) * pi is about 4.4429."},
+        ]},
+        {"user": "Describe these scores: 88 92 75 64 99 81 77 90 85 70", "replies": [
+            {"tool_calls": [{"name": "describe_numbers", "args": {"numbers": "88 92 75 64 99 81 77 90 85 70"}},
+                            {"name": "grade_scores", "args": {"scores": "88 92 75 64 99 81 77 90 85 70"}}]},
+            {"content": "The mean is 82.1 with a median of 83; most scores are Bs."},
+        ]},
+    ],
+    # The same questions answered with the single-operation tools, and with
+    # one calculate call each, to compare model steps and latency
+    "formulas-steps": [
+        {"user": "What is (3 + 4) * sqrt(9) / log(100, 10)?", "replies": [
+            {"tool_calls": [{"name": "add", "args": {"a": 3, "b": 4}},
+                            {"name": "sqrt", "args": {"number": 9}},
+                            {"name": "log", "args": {"number": 100, "base": 10}}]},
+            {"tool_calls": [{"name": "multiply", "args": {"a": 7, "b": 3}}]},
+            {"tool_calls": [{"name": "divide", "args": {"a": 21, "b": 2}}]},
+            {"content": "(3 + 4) * sqrt(9) / log(100, 10) = 10.5"},
+        ]},
+        {"user": "What does 2500 become after 3 years at 12% a year?", "replies": [
+            {"tool_calls": [{"name": "power", "args": {"base": 1.12, "exponent": 3}}]},
+            {"tool_calls": [{"name": "multiply", "args": {"a": 2500, "b": 1.404928}}]},
+            {"content": "It grows to 3512.32."},
+        ]},
+        {"user": "How long is the hypotenuse of a right triangle with sides 5 and 12?", "replies": [
+            {"tool_calls": [{"name": "power", "args": {"base": 5, "exponent": 2}},
+                            {"name": "power", "args": {"base": 12, "exponent": 2}}]},
+            {"tool_calls": [{"name": "add", "args": {"a": 25, "b": 144}}]},
+            {"tool_calls": [{"name": "sqrt", "args": {"number": 169}}]},
+            {"content": "The hypotenuse is 13."},
+        ]},
+    ],
+    "formulas-calculate": [
+        {"user": "What is (3 + 4) * sqrt(9) / log(100, 10)?", "replies": [
+            {"tool_calls": [{"name": "calculate", "args": {"expression": "(3 + 4) * sqrt(9) / log(100, 10)"}}]},
+            {"content": "(3 + 4) * sqrt(9) / log(100, 10) = 10.5"},
+        ]},
+        {"user": "What does 2500 become after 3 years at 12% a year?", "replies": [
+            {"tool_calls": [{"name": "calculate", "args": {"expression": "2500 * 1.12^3"}}]},
+            {"content": "It grows to 3512.32."},
+        ]},
+        {"user": "How long is the hypotenuse of a right triangle with sides 5 and 12?", "replies": [
+            {"tool_calls": [{"name": "calculate", "args": {"expression": "sqrt(5^2 + 12^2)"}}]},
+            {"content": "The hypotenuse is 13."},
+        ]},
+    ],
+    "todo": [
+        # One add per reply: adds in the same batch run in parallel, so their IDs would vary
+        {"user": "Add buy milk, call the bank and book flights to my to-do list.", "replies": [
+            {"tool_calls": [{"name": "add_todo_item", "args": {"task": "buy milk"}}]},
+            {"tool_calls": [{"name": "add_todo_item", "args": {"task": "call the bank"}}]},
+            {"tool_calls": [{"name": "add_todo_item", "args": {"task": "book flights"}}]},
+            {"content": "Added three items to your to-do list."},
+        ]},
+        {"user": "I called the bank. What is left?", "replies": [
+            {"tool_calls": [{"name": "complete_todo_item", "args": {"item_id": 2}}]},
+            {"tool_calls": [{"name": "query_todo_list", "args": {"status": "open"}}]},
+            {"content": "Done! Still open: buy milk and book flights."},
+        ]},
+        {"user": "Show my whole list, then delete the milk item.", "replies": [
+            {"tool_calls": [{"name": "show_todo_list", "args": {}}]},
+            {"tool_calls": [{"name": "delete_todo_item", "args": {"item_id": 1}}]},
+            {"content": "Here is your list; buy milk has been removed."},
+        ]},
+    ],
+    "files": [
+        {"user": "What is in {workdir}?", "replies": [
+            {"tool_calls": [{"name": "list_files", "args": {"directory": "{workdir}"}}]},
+            {"content": "It holds server.log, scores.csv and notes.txt."},
+        ]},
+        {"user": "Find the errors in {workdir}/server.log and show me its end.", "replies": [
+            {"tool_calls": [{"name": "search_file", "args": {"filepath": "{workdir}/server.log", "pattern": "ERROR"}},
+                            {"name": "tail_file", "args": {"filepath": "{workdir}/server.log", "num_lines": 20}}]},
+            {"tool_calls": [{"name": "read_file_lines",
+                             "args": {"filepath": "{workdir}/server.log", "start_line": 1000, "num_lines": 50}}]},
+            {"content": "There are errors every 1000 lines; the log ends with a normal request."},
+        ]},
+        {"user": "Summarise {workdir}/scores.csv and back up the notes.", "replies": [
+            {"tool_calls": [{"name": "describe_numbers", "args": {"file_path": "{workdir}/scores.csv", "column": "score"}},
+                            {"name": "copy_file_or_directory",
+                             "args": {"source": "{workdir}/notes.txt", "destination": "{workdir}/notes-backup.txt"}}]},
+            {"tool_calls": [{"name": "write_file_content",
+                             "args": {"filepath": "{workdir}/summary.txt", "content": "Scores summarised."}},
+                            {"name": "get_file_info", "args": {"filepath": "{workdir}/notes-backup.txt"}}]},
+            {"content": "The scores average about 75, and notes.txt is backed up."},
+        ]},
+    ],
+    "shell": [
+        {"user": "Run echo hello in the shell.", "replies": [
+            {"tool_calls": [{"name": "run_shell_command", "args": {"command": "echo hello"}}]},
+            {"content": "The command printed hello."},
+        ]},
+        {"user": "Count the lines of the log and list the folder, both in the shell.", "replies": [
+            {"tool_calls": [{"name": "run_shell_command", "args": {"command": "wc -l {workdir}/server.log"}},
+                            {"name": "run_shell_command", "args": {"command": "ls -l {workdir}"}}]},
+            {"content": f"The log has {LOG_LINES} lines."},
+        ]},
+        {"user": "Start a short background job and check on it.", "replies": [
+            {"tool_calls": [{"name": "start_background_command", "args": {"command": "sleep 0.05 && echo done"}}]},
+            {"tool_calls": [{"name": "list_background_commands", "args": {}}]},
+            {"content": "The job is running in the background."},
+        ]},
+    ],
+}
+
+
+def _fill(value, workdir):
+    """Replaces {workdir} in every string of a recorded message or tool call."""
+    if isinstance(value, str):
+        return value.replace("{workdir}", workdir)
+    if isinstance(value, list):
+        return [_fill(item, workdir) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, workdir) for key, item in value.items()}
+    return value
+
+
+def _prepare_workdir(workdir):
+    """Creates the files the file and shell scenarios work on."""
+    os.makedirs(workdir)
+    with open(os.path.join(workdir, "server.log"), "w") as f:
+        for i in range(1, LOG_LINES + 1):
+            level = "ERROR" if i % 1000 == 0 else "INFO"
+            f.write(f"2025-01-01 12:{i // 60 % 60:02d}:{i % 60:02d} {level} request {i} served in {i % 97} ms\n")
+    with open(os.path.join(workdir, "scores.csv"), "w") as f:
+        f.write("name,score\n")
+        for i in range(2000):
+            f.write(f"student{i},{50 + (i * 37) % 50}\n")
+    with open(os.path.join(workdir, "notes.txt"), "w") as f:
+        f.write("Benchmark notes.\n" * 100)
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Benchmark:
+    """Replays the scenarios through one agent and measures every turn."""
+
+    def __init__(self, scenarios, latency=DEFAULT_LATENCY):
+        import fake_model
+        import model_gateway
+
+        self.scenarios = scenarios
+        self.root = tempfile.mkdtemp(prefix="assistant-benchmark-")
+        self.runs = 0
+        self.model = fake_model.ReplayChatModel(latency=latency)
+        # Through the gateway like Gemini, but without rate limits or hedging, so runs are repeatable
+        limiter = model_gateway.RateLimiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_concurrent=8)
+        self.agent_executor = agent.build_agent(
+            model_gateway.ModelGateway(primary=self.model, limiter=limiter, hedge_after=0))
+        self.runner = asyncio.Runner()
+        parallel_tools.use_tool_threads(self.runner.get_loop())
+
+    def close(self):
+        self.runner.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run(self, name):
+        """Runs a scenario once in a fresh directory and session. Returns one dict per turn."""
+        import assistant_tools
+
+        self.runs += 1
+        workdir = os.path.join(self.root, f"{name}-{self.runs}")
+        _prepare_workdir(workdir)
+        # The recorded messages name the scratch directory, so the script is set per run
+        turns = _fill(self.scenarios[name], workdir)
+        self.model.script.clear()
+        self.model.script.update((turn["user"], turn["replies"]) for turn in turns)
+        assistant_tools.tool_result_cache.clear()    # Every run does the same work
+
+        # Saved state goes to the same kind of store the chat loop uses, in the scratch directory
+        state = state_store.StateStore(os.path.join(workdir, "state.sqlite"))
+        todo_list = todo_store.TodoStore(os.path.join(workdir, "todo.journal"),
+                                         legacy_path=os.path.join(workdir, "todo.json"),
+                                         state=state.namespace("user:benchmark"))
+        todo_list.load()
+        memory = new_session_memory(todo_list, todo_list.state)
+        try:
+            with session_memory.use(memory):
+                return [self._run_turn(turn["user"], memory["thread_id"]) for turn in turns]
+        finally:
+            todo_list.close()
+            state.close()
+            self.agent_executor.checkpointer.delete_thread(memory["thread_id"])
+
+    def _run_turn(self, message, thread_id):
+        # A tracer per turn gives this turn's model calls and tool times
+        tracer = tracing.Tracer(mode="stats")
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        # The answer is streamed like in the chat loop, into a buffer instead of the terminal.
+        # The runner keeps the context it was created in, so the session memory is passed along.
+        self.runner.run(console.stream_turn(
+            self.agent_executor, message,
+            {"configurable": {"thread_id": thread_id}, "callbacks": tracer.callbacks()},
+            output=io.StringIO(),
+        ), context=contextvars.copy_context())
+        seconds = time.perf_counter() - started
+        return {
+            "seconds": seconds,
+            "steps": tracer.totals["model calls"],
+            "tool_seconds": sum(sum(samples) for name, samples in tracer.durations.items() if name.startswith("tool ")),
+            "peak_bytes": tracemalloc.get_traced_memory()[1] - memory_before,
+        }
+
+    def peak_memory(self, name):
+        """The most memory Python allocated during any one turn of the scenario, in bytes.
+
+        Measured in a separate run, since tracemalloc slows everything down.
+        """
+        tracemalloc.start()
+        try:
+            return max(turn["peak_bytes"] for turn in self.run(name))
+        finally:
+            tracemalloc.stop()
+
+    def measure(self, name, repeat, warmup=1):
+        """Runs a scenario repeat times after a warm-up run and summarises its turns."""
+        for _ in range(warmup):
+            self.run(name)
+        turns = [turn for _ in range(repeat) for turn in self.run(name)]
+        latencies = sorted(turn["seconds"] for turn in turns)
+        return {
+            "turns": len(turns),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "steps_per_turn": round(statistics.fmean(turn["steps"] for turn in turns), 2),
+            "tool_ms_per_turn": round(statistics.fmean(turn["tool_seconds"] for turn in turns) * 1000, 2),
+            "peak_memory_kb": round(self.peak_memory(name) / 1024, 1),
+        }
+
+
+def _find_baseline(records, settings, baseline=None):
+    """The latest earlier run with the same settings (or the given label or commit)."""
+    for record in reversed(records):
+        if baseline is not None:
+            if baseline in (record.get("label"), record.get("commit")):
+                return record
+        elif record.get("settings") == settings:
+            return record
+    return None
+
+
+def _change(new, old):
+    if not old:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def format_results(results, baseline=None):
+    """A table of the results, with the change against the baseline run when there is one."""
+    lines = [f"{'Scenario':<20}{'turns':>6}{'p50':>11}{'p95':>11}{'steps':>7}{'tools':>11}{'peak mem':>11}"
+             + ("   vs baseline (p50, memory)" if baseline else "")]
+    for name, result in results.items():
+        line = (f"{name:<20}{result['turns']:>6}{result['p50_ms']:>8.1f} ms{result['p95_ms']:>8.1f} ms"
+                f"{result['steps_per_turn']:>7.1f}{result['tool_ms_per_turn']:>8.1f} ms"
+                f"{result['peak_memory_kb']:>8.0f} KB")
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            line += f"   {_change(result['p50_ms'], old['p50_ms']):>6} {_change(result['peak_memory_kb'], old['peak_memory_kb']):>6}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_suites(names, scale):
+    """Runs component benchmarks, each in its own scratch directory. Returns {suite: {measurement: value}}."""
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        workdir = tempfile.mkdtemp(prefix=f"assistant-benchmark-{name}-")
+        try:
+            results[name] = benchmark_suites.SUITES[name](workdir, scale)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def format_suite_results(results, baseline=None):
+    """A table of the suites' measurements, with the change against the baseline run when there is one."""
+    lines = []
+    for name, measurements in results.items():
+        old = (baseline or {}).get("suites", {}).get(name, {})
+        lines.append(name)
+        for measurement, value in measurements.items():
+            if measurement.endswith("tokens"):
+                line = f"  {measurement:<55}{value:>12} tokens"
+            else:
+                line = f"  {measurement:<55}{value:>12.3f} ms"
+            if measurement in old:
+                line += f"   {_change(value, old[measurement]):>6}"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="main.py --benchmark",
+                                     description="Replays recorded conversations through the agent and times them.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only this scenario")
+    parser.add_argument("--scenarios-file", help="JSON file with more recorded conversations, in the SCENARIOS format")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs of each scenario")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help="seconds the replayed model waits before answering")
+    parser.add_argument("--output", default=os.getenv("BENCHMARK_PATH", RESULTS_PATH), help="where results are appended")
+    parser.add_argument("--label", help="a name for this run, to compare against later")
+    parser.add_argument("--baseline", help="compare with the run that has this label or commit")
+    parser.add_argument("--suite", action="append", choices=sorted(benchmark_suites.SUITES),
+                        help="run this component benchmark instead of the recorded conversations")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies the sizes of the suites' generated data (0.1 for a quick run)")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        kind = "suites"
+        settings = {"suites": args.suite, "scale": args.scale}
+        results = run_suites(args.suite, args.scale)
+    else:
+        scenarios = dict(SCENARIOS)
+        if args.scenarios_file:
+            with open(args.scenarios_file) as f:
+                scenarios.update(json.load(f))
+        names = args.scenario or list(scenarios)
+
+        bench = Benchmark({name: scenarios[name] for name in names}, args.latency)
+        results = {}
+        try:
+            for name in names:
+                print(f"Running {name}...", file=sys.stderr)
+                results[name] = bench.measure(name, args.repeat)
+        finally:
+            bench.close()
+            shell_job_manager.shutdown()
+        kind = "scenarios"
+        settings = {"repeat": args.repeat, "latency": args.latency, "scenarios": names}
+
+    journal = Journal(args.output, fsync=False)
+    records, _ = journal.read()
+    baseline = _find_baseline(records, settings, args.baseline)
+    record = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": settings,
+        kind: results,
+    }
+    journal.append(record)
+    journal.close()
+
+    print(format_suite_results(results, baseline) if args.suite else format_results(results, baseline))
+    if baseline:
+        print(f"Baseline: {baseline.get('label') or baseline.get('commit') or 'unnamed'} from {baseline['time']}.")
+    print(f"Results appended to {args.output}.")
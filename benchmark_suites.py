@@ -0,0 +1,403 @@
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+# =========================================================================
+# BENCHMARK SUITES
+# Component benchmarks for the engines behind the tools, run with
+# python main.py --benchmark --suite NAME. Each suite builds its own data
+# in a scratch directory, times the engine against the simple approach it
+# replaced, and returns {measurement: milliseconds} (or a token count,
+# for measurements whose name ends in "tokens"). --scale multiplies
+# the sizes (items, files, numbers, stub tool times), e.g. 0.1 for a
+# quick check.
+# =========================================================================
+
+TODO_SIZES = (10_000, 100_000)     # To-do list sizes the journal is compared with JSON at
+TODO_CHANGES = 300                 # add + complete + delete cycles timed per store
+STUB_TOOL_SECONDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6)   # How long each slow stub tool takes
+STARTUP_RUNS = 5                   # Launches of main.py timed by the startup suite
+STARTUP_GOAL_MS = 300              # Time to the first prompt we aim to stay under
+ROUTING_CALLS = 1000               # Tool selections timed by the routing suite
+ORGANIZE_FILES = 200_000           # Files in the synthetic tree the organizer sorts
+ORGANIZE_EXTENSIONS = ("txt", "jpg", "png", "pdf", "csv", "log", "py", "")
+SMALL_FILES = (20_000, 4 * 1024)           # Files and bytes each, for the many-small-files tree
+HUGE_FILES = (4, 512 * 1024 * 1024)        # Files and bytes each, for the few-huge-files tree
+PRIME_TESTS = 10_000               # Random 63-bit numbers tested for primality
+SIEVE_WIDTH = 10 ** 8              # Width of the ranges whose primes are counted
+FACTOR_SIZE = 10 ** 12             # Size of the two primes in the hard factorisation
+
+# Typical requests, one or two for each tool group
+ROUTING_PROMPTS = (
+    "Tell me a joke",
+    "What is 17 * 23?",
+    "Is 600851475143 prime?",
+    "Add buy milk to my to-do list",
+    "Show the first lines of notes/plan.txt",
+    "How much disk space is left?",
+    "Run ls -l in the shell",
+    "Remind me in 10 minutes to stretch",
+    "Remember that I prefer metric units",
+)
+
+
+def _scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def _median_seconds(func, repeat=3):
+    """Runs func repeat times and returns the median time in seconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+# -------------------------------------------------------------------------
+# To-do storage: JSON rewrite vs journal vs state store
+# -------------------------------------------------------------------------
+
+def _time_changes(todo_list, cycles):
+    """Seconds per change over cycles of add, complete and delete."""
+    started = time.perf_counter()
+    for i in range(cycles):
+        item = todo_list.add(f"benchmark task {i}")
+        todo_list.complete(item["id"])
+        todo_list.delete(item["id"])
+    return (time.perf_counter() - started) / (3 * cycles)
+
+
+def todo_store_suite(workdir, scale):
+    """The old JSON file rewritten on every change, against the journal and the state store."""
+    import state_store
+    import todo_store
+
+    results = {}
+    for size in (_scaled(count, scale) for count in TODO_SIZES):
+        items = [{"task": f"task {i}", "added": "2025-01-01 12:00", "completed": i % 3 == 0} for i in range(size)]
+        json_path = os.path.join(workdir, f"todo-{size}.json")
+
+        # Before the journal, every add, complete and delete rewrote the whole file
+        def rewrite_json():
+            with open(json_path, "w") as f:
+                json.dump(items, f)
+
+        def load_json():
+            with open(json_path) as f:
+                json.load(f)
+
+        results[f"{size} items: JSON rewrite per change"] = _ms(_median_seconds(rewrite_json))
+        results[f"{size} items: JSON load"] = _ms(_median_seconds(load_json))
+
+        # The journal imports the JSON file on its first load; fsync is off like the JSON writes
+        journal_path = os.path.join(workdir, f"todo-{size}.journal")
+        todo_list = todo_store.TodoStore(journal_path, legacy_path=json_path, fsync=False)
+        todo_list.load()
+        results[f"{size} items: journal per change"] = _ms(_time_changes(todo_list, TODO_CHANGES))
+        todo_list.close()
+        results[f"{size} items: journal load"] = _ms(_median_seconds(
+            lambda: todo_store.TodoStore(journal_path, legacy_path=json_path, fsync=False).load()))
+        todo_list = todo_store.TodoStore(journal_path, legacy_path=json_path, fsync=True)
+        todo_list.load()
+        results[f"{size} items: journal per change with fsync"] = _ms(_time_changes(todo_list, TODO_CHANGES // 10))
+        todo_list.close()
+
+        # The state store the assistant uses now: imported from the journal once, then read lazily
+        state = state_store.StateStore(os.path.join(workdir, f"state-{size}.sqlite"))
+        todo_list = todo_store.TodoStore(journal_path, legacy_path=json_path, state=state.namespace("user:benchmark"))
+        todo_list.load()
+        state.flush()
+        results[f"{size} items: state store per change"] = _ms(_time_changes(todo_list, TODO_CHANGES))
+        state.close()
+
+        def open_state():
+            store = state_store.StateStore(os.path.join(workdir, f"state-{size}.sqlite"))
+            todo_store.TodoStore(journal_path, legacy_path=json_path, state=store.namespace("user:benchmark")).load()
+            store.close()
+
+        results[f"{size} items: state store load"] = _ms(_median_seconds(open_state))
+    return results
+
+
+# -------------------------------------------------------------------------
+# Parallel tool calls: wall time of one tool batch vs the sum of its tools
+# -------------------------------------------------------------------------
+
+def _slow_tool(number, seconds):
+    from langchain_core.tools import StructuredTool
+
+    def wait():
+        time.sleep(seconds)
+        return f"Waited {seconds:.3f}s."
+
+    return StructuredTool.from_function(wait, name=f"slow_tool_{number}", description=f"Waits {seconds:.3f}s.")
+
+
+def parallel_tools_suite(workdir, scale):
+    """One model message calling every slow stub tool, through the agent's tool node, sync and async."""
+    from langgraph.prebuilt import create_react_agent
+
+    import fake_model
+    import parallel_tools
+
+    durations = [seconds * scale for seconds in STUB_TOOL_SECONDS]
+    tools = [_slow_tool(number, seconds) for number, seconds in enumerate(durations, 1)]
+    model = fake_model.ReplayChatModel(script={"Run every slow tool.": [
+        {"tool_calls": [{"name": tool.name, "args": {}} for tool in tools]},
+        {"content": "All done."},
+    ]})
+    message = {"messages": [{"role": "user", "content": "Run every slow tool."}]}
+
+    results = {"sum of tool times": _ms(sum(durations)), "slowest tool": _ms(max(durations))}
+    # The same graph build_agent makes, without the router: the stock tool node under max_concurrency
+    for limit in (parallel_tools.max_parallel_tools(), 2):
+        graph = create_react_agent(model, parallel_tools.make_tool_node(tools)).with_config(max_concurrency=limit)
+        results[f"wall time, sync, {limit} at once"] = _ms(_median_seconds(lambda: graph.invoke(message)))
+        with asyncio.Runner() as runner:
+            parallel_tools.use_tool_threads(runner.get_loop())
+            results[f"wall time, async, {limit} at once"] = _ms(_median_seconds(
+                lambda: runner.run(graph.ainvoke(message))))
+    return results
+
+
+# -------------------------------------------------------------------------
+# Startup: time from launching main.py to the first prompt
+# -------------------------------------------------------------------------
+
+def _time_to_prompt(command, workdir):
+    """Seconds from starting command until it asks "You:"; then it is told to exit."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    output = b""
+    try:
+        while b"You: " not in output:
+            data = os.read(process.stdout.fileno(), 65536)
+            if not data:
+                raise RuntimeError(f"main.py exited before the first prompt: {output.decode()[-500:]}")
+            output += data
+        seconds = time.perf_counter() - started
+        process.communicate(b"exit\n", timeout=60)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return seconds
+
+
+def startup_suite(workdir, scale):
+    """Launches main.py in an empty directory and times the first prompt, against Python's own startup."""
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    runs = _scaled(STARTUP_RUNS, scale)
+
+    def python_alone():
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+    return {
+        "Python startup alone": _ms(_median_seconds(python_alone, runs)),
+        f"time to first prompt (goal {STARTUP_GOAL_MS} ms)": _ms(statistics.median(
+            _time_to_prompt([sys.executable, main_path], workdir) for _ in range(runs))),
+    }
+
+
+# -------------------------------------------------------------------------
+# Tool routing: schema tokens per request with and without routing
+# -------------------------------------------------------------------------
+
+def tool_routing_suite(workdir, scale):
+    """Tool schema tokens each typical request sends with routing, against binding every tool."""
+    from langchain_core.messages import HumanMessage
+
+    import assistant_tools
+    import tool_router
+
+    router = tool_router.ToolRouter(assistant_tools.TOOL_GROUPS)
+    results = {"every tool bound: schema tokens": router.all_tools_tokens}
+    conversations = [[HumanMessage(content=prompt)] for prompt in ROUTING_PROMPTS]
+    routed = []
+    for prompt, messages in zip(ROUTING_PROMPTS, conversations):
+        groups = router.select_groups(messages)
+        routed.append(sum(router.schema_tokens[tool.name] for group in groups for tool in router.tool_groups[group]))
+        results[f"{prompt!r}: schema tokens"] = routed[-1]
+    results["average with routing: schema tokens"] = round(statistics.fmean(routed))
+
+    # What routing costs on every model call
+    calls = _scaled(ROUTING_CALLS, scale)
+
+    def select():
+        for i in range(calls):
+            router.select_groups(conversations[i % len(conversations)])
+
+    results["routing time per model call"] = _ms(_median_seconds(select) / calls)
+    return results
+
+
+# -------------------------------------------------------------------------
+# File organizer: the old per-file loop vs the scandir plan and batched moves
+# -------------------------------------------------------------------------
+
+def _make_flat_tree(directory, count, folders=0):
+    """Creates count empty files with mixed extensions, spread over folders subfolders (0 = all at the top)."""
+    os.makedirs(directory)
+    for folder in range(folders):
+        os.mkdir(os.path.join(directory, f"folder{folder}"))
+    for i in range(count):
+        extension = ORGANIZE_EXTENSIONS[i % len(ORGANIZE_EXTENSIONS)]
+        name = f"file{i}.{extension}" if extension else f"file{i}"
+        if folders:
+            name = os.path.join(f"folder{i % folders}", name)
+        open(os.path.join(directory, name), "wb").close()
+
+
+def _organize_by_extension_loop(directory):
+    """The organizer before the engine: isfile, exists and makedirs per file, then shutil.move."""
+    files = [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
+    for file in files:
+        file_ext = os.path.splitext(file)[1][1:] or "no_extension"
+        ext_folder = os.path.join(directory, file_ext)
+        if not os.path.exists(ext_folder):
+            os.makedirs(ext_folder)
+        shutil.move(os.path.join(directory, file), os.path.join(ext_folder, file))
+
+
+def _timed_once(func, *args, **kwargs):
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def organizer_suite(workdir, scale):
+    """Sorts a synthetic flat directory by extension with the old loop and the engine, and a nested tree."""
+    import file_organizer
+
+    count = _scaled(ORGANIZE_FILES, scale)
+    results = {}
+    runs = [
+        ("old per-file loop", _organize_by_extension_loop, {}),
+        ("plan only (dry run)", file_organizer.organize, {"dry_run": True}),
+        ("engine, 1 worker", file_organizer.organize, {"workers": 1}),
+        (f"engine, {file_organizer.DEFAULT_WORKERS} workers", file_organizer.organize, {}),
+    ]
+    for number, (name, organize, options) in enumerate(runs):
+        directory = os.path.join(workdir, f"flat{number}")
+        _make_flat_tree(directory, count)
+        results[f"{count} files, {name}"] = _ms(_timed_once(organize, directory, **options))
+        shutil.rmtree(directory)
+
+    directory = os.path.join(workdir, "nested")
+    _make_flat_tree(directory, count, folders=100)
+    results[f"{count} files in 100 folders, engine, recursive"] = _ms(
+        _timed_once(file_organizer.organize, directory, recursive=True))
+    return results
+
+
+# -------------------------------------------------------------------------
+# Copy and delete: shutil.copytree/rmtree vs the transfer engine
+# -------------------------------------------------------------------------
+
+def _make_tree(directory, files, size):
+    """Creates files files of size bytes each, 1000 to a folder."""
+    block = os.urandom(min(size, 1024 * 1024))
+    for i in range(files):
+        folder = os.path.join(directory, f"folder{i // 1000}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file{i}.bin"), "wb") as f:
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write(block[:size % len(block)])
+
+
+def transfer_suite(workdir, scale):
+    """Copies and deletes a many-small-files and a few-huge-files tree with shutil and with the engine."""
+    import file_transfer
+
+    results = {}
+    small_files, small_size = SMALL_FILES
+    huge_files, huge_size = HUGE_FILES
+    trees = [
+        (f"{_scaled(small_files, scale)} x {small_size // 1024} KB", _scaled(small_files, scale), small_size),
+        (f"{huge_files} x {_scaled(huge_size, scale) // 1024 ** 2} MB", huge_files, _scaled(huge_size, scale)),
+    ]
+    for name, files, size in trees:
+        source = os.path.join(workdir, "source")
+        _make_tree(source, files, size)
+        results[f"{name}: shutil.copytree"] = _ms(_timed_once(shutil.copytree, source, os.path.join(workdir, "a")))
+        results[f"{name}: engine copy"] = _ms(_timed_once(file_transfer.copy, source, os.path.join(workdir, "b")))
+        results[f"{name}: engine copy again, unchanged"] = _ms(
+            _timed_once(file_transfer.copy, source, os.path.join(workdir, "b")))
+        results[f"{name}: shutil.rmtree"] = _ms(_timed_once(shutil.rmtree, os.path.join(workdir, "a")))
+        results[f"{name}: engine delete"] = _ms(_timed_once(file_transfer.delete, os.path.join(workdir, "b")))
+        shutil.rmtree(source)
+    return results
+
+
+# -------------------------------------------------------------------------
+# Number theory: primality, sieving and factorisation at realistic sizes
+# -------------------------------------------------------------------------
+
+def _is_prime_trial_division(n):
+    """The trial division is_prime used before number_theory.py."""
+    if n < 2:
+        return False
+    return all(n % i for i in range(2, math.isqrt(n) + 1))
+
+
+def _next_prime(n):
+    import number_theory
+
+    while not number_theory.is_prime(n):
+        n += 1
+    return n
+
+
+def number_theory_suite(workdir, scale):
+    """Times is_prime, count_primes and factorize on the sizes the engine was built for."""
+    import number_theory
+
+    # Pollard's rho picks random starting points
+    random.seed(0)
+    results = {}
+    results["is_prime(10^12+39), trial division"] = _ms(_timed_once(_is_prime_trial_division, 10 ** 12 + 39))
+    results["is_prime(10^12+39)"] = _ms(_median_seconds(lambda: number_theory.is_prime(10 ** 12 + 39)))
+    results["is_prime(10^18+3)"] = _ms(_median_seconds(lambda: number_theory.is_prime(10 ** 18 + 3)))
+
+    numbers = [random.getrandbits(63) for _ in range(_scaled(PRIME_TESTS, scale))]
+    results[f"{len(numbers)} random 63-bit is_prime"] = _ms(
+        _timed_once(lambda: [number_theory.is_prime(n) for n in numbers]))
+
+    width = _scaled(SIEVE_WIDTH, scale)
+    results[f"count_primes(0, {width})"] = _ms(_timed_once(number_theory.count_primes, 0, width))
+    results[f"count_primes(10^13, 10^13+{width})"] = _ms(
+        _timed_once(number_theory.count_primes, 10 ** 13, 10 ** 13 + width))
+
+    results["factorize((10^9+7)(10^9+9))"] = _ms(
+        _median_seconds(lambda: number_theory.factorize((10 ** 9 + 7) * (10 ** 9 + 9))))
+    p = _next_prime(_scaled(FACTOR_SIZE, scale))
+    q = _next_prime(3 * p)
+    results[f"factorize({len(str(p))}-digit x {len(str(q))}-digit primes)"] = _ms(
+        _timed_once(number_theory.factorize, p * q))
+    return results
+
+
+SUITES = {
+    "todo-store": todo_store_suite,
+    "parallel-tools": parallel_tools_suite,
+    "startup": startup_suite,
+    "tool-routing": tool_routing_suite,
+    "organizer": organizer_suite,
+    "transfer": transfer_suite,
+    "number-theory": number_theory_suite,
+}
@@ -0,0 +1,306 @@
+import ast
+import math
+import operator
+
+# =========================================================================
+# SAFE EXPRESSION EVALUATOR
+# Parses a math expression with Python's ast module and walks the tree,
+# allowing only numbers, lists, variables and the whitelisted functions
+# below. Nothing is ever passed to eval().
+# =========================================================================
+
+MAX_EXPRESSION_LENGTH = 2000
+MAX_LIST_LENGTH = 10000
+MAX_RESULT_DIGITS = 4000   # Largest integer result we agree to build (Python prints at most 4300 digits)
+MAX_RESULT_BITS = int(MAX_RESULT_DIGITS * math.log2(10))
+MAX_FACTORIAL = 1000
+
+
+class CalculationError(ValueError):
+    """Raised when an expression is invalid or cannot be evaluated safely."""
+
+
+def _mean(values):
+    values = _as_list(values)
+    if not values:
+        raise CalculationError("Cannot take the mean of an empty list.")
+    return sum(values) / len(values)
+
+
+def _log(number, base=math.e):
+    if number <= 0:
+        raise CalculationError("Cannot calculate the logarithm of a non-positive number.")
+    return math.log(number, base)
+
+
+def _sqrt(number):
+    if number < 0:
+        raise CalculationError("Cannot calculate the square root of a negative number.")
+    return math.sqrt(number)
+
+
+def _check_size(value):
+    """Refuses integers (or lists holding integers) with more than MAX_RESULT_DIGITS digits."""
+    if isinstance(value, list):
+        for item in value:
+            _check_size(item)
+    elif isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+        raise CalculationError("Result is too large to calculate.")
+    return value
+
+
+def _multiply(a, b):
+    # The product has at least bit_length(a) + bit_length(b) - 1 bits, so
+    # oversized products are refused before the (slow) multiplication
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() - 1 > MAX_RESULT_BITS:
+        raise CalculationError("Result is too large to calculate.")
+    return a * b
+
+
+def _product(values):
+    result = 1
+    for value in _as_list(values):
+        result = _multiply(result, value)
+    return result
+
+
+def _factorial(number):
+    if number != int(number) or number < 0:
+        raise CalculationError("Factorial is only defined for non-negative integers.")
+    if number > MAX_FACTORIAL:
+        raise CalculationError(f"Factorial input is limited to {MAX_FACTORIAL}.")
+    return math.factorial(int(number))
+
+
+# Functions that take one number and are applied element-wise to lists
+ELEMENTWISE_FUNCTIONS = {
+    "sqrt": _sqrt,
+    "exp": math.exp,
+    "log10": lambda x: _log(x, 10),
+    "log2": lambda x: _log(x, 2),
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "sinh": math.sinh,
+    "cosh": math.cosh,
+    "tanh": math.tanh,
+    "degrees": math.degrees,
+    "radians": math.radians,
+    "abs": abs,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "factorial": _factorial,
+}
+
+# Functions that take several numbers (applied element-wise when given lists)
+MULTI_ARG_FUNCTIONS = {
+    "log": _log,
+    "pow": lambda base, exponent: _power(base, exponent),
+    "atan2": math.atan2,
+    "hypot": math.hypot,
+    "round": lambda number, digits=0: round(number, int(digits)),
+    "gcd": lambda a, b: math.gcd(int(a), int(b)),
+}
+
+# Functions that reduce a list (or several numbers) to a single value
+AGGREGATE_FUNCTIONS = {
+    "sum": lambda values: sum(_as_list(values)),
+    "min": lambda values: min(_as_list(values)),
+    "max": lambda values: max(_as_list(values)),
+    "mean": _mean,
+    "avg": _mean,
+    "len": lambda values: len(_as_list(values)),
+    "prod": _product,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "inf": math.inf,
+}
+
+FUNCTION_NAMES = sorted(
+    list(ELEMENTWISE_FUNCTIONS) + list(MULTI_ARG_FUNCTIONS) + list(AGGREGATE_FUNCTIONS)
+)
+
+
+def _as_list(values):
+    if isinstance(values, list):
+        return values
+    return [values]
+
+
+def _check_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CalculationError(f"Expected a number, got {value!r}.")
+    return value
+
+
+def _power(base, exponent):
+    # Refuse integer powers whose result would be astronomically large
+    if isinstance(base, int) and isinstance(exponent, int) and abs(base) > 1 and exponent > 0:
+        if exponent * math.log10(abs(base)) > MAX_RESULT_DIGITS:
+            raise CalculationError("Result is too large to calculate.")
+    try:
+        result = base ** exponent
+    except OverflowError:
+        raise CalculationError("Result is too large to calculate.")
+    except ZeroDivisionError:
+        raise CalculationError("Cannot raise zero to a negative power.")
+    if isinstance(result, complex):
+        raise CalculationError("Result is not a real number.")
+    return result
+
+
+def _divide(a, b):
+    if b == 0:
+        raise CalculationError("Cannot divide by zero.")
+    return a / b
+
+
+def _floor_divide(a, b):
+    if b == 0:
+        raise CalculationError("Cannot divide by zero.")
+    return a // b
+
+
+def _modulo(a, b):
+    if b == 0:
+        raise CalculationError("Cannot divide by zero.")
+    return a % b
+
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: _divide,
+    ast.FloorDiv: _floor_divide,
+    ast.Mod: _modulo,
+    ast.Pow: _power,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _broadcast(func, *args):
+    """Applies func element-wise when any argument is a list."""
+    lengths = {len(arg) for arg in args if isinstance(arg, list)}
+    if not lengths:
+        return func(*args)
+    if len(lengths) > 1:
+        raise CalculationError("Lists must have the same length to be combined element-wise.")
+    length = lengths.pop()
+    return [
+        _broadcast(func, *[arg[i] if isinstance(arg, list) else arg for arg in args])
+        for i in range(length)
+    ]
+
+
+class _Evaluator:
+    def __init__(self, variables):
+        self.variables = dict(variables)
+
+    def run(self, tree):
+        result = None
+        for statement in tree.body:
+            if isinstance(statement, ast.Assign):
+                if len(statement.targets) != 1 or not isinstance(statement.targets[0], ast.Name):
+                    raise CalculationError("Only simple assignments like 'x = 2' are allowed.")
+                name = statement.targets[0].id
+                if name in CONSTANTS or name in FUNCTION_NAMES:
+                    raise CalculationError(f"Cannot assign to reserved name '{name}'.")
+                self.variables[name] = result = self.visit(statement.value)
+            elif isinstance(statement, ast.Expr):
+                result = self.visit(statement.value)
+            else:
+                raise CalculationError("Only expressions and simple assignments are allowed.")
+        if result is None:
+            raise CalculationError("Nothing to calculate.")
+        return result
+
+    def visit(self, node):
+        if isinstance(node, ast.Constant):
+            return _check_number(node.value)
+
+        if isinstance(node, ast.Name):
+            if node.id in self.variables:
+                return self.variables[node.id]
+            if node.id in CONSTANTS:
+                return CONSTANTS[node.id]
+            raise CalculationError(f"Unknown variable '{node.id}'.")
+
+        if isinstance(node, (ast.List, ast.Tuple)):
+            if len(node.elts) > MAX_LIST_LENGTH:
+                raise CalculationError(f"Lists are limited to {MAX_LIST_LENGTH} items.")
+            return [self.visit(element) for element in node.elts]
+
+        if isinstance(node, ast.BinOp):
+            op = BINARY_OPERATORS.get(type(node.op))
+            if op is None:
+                raise CalculationError(f"Operator {type(node.op).__name__} is not allowed.")
+            return _check_size(_broadcast(op, self.visit(node.left), self.visit(node.right)))
+
+        if isinstance(node, ast.UnaryOp):
+            op = UNARY_OPERATORS.get(type(node.op))
+            if op is None:
+                raise CalculationError(f"Operator {type(node.op).__name__} is not allowed.")
+            return _broadcast(op, self.visit(node.operand))
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise CalculationError("Only plain function calls like sqrt(x) are allowed.")
+            name = node.func.id
+            args = [self.visit(arg) for arg in node.args]
+            if name in AGGREGATE_FUNCTIONS:
+                # min(1, 2, 3) and min([1, 2, 3]) both work
+                values = args[0] if len(args) == 1 else args
+                return _check_size(AGGREGATE_FUNCTIONS[name](values))
+            if name in ELEMENTWISE_FUNCTIONS:
+                if len(args) != 1:
+                    raise CalculationError(f"{name}() takes exactly one argument.")
+                return _check_size(_broadcast(ELEMENTWISE_FUNCTIONS[name], args[0]))
+            if name in MULTI_ARG_FUNCTIONS:
+                return _check_size(_broadcast(MULTI_ARG_FUNCTIONS[name], *args))
+            raise CalculationError(f"Unknown function '{name}'.")
+
+        raise CalculationError(f"Unsupported syntax: {type(node).__name__}.")
+
+
+def evaluate(expression, variables=None):
+    """Evaluates a math expression and returns a number or a list of numbers.
+
+    Statements can be separated by ';' or new lines, and 'name = value'
+    assignments can be used by later statements. The value of the last
+    statement is returned.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculationError(f"Expressions are limited to {MAX_EXPRESSION_LENGTH} characters.")
+    # Accept the common '^' notation for powers
+    expression = expression.replace("^", "**")
+    try:
+        tree = ast.parse(expression.strip(), mode="exec")
+    except SyntaxError as e:
+        raise CalculationError(f"Invalid expression: {e.msg}.")
+
+    for name, value in (variables or {}).items():
+        if not name.isidentifier():
+            raise CalculationError(f"Invalid variable name '{name}'.")
+        for number in _as_list(value):
+            _check_size(_check_number(number))
+
+    try:
+        return _Evaluator(variables or {}).run(tree)
+    except CalculationError:
+        raise
+    except (ValueError, TypeError, OverflowError, ZeroDivisionError) as e:
+        raise CalculationError(str(e))
+    except RecursionError:
+        raise CalculationError("Expression is nested too deeply.")
@@ -0,0 +1,169 @@
+import asyncio
+import sys
+import threading
+import time
+
+# =========================================================================
+# CONSOLE OUTPUT
+# Shows the assistant's answer while it is being generated, token by
+# token, and a status line with the tool that is running and for how long.
+# The status line is redrawn in place a few times a second and wiped
+# before more text is printed, so it never ends up in the transcript.
+# A turn runs as an asyncio task, so Ctrl-C can cancel it and the chat
+# goes on with the next prompt.
+# =========================================================================
+
+STATUS_REFRESH = 0.1        # Seconds between redraws of the status line
+CANCELLED_TOOL_RESULT = "Cancelled by the user before it finished."
+
+
+def message_text(content):
+    """The text of a message's content, which can be a string or a list of parts."""
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+class ToolStatus:
+    """The tools running right now, kept up to date by LangChain tool callbacks."""
+
+    def __init__(self):
+        self.running = {}         # Tool run ID -> (tool name, start time)
+        self.lock = threading.Lock()
+        self._handler = None
+
+    def callbacks(self):
+        if self._handler is None:
+            self._handler = _make_callback_handler(self)
+        return [self._handler]
+
+    def describe(self):
+        """A line like "Running search_file (2.4s)", or None when no tool is running."""
+        with self.lock:
+            if not self.running:
+                return None
+            names = sorted({name for name, _ in self.running.values()})
+            started = min(start for _, start in self.running.values())
+        return f"⏳ Running {', '.join(names)} ({time.perf_counter() - started:.1f}s)"
+
+
+def _make_callback_handler(status):
+    """Builds the callback handler that feeds status (LangChain is only imported here)."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class ToolStatusHandler(BaseCallbackHandler):
+        run_inline = True
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+            with status.lock:
+                status.running[run_id] = (name, time.perf_counter())
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            with status.lock:
+                status.running.pop(run_id, None)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            with status.lock:
+                status.running.pop(run_id, None)
+
+    return ToolStatusHandler()
+
+
+class StatusLine:
+    """A line below the answer that can be rewritten in place and wiped."""
+
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.enabled = self.output.isatty()     # Redirected output gets the answer text only
+        self.shown = False
+        self.line_empty = False   # Whether the cursor is at the start of an empty line
+
+    def write(self, text):
+        """Prints answer text, wiping the status line first."""
+        self.clear()
+        self.output.write(text)
+        self.output.flush()
+        self.line_empty = False
+
+    def show(self, text):
+        if not self.enabled:
+            return
+        if not self.shown and not self.line_empty:
+            self.output.write("\n")    # Keep the answer so far on its own line
+        self.output.write("\r\033[K" + text)
+        self.output.flush()
+        self.shown = True
+
+    def clear(self):
+        if self.shown:
+            # The answer goes on where the status line was
+            self.output.write("\r\033[K")
+            self.output.flush()
+            self.shown = False
+            self.line_empty = True
+
+
+async def _close_cancelled_turn(agent_executor, config):
+    """Answers the tool calls a cancelled turn left open, so the conversation stays valid.
+
+    The model rejects a history where a tool call has no result, so each
+    unanswered call gets a result saying it was cancelled.
+    """
+    from langchain_core.messages import ToolMessage
+
+    state = await agent_executor.aget_state(config)
+    messages = state.values.get("messages", [])
+    answered = {message.tool_call_id for message in messages if message.type == "tool"}
+    for message in reversed(messages):
+        if message.type == "ai" and message.tool_calls:
+            results = [ToolMessage(CANCELLED_TOOL_RESULT, tool_call_id=call["id"], name=call["name"])
+                       for call in message.tool_calls if call["id"] not in answered]
+            if results:
+                await agent_executor.aupdate_state(config, {"messages": results}, as_node="tools")
+            return
+        if message.type == "human":
+            return
+
+
+async def stream_turn(agent_executor, message, config, output=None):
+    """Runs one turn, printing the answer as it streams in. Returns the answer's text.
+
+    If the task is cancelled (Ctrl-C), the open tool calls are closed off
+    and CancelledError is raised again.
+    """
+    output = output or sys.stdout
+    status = ToolStatus()
+    status_line = StatusLine(output)
+    config = {**config, "callbacks": [*config.get("callbacks", []), *status.callbacks()]}
+    parts = []
+
+    async def refresh():
+        while True:
+            text = status.describe()
+            if text:
+                status_line.show(text)
+            else:
+                status_line.clear()
+            await asyncio.sleep(STATUS_REFRESH)
+
+    refresher = asyncio.create_task(refresh()) if status_line.enabled else None
+    try:
+        async for chunk, metadata in agent_executor.astream(
+            {"messages": [{"role": "user", "content": message}]}, config, stream_mode="messages",
+        ):
+            # Tokens of the summariser in the memory hook are not part of the answer
+            if metadata.get("langgraph_node") != "agent":
+                continue
+            text = message_text(chunk.content)
+            if text:
+                status_line.write(text)
+                parts.append(text)
+    except asyncio.CancelledError:
+        await _close_cancelled_turn(agent_executor, {"configurable": config["configurable"]})
+        raise
+    finally:
+        if refresher is not None:
+            refresher.cancel()
+        status_line.clear()
+    return "".join(parts)
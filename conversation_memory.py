@@ -0,0 +1,161 @@
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+# =========================================================================
+# CONVERSATION MEMORY
+# Keeps multi-turn history in a LangGraph checkpointer, but bounded:
+# once the conversation grows past a token budget, the oldest turns are
+# folded into a rolling summary and only the recent turns are kept verbatim.
+# The summary can also be saved, and a new conversation starts from the
+# saved one.
+# =========================================================================
+
+MAX_PROMPT_TOKENS = 6000        # Budget for the history sent to the model
+KEEP_RECENT_TOKENS = 3000       # How much recent history to keep word for word
+MAX_SUMMARY_TOKENS = 400        # Upper bound for the rolling summary
+MAX_MESSAGE_CHARS = 1000        # Per-message cap when building the summary prompt
+
+SUMMARY_ID = "conversation-summary"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and their assistant. "
+    "Update the existing summary with the new messages. Keep names, numbers, decisions, "
+    "preferences and open tasks; drop small talk. Answer with the summary only, "
+    "in at most {words} words."
+)
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer that only keeps the newest checkpoints of each thread.
+
+    The stock InMemorySaver keeps every checkpoint ever written, so memory use and
+    the cost of finding the latest checkpoint grow with the length of the session.
+    """
+
+    def __init__(self, keep=2):
+        super().__init__()
+        self.keep = keep
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        stale = sorted(checkpoints)[:-self.keep]
+        if not stale:
+            return result
+
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        # Drop channel values that no remaining checkpoint points to
+        live = set()
+        for saved_checkpoint, _, _ in checkpoints.values():
+            live.update(self.serde.loads_typed(saved_checkpoint)["channel_versions"].items())
+        for key in list(self.blobs):
+            if key[0] == thread_id and key[1] == checkpoint_ns and (key[2], key[3]) not in live:
+                del self.blobs[key]
+        return result
+
+
+def _split_summary(messages):
+    """Separates the rolling summary (if any) from the rest of the history."""
+    if messages and isinstance(messages[0], SystemMessage) and messages[0].id == SUMMARY_ID:
+        return messages[0].content[len(SUMMARY_PREFIX):], messages[1:]
+    return "", messages
+
+
+def _find_cut(messages, keep_tokens):
+    """Returns the index where the recent turns start.
+
+    Cuts only happen right before a user message, so a tool call is never
+    separated from its result. The current turn is always kept.
+    """
+    cut = len(messages)
+    tokens = 0
+    for i in range(len(messages) - 1, -1, -1):
+        tokens += count_tokens_approximately([messages[i]])
+        if isinstance(messages[i], HumanMessage):
+            if tokens > keep_tokens and cut < len(messages):
+                break
+            cut = i
+    return cut
+
+
+def _format_transcript(messages):
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if message.type == "ai" and getattr(message, "tool_calls", None):
+            calls = ", ".join(call["name"] for call in message.tool_calls)
+            content = f"{content} [called tools: {calls}]".strip()
+        if len(content) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS] + "..."
+        role = {"human": "User", "ai": "Assistant", "tool": "Tool result"}.get(message.type, message.type)
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+def summarize(model, summary, messages, max_tokens=MAX_SUMMARY_TOKENS):
+    """Folds messages into the existing summary using the chat model. Errors of the model are raised."""
+    prompt = [
+        SystemMessage(content=SUMMARY_INSTRUCTIONS.format(words=max_tokens * 3 // 4)),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\n"
+                             f"New messages:\n{_format_transcript(messages)}"),
+    ]
+    new_summary = model.invoke(prompt).content
+    if not isinstance(new_summary, str):
+        new_summary = str(new_summary)
+    # Approximate tokens as 4 characters each, like count_tokens_approximately
+    return new_summary.strip()[:max_tokens * 4]
+
+
+def make_memory_hook(model, max_tokens=MAX_PROMPT_TOKENS, keep_tokens=KEEP_RECENT_TOKENS,
+                     summary_tokens=MAX_SUMMARY_TOKENS, load_summary=None, save_summary=None):
+    """Builds a pre-model hook for create_react_agent that keeps the history bounded.
+
+    save_summary(text) is called with every new summary; load_summary() gives
+    the summary a new conversation starts from.
+    """
+
+    def trim_conversation(state):
+        messages = state["messages"]
+        if load_summary is not None and len(messages) == 1:
+            # The first message of a new conversation: bring back the saved summary
+            summary = load_summary()
+            if summary:
+                kept = [SystemMessage(content=SUMMARY_PREFIX + summary, id=SUMMARY_ID), *messages]
+                return {
+                    "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept],
+                    "llm_input_messages": kept,
+                }
+        if count_tokens_approximately(messages) <= max_tokens:
+            return {"llm_input_messages": messages}
+
+        summary, history = _split_summary(messages)
+        cut = _find_cut(history, keep_tokens)
+        if cut == 0:
+            # Everything belongs to the current turn, nothing can be summarised yet
+            return {"llm_input_messages": messages}
+
+        try:
+            summary = summarize(model, summary, history[:cut], summary_tokens)
+        except Exception as e:
+            # Keep the whole history, so nothing is lost, and try again next turn;
+            # this turn the model sees the old summary (if any) and the recent turns
+            print(f"\n(Could not summarise older messages: {str(e)})")
+            old_summary = messages[:len(messages) - len(history)]
+            return {"llm_input_messages": [*old_summary, *history[cut:]]}
+        if save_summary is not None:
+            save_summary(summary)
+        kept = [SystemMessage(content=SUMMARY_PREFIX + summary, id=SUMMARY_ID), *history[cut:]]
+        return {
+            "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept],
+            "llm_input_messages": kept,
+        }
+
+    return trim_conversation
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# =========================================================================
+# FAKE CHAT MODEL
+# A stand-in for Gemini that needs no API key and costs nothing, so the
+# agent's own overhead (graph, tools, sessions, streaming) can be measured
+# locally. It answers by echoing the latest user message word by word,
+# waiting like a remote model would: a delay before the first token and a
+# smaller one between tokens. It can also fail or stall now and then, to
+# exercise the retries and hedging of the model gateway.
+#
+# ReplayChatModel plays back recorded answers instead, tool calls included,
+# so benchmark.py can drive whole conversations through the real agent.
+# =========================================================================
+
+
+class FakeModelError(Exception):
+    """A made-up "503 Service Unavailable", raised by FakeChatModel at its error_rate."""
+
+    code = 503
+
+
+def _last_user_text(messages):
+    for message in reversed(messages):
+        if message.type == "human":
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+class FakeChatModel(BaseChatModel):
+    """Echoes the latest user message, streaming one word at a time."""
+
+    latency: float = 0.0        # Seconds before the first token
+    token_delay: float = 0.0    # Seconds between tokens
+    error_rate: float = 0.0     # Share of calls that fail before answering
+    slow_rate: float = 0.0      # Share of calls that wait slow_latency instead of latency
+    slow_latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls are never chosen, only echoed or replayed, so there is nothing to bind
+        return self
+
+    def _tokens(self, messages):
+        words = f"You said: {_last_user_text(messages)}".split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _first_token_delay(self):
+        """Seconds until the first token; raises FakeModelError for the calls that fail."""
+        if random.random() < self.error_rate:
+            raise FakeModelError("503 Service Unavailable (injected by the fake model)")
+        return self.slow_latency if random.random() < self.slow_rate else self.latency
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self._first_token_delay() + self.token_delay * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self._first_token_delay() + self.token_delay * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, token in enumerate(self._tokens(messages)):
+            time.sleep(self.token_delay if i else self._first_token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, token in enumerate(self._tokens(messages)):
+            await asyncio.sleep(self.token_delay if i else self._first_token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def _replies_so_far(messages):
+    """How many times the model has answered since the latest user message."""
+    count = 0
+    for message in reversed(messages):
+        if message.type == "human":
+            break
+        count += message.type == "ai"
+    return count
+
+
+class ReplayChatModel(FakeChatModel):
+    """Plays back recorded replies, tool calls included, with the fake model's timing.
+
+    script maps a user message to the replies the model gave to it, in order;
+    each reply is a dict with "content" and/or "tool_calls" (a list of
+    {"name": ..., "args": ...}). The reply is picked from the conversation
+    itself (how many answers follow the latest user message), so one model can
+    serve many conversations at once. Messages that are not in the script,
+    like the memory hook's summary prompts, are echoed.
+    """
+
+    script: dict = {}
+
+    def _reply(self, messages):
+        replies = self.script.get(_last_user_text(messages))
+        step = _replies_so_far(messages)
+        if replies is None or step >= len(replies):
+            return None
+        return replies[step]
+
+    def _tool_calls(self, reply, messages):
+        step = _replies_so_far(messages)
+        return [{"name": call["name"], "args": call.get("args", {}), "id": f"call_{step}_{i}", "type": "tool_call"}
+                for i, call in enumerate(reply.get("tool_calls", []))]
+
+    def _tokens(self, messages):
+        reply = self._reply(messages)
+        if reply is None:
+            return super()._tokens(messages)
+        words = reply.get("content", "").split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        reply = self._reply(messages)
+        if reply is not None:
+            result.generations[0].message.tool_calls = self._tool_calls(reply, messages)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+        reply = self._reply(messages)
+        if reply is not None:
+            result.generations[0].message.tool_calls = self._tool_calls(reply, messages)
+        return result
+
+    def _tool_call_chunk(self, messages):
+        """The tool calls of the reply as a last, empty-text chunk (None when there are none)."""
+        reply = self._reply(messages)
+        calls = self._tool_calls(reply, messages) if reply is not None else []
+        if not calls:
+            return None
+        return ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+            for i, call in enumerate(calls)
+        ]))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+        chunk = self._tool_call_chunk(messages)
+        if chunk is not None:
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+        chunk = self._tool_call_chunk(messages)
+        if chunk is not None:
+            yield chunk
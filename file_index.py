@@ -0,0 +1,310 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# =========================================================================
+# FILE METADATA INDEX
+# Keeps the name, size and modification time of every file under the
+# indexed directories in SQLite, so questions like "largest files under X"
+# or "what changed today" become one query instead of a stat per file.
+# Directories are scanned in parallel. A refresh stats each directory and
+# only lists the ones whose mtime changed (a file was added, removed or
+# renamed in it); a full rescan also picks up files edited in place.
+# =========================================================================
+
+INDEX_PATH = "file_index.sqlite"
+SCAN_WORKERS = 8
+SORT_FIELDS = {"size": "f.size", "modified": "f.mtime", "name": "f.name"}
+GROUP_FIELDS = ("extension", "directory")
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+              "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+
+
+def parse_size(text):
+    """Turns "10MB", "1.5 GB" or "500k" into bytes."""
+    text = text.strip().lower().replace(" ", "")
+    number = text.rstrip("kmgtb")
+    unit = text[len(number):]
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except (KeyError, ValueError):
+        raise ValueError(f"Cannot read the size {text!r}; use a number with B, KB, MB, GB or TB.")
+
+
+def parse_time(text, end=False):
+    """Turns "2025-01-31", "2025-01-31 14:00", "today" or "yesterday" into a timestamp.
+
+    With end=True a bare date means the end of that day, so ranges include it.
+    """
+    text = text.strip().lower()
+    today = datetime.date.today()
+    if text in ("today", "yesterday"):
+        text = (today - datetime.timedelta(days=text == "yesterday")).isoformat()
+    moment = datetime.datetime.fromisoformat(text)
+    if end and len(text) <= 10:
+        moment += datetime.timedelta(days=1)
+    return moment.timestamp()
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _scan_directory(path, known_mtime_ns):
+    """Lists one directory unless its mtime is still known_mtime_ns.
+
+    Returns (mtime_ns, files, subdirectories); files and subdirectories are
+    None when the directory did not change.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    if mtime_ns == known_mtime_ns:
+        return mtime_ns, None, None
+    files = []
+    subdirectories = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    ext = os.path.splitext(entry.name)[1][1:].lower()
+                    files.append((entry.name, ext, stat.st_size, stat.st_mtime))
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+            except OSError:
+                continue   # Deleted while scanning
+    return mtime_ns, files, subdirectories
+
+
+class FileIndex:
+    """An SQLite index of file metadata for one or more directory trees."""
+
+    def __init__(self, path=INDEX_PATH, workers=SCAN_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.lock = threading.Lock()
+        self._db = None
+
+    @property
+    def db(self):
+        # Opened on first use, so starting the assistant does not create the file
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, refreshed REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS dirs (
+                    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime_ns INTEGER NOT NULL,
+                    file_count INTEGER NOT NULL, total_size INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS files (
+                    dir_id INTEGER NOT NULL, name TEXT NOT NULL, ext TEXT NOT NULL,
+                    size INTEGER NOT NULL, mtime REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS dir_extensions (
+                    dir_id INTEGER NOT NULL, ext TEXT NOT NULL, file_count INTEGER NOT NULL,
+                    total_size INTEGER NOT NULL, PRIMARY KEY (dir_id, ext)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS files_dir ON files (dir_id);
+                CREATE INDEX IF NOT EXISTS files_size ON files (size);
+                CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+                CREATE INDEX IF NOT EXISTS files_ext ON files (ext, size);
+            """)
+        return self._db
+
+    @staticmethod
+    def _subtree(root):
+        """Returns the WHERE clause and parameters that select root and the directories under it."""
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        # Every path that starts with prefix sorts between prefix and prefix with its last character bumped
+        return "(d.path = ? OR (d.path >= ? AND d.path < ?))", [root, prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+
+    def last_refresh(self, root):
+        """Returns when root was last refreshed, or None if it was never indexed."""
+        with self.lock:
+            row = self.db.execute("SELECT refreshed FROM roots WHERE path = ?", (os.path.abspath(root),)).fetchone()
+        return row[0] if row else None
+
+    # ---------------------------------------------------------------------
+    # Indexing
+    # ---------------------------------------------------------------------
+
+    def refresh(self, root, full=False):
+        """Brings the index for root up to date and returns a summary dict."""
+        started = time.perf_counter()
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise NotADirectoryError(f"Not a directory: {root}")
+
+        with self.lock:
+            db = self.db
+            where, params = self._subtree(root)
+            known = {path: (dir_id, mtime_ns)
+                     for dir_id, path, mtime_ns in db.execute(f"SELECT id, path, mtime_ns FROM dirs d WHERE {where}", params)}
+            children = {}
+            for path in known:
+                children.setdefault(os.path.dirname(path), []).append(path)
+            visited = set()
+            listed = errors = 0
+
+            with db, ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="index") as pool:
+                def submit(path):
+                    visited.add(path)
+                    known_mtime = None if full or path not in known else known[path][1]
+                    running[pool.submit(_scan_directory, path, known_mtime)] = path
+
+                running = {}
+                submit(root)
+                while running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        path = running.pop(future)
+                        try:
+                            mtime_ns, files, subdirectories = future.result()
+                        except OSError as e:
+                            # A directory that vanished is simply dropped from the index
+                            errors += not isinstance(e, FileNotFoundError)
+                            visited.discard(path)
+                            continue
+                        if files is None:
+                            # Unchanged: its subdirectories are the ones already indexed
+                            subdirectories = children.get(path, [])
+                        else:
+                            listed += 1
+                            self._store(path, mtime_ns, files, known)
+                        for subdirectory in subdirectories:
+                            if subdirectory not in visited:
+                                submit(subdirectory)
+
+                # Directories that no longer exist
+                gone = [(known[path][0],) for path in known if path not in visited]
+                db.executemany("DELETE FROM files WHERE dir_id = ?", gone)
+                db.executemany("DELETE FROM dir_extensions WHERE dir_id = ?", gone)
+                db.executemany("DELETE FROM dirs WHERE id = ?", gone)
+                db.execute("INSERT OR REPLACE INTO roots (path, refreshed) VALUES (?, ?)", (root, time.time()))
+
+            files, size = db.execute(
+                f"SELECT COALESCE(SUM(file_count), 0), COALESCE(SUM(total_size), 0) FROM dirs d WHERE {where}", params
+            ).fetchone()
+
+        return {"root": root, "directories": len(visited), "listed": listed, "removed": len(gone),
+                "errors": errors, "files": files, "size": size, "seconds": time.perf_counter() - started}
+
+    def _store(self, path, mtime_ns, files, known):
+        db = self.db
+        size = sum(file[2] for file in files)
+        if path in known:
+            dir_id = known[path][0]
+            db.execute("UPDATE dirs SET mtime_ns = ?, file_count = ?, total_size = ? WHERE id = ?",
+                       (mtime_ns, len(files), size, dir_id))
+            db.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+            db.execute("DELETE FROM dir_extensions WHERE dir_id = ?", (dir_id,))
+        else:
+            dir_id = db.execute("INSERT INTO dirs (path, mtime_ns, file_count, total_size) VALUES (?, ?, ?, ?)",
+                                (path, mtime_ns, len(files), size)).lastrowid
+            known[path] = (dir_id, mtime_ns)
+        db.executemany("INSERT INTO files (dir_id, name, ext, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                       [(dir_id,) + file for file in files])
+
+        # Per-directory totals answer unfiltered summaries without reading every file row
+        extensions = {}
+        for name, ext, file_size, mtime in files:
+            count, total = extensions.get(ext, (0, 0))
+            extensions[ext] = (count + 1, total + file_size)
+        db.executemany("INSERT INTO dir_extensions (dir_id, ext, file_count, total_size) VALUES (?, ?, ?, ?)",
+                       [(dir_id, ext, count, total) for ext, (count, total) in extensions.items()])
+
+    # ---------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------
+
+    def _filters(self, root, name_glob="", extension="", min_size="", max_size="",
+                 modified_after="", modified_before=""):
+        where, params = self._subtree(os.path.abspath(root))
+        clauses = [where]
+        if name_glob:
+            clauses.append("f.name GLOB ?")
+            params.append(name_glob)
+        if extension:
+            clauses.append("f.ext = ?")
+            params.append(extension.lower().lstrip("."))
+        if min_size:
+            clauses.append("f.size >= ?")
+            params.append(parse_size(min_size))
+        if max_size:
+            clauses.append("f.size <= ?")
+            params.append(parse_size(max_size))
+        if modified_after:
+            clauses.append("f.mtime >= ?")
+            params.append(parse_time(modified_after))
+        if modified_before:
+            clauses.append("f.mtime < ?")
+            params.append(parse_time(modified_before, end=True))
+        return " AND ".join(clauses), params
+
+    def query(self, root, name_glob="", extension="", min_size="", max_size="", modified_after="",
+              modified_before="", sort_by="size", descending=True, limit=20):
+        """Finds indexed files under root.
+
+        Returns (files, total_count, total_size), where files holds up to
+        limit (path, size, mtime) tuples in the requested order.
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Sorting is possible by {', '.join(SORT_FIELDS)}.")
+        where, params = self._filters(root, name_glob, extension, min_size, max_size,
+                                      modified_after, modified_before)
+        order = f"{SORT_FIELDS[sort_by]} {'DESC' if descending else 'ASC'}"
+        with self.lock:
+            # CROSS JOIN keeps files as the outer loop, so a sort on an indexed
+            # column walks that index and stops after `limit` matches
+            rows = self.db.execute(
+                f"SELECT d.path, f.name, f.size, f.mtime FROM files f CROSS JOIN dirs d "
+                f"WHERE d.id = f.dir_id AND {where} ORDER BY {order} LIMIT ?", params + [max(1, limit)]
+            ).fetchall()
+            if not any((name_glob, min_size, max_size, modified_after, modified_before)):
+                # Without file filters the per-directory totals give the answer directly
+                if extension:
+                    totals, table = "e", "dir_extensions e JOIN dirs d ON d.id = e.dir_id"
+                    where = where.replace("f.ext", "e.ext")
+                else:
+                    totals, table = "d", "dirs d"
+                count, size = self.db.execute(
+                    f"SELECT COALESCE(SUM({totals}.file_count), 0), COALESCE(SUM({totals}.total_size), 0) "
+                    f"FROM {table} WHERE {where}", params).fetchone()
+            else:
+                count, size = self.db.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(f.size), 0) FROM files f JOIN dirs d ON d.id = f.dir_id "
+                    f"WHERE {where}", params).fetchone()
+        return [(os.path.join(path, name), size_, mtime) for path, name, size_, mtime in rows], count, size
+
+    def summarize(self, root, group_by="extension", limit=20, **filters):
+        """Adds up the matching files per extension or per directory, largest first.
+
+        Returns a list of (group, file_count, total_size).
+        """
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"Grouping is possible by {', '.join(GROUP_FIELDS)}.")
+        where, params = self._filters(root, **filters)
+        column = "f.ext" if group_by == "extension" else "d.path"
+        sql = (f"SELECT {column}, COUNT(*), SUM(f.size) AS total FROM files f JOIN dirs d ON d.id = f.dir_id "
+               f"WHERE {where} GROUP BY {column} ORDER BY total DESC LIMIT ?")
+        if not any(filters.values()):
+            # Read the per-directory totals instead of every file row
+            if group_by == "extension":
+                sql = (f"SELECT e.ext, SUM(e.file_count), SUM(e.total_size) AS total FROM dir_extensions e "
+                       f"JOIN dirs d ON d.id = e.dir_id WHERE {where} GROUP BY e.ext ORDER BY total DESC LIMIT ?")
+            else:
+                sql = (f"SELECT d.path, d.file_count, d.total_size AS total FROM dirs d "
+                       f"WHERE {where} AND d.file_count > 0 ORDER BY total DESC LIMIT ?")
+        with self.lock:
+            return self.db.execute(sql, params + [max(1, limit)]).fetchall()
+
+    def close(self):
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
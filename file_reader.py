@@ -0,0 +1,207 @@
+import os
+import re
+
+import tracing
+
+# =========================================================================
+# STREAMING FILE READER
+# Reads pieces of files of any size without loading them into memory.
+# Every function caps its output to a character budget and reports the
+# offset where the next call should continue, so the assistant can page
+# through big files instead of pulling them into the model context.
+# =========================================================================
+
+OUTPUT_BUDGET = 8000           # Max characters returned by a single call
+CHUNK_SIZE = 1024 * 1024       # Read size used when scanning through a file
+MAX_BLOCK_SIZE = 16 * CHUNK_SIZE   # Lines longer than this are searched in pieces
+MAX_LINE_CHARS = 500           # Longer lines are shortened in search results
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="replace")
+
+
+def read_bytes(path, offset=0, length=OUTPUT_BUDGET):
+    """Reads up to length bytes starting at offset.
+
+    Returns (text, next_offset, file_size); next_offset is None at the end of the file.
+    """
+    size = os.path.getsize(path)
+    length = max(0, min(length, OUTPUT_BUDGET))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    tracing.count("file_bytes_read", len(data))
+    end = offset + len(data)
+    return _decode(data), (end if end < size else None), size
+
+
+def _skip_lines(f, count):
+    """Moves f past count newlines, counting them a chunk at a time."""
+    while count > 0:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        newlines = chunk.count(b"\n")
+        if newlines < count:
+            count -= newlines
+            continue
+        # The line we want starts inside this chunk
+        position = -1
+        for _ in range(count):
+            position = chunk.index(b"\n", position + 1)
+        f.seek(position + 1 - len(chunk), os.SEEK_CUR)
+        return True
+    return True
+
+
+def read_lines(path, start_line=1, num_lines=100, budget=OUTPUT_BUDGET):
+    """Reads num_lines lines starting at start_line (1-based).
+
+    Returns (lines, next_line); next_line is None when the end of the file was reached.
+    Stops early when the output budget is used up.
+    """
+    with open(path, "rb") as f:
+        try:
+            return _read_lines(f, start_line, num_lines, budget)
+        finally:
+            tracing.count("file_bytes_read", f.tell())
+
+
+def _read_lines(f, start_line, num_lines, budget):
+    lines = []
+    used = 0
+    if not _skip_lines(f, start_line - 1):
+        return lines, None
+    line_number = start_line
+    while len(lines) < num_lines:
+        raw = f.readline(budget + 1)
+        if not raw:
+            return lines, None
+        text = _decode(raw).rstrip("\r\n")
+        if used + len(text) > budget and lines:
+            break
+        if len(raw) > budget and not raw.endswith(b"\n"):
+            # A line longer than the budget: show its start and move on
+            text = text[:budget] + " ..."
+            while raw and not raw.endswith(b"\n"):
+                raw = f.readline(CHUNK_SIZE)
+        lines.append((line_number, text))
+        used += len(text)
+        line_number += 1
+    return lines, (line_number if f.read(1) else None)
+
+
+def tail(path, num_lines=50, budget=OUTPUT_BUDGET):
+    """Returns the last num_lines lines of a file, reading backwards from the end."""
+    size = os.path.getsize(path)
+    data = b""
+    position = size
+    with open(path, "rb") as f:
+        # One extra newline is needed to know the first line is complete
+        while position > 0 and data.count(b"\n") <= num_lines and len(data) <= budget * 4:
+            step = min(CHUNK_SIZE // 16, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    tracing.count("file_bytes_read", len(data))
+    lines = _decode(data).splitlines()
+    if position > 0 and lines:
+        lines = lines[1:]   # Probably cut in the middle
+    lines = lines[-num_lines:] if num_lines > 0 else []
+
+    result = []
+    used = 0
+    for line in reversed(lines):
+        if used + len(line) > budget and result:
+            break
+        result.append(line[:budget])
+        used += len(line)
+    result.reverse()
+    return result
+
+
+def _count_newlines(f, end):
+    """Counts the newlines in the first end bytes of f."""
+    f.seek(0)
+    count = 0
+    remaining = end
+    while remaining > 0:
+        chunk = f.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        count += chunk.count(b"\n")
+        remaining -= len(chunk)
+    return count
+
+
+def search(path, pattern, ignore_case=False, start_offset=0, max_matches=50, budget=OUTPUT_BUDGET,
+           start_line=None):
+    """Finds lines matching a regular expression.
+
+    Returns (matches, next_offset, next_line) where matches is a list of
+    (line_number, byte_offset, line_text). next_offset is where to continue
+    the search when max_matches or the budget was reached, otherwise None,
+    and next_line is the number of the line there. Passing both back as
+    start_offset and start_line continues without counting the lines before
+    start_offset again. The file is scanned in blocks that end on a line
+    break, so memory use does not depend on the file size.
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern.encode("utf-8"), flags)
+    with open(path, "rb") as f:
+        try:
+            return _search(f, regex, start_offset, start_line, max_matches, budget)
+        finally:
+            tracing.count("file_bytes_read", f.tell())
+
+
+def _search(f, regex, start_offset, start_line, max_matches, budget):
+    matches = []
+    used = 0
+    line_number = start_line or 1 + _count_newlines(f, start_offset)
+    f.seek(start_offset)
+    block_start = start_offset
+    carry = b""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        data = carry + chunk
+        if not data:
+            return matches, None, None
+        cut = data.rfind(b"\n") + 1 if chunk else len(data)
+        if cut == 0:
+            if len(data) < MAX_BLOCK_SIZE:
+                carry = data    # Wait for the end of this line
+                continue
+            cut = len(data)
+        block, carry = data[:cut], data[cut:]
+
+        position = 0
+        counted_to = 0
+        while True:
+            match = regex.search(block, position)
+            if match is None:
+                break
+            line_start = block.rfind(b"\n", 0, match.start()) + 1
+            line_end = block.find(b"\n", match.start())
+            if line_end == -1:
+                line_end = len(block)
+            line_number += block.count(b"\n", counted_to, line_start)
+            counted_to = line_start
+            if len(matches) >= max_matches:
+                return matches, block_start + line_start, line_number
+
+            text = _decode(block[line_start:min(line_end, line_start + MAX_LINE_CHARS * 4)]).rstrip("\r")
+            if len(text) > MAX_LINE_CHARS:
+                text = text[:MAX_LINE_CHARS] + " ..."
+            if used + len(text) > budget and matches:
+                return matches, block_start + line_start, line_number
+            matches.append((line_number, block_start + line_start, text))
+            used += len(text)
+            # Continue on the next line so each line is reported once
+            position = line_end + 1
+
+        line_number += block.count(b"\n", counted_to)
+        block_start += cut
+        if not chunk and not carry:
+            return matches, None, None
@@ -0,0 +1,299 @@
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================================================================
+# FILE TRANSFER ENGINE
+# Copies and deletes whole trees with a pool of worker threads. File data
+# is copied inside the kernel (copy_file_range, or sendfile) where the
+# system supports it. Like rsync, files whose size and modification time
+# already match the destination are skipped, and each big file is written
+# to a ".file_transfer.partial" name first, so an interrupted copy picks up
+# where it stopped when it is started again.
+# =========================================================================
+
+DEFAULT_WORKERS = 8
+COPY_CHUNK = 64 * 1024 * 1024       # Bytes per copy_file_range/sendfile call
+HASH_CHUNK = 1024 * 1024
+PARTIAL_SUFFIX = ".file_transfer.partial"  # Marks the engine's own unfinished copies
+RESUME_MIN_SIZE = 64 * 1024 * 1024  # Smaller files are simply copied again after an interruption
+BATCH_FILES = 256                   # Small files are handed to the pool in batches,
+BATCH_BYTES = 16 * 1024 * 1024      # so per-task overhead does not outweigh the copy itself
+COMPARE_MODES = ("size_mtime", "hash", "none")
+
+
+class Progress:
+    """A thread-safe counter (of bytes or files) that reports through on_progress(done, total)."""
+
+    def __init__(self, total, on_progress=None):
+        self.total = total
+        self.done = 0
+        self.on_progress = on_progress
+        self.lock = threading.Lock()
+
+    def add(self, count):
+        with self.lock:
+            self.done += count
+            done = self.done
+        if self.on_progress is not None:
+            self.on_progress(done, self.total)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def is_unchanged(source, destination, source_stat, compare="size_mtime"):
+    """Tells whether destination already holds the same file as source."""
+    if compare == "none":
+        return False
+    try:
+        destination_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    if compare == "hash":
+        return _file_hash(source) == _file_hash(destination)
+    # Whole seconds, like rsync, because some filesystems store coarser times
+    return int(destination_stat.st_mtime) == int(source_stat.st_mtime)
+
+
+def _copy_data(source_fd, destination_fd, offset, size, progress):
+    """Copies bytes offset..size from source_fd to the end of destination_fd."""
+    # copy_file_range lets the filesystem clone or copy server-side; sendfile
+    # at least keeps the data in the kernel; plain reads are the last resort
+    for method in ("copy_file_range", "sendfile"):
+        if not hasattr(os, method):
+            continue
+        try:
+            while offset < size:
+                if method == "copy_file_range":
+                    sent = os.copy_file_range(source_fd, destination_fd, min(COPY_CHUNK, size - offset), offset)
+                else:
+                    sent = os.sendfile(destination_fd, source_fd, offset, min(COPY_CHUNK, size - offset))
+                if sent == 0:
+                    break
+                offset += sent
+                progress.add(sent)
+            return offset
+        except OSError:
+            continue   # Not supported between these filesystems; try the next method
+    os.lseek(source_fd, offset, os.SEEK_SET)
+    while offset < size:
+        block = os.read(source_fd, min(COPY_CHUNK, size - offset))
+        if not block:
+            break
+        os.write(destination_fd, block)
+        offset += len(block)
+        progress.add(len(block))
+    return offset
+
+
+def _check_not_same_file(source, destination, source_stat):
+    """Raises shutil.SameFileError if destination is source, or a hard link to it."""
+    try:
+        destination_stat = os.stat(destination)
+    except FileNotFoundError:
+        return
+    if (destination_stat.st_dev, destination_stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+        raise shutil.SameFileError(f"{source!r} and {destination!r} are the same file")
+
+
+def _check_not_inside(source, destination):
+    """Raises shutil.Error if the tree destination is source itself or a folder inside it."""
+    source = os.path.realpath(source)
+    destination = os.path.realpath(destination)
+    if os.path.commonpath([source, destination]) == source:
+        raise shutil.Error(f"Cannot copy {source!r} into itself ({destination!r})")
+
+
+def copy_file(source, destination, progress, source_stat=None):
+    """Copies one file with its permissions and times.
+
+    The times are set last, so a half-written file never looks unchanged.
+    Big files go through a PARTIAL_SUFFIX file that a later copy continues.
+    """
+    source_stat = source_stat or os.stat(source)
+    size = source_stat.st_size
+    resumable = size >= RESUME_MIN_SIZE
+    target = destination + PARTIAL_SUFFIX if resumable else destination
+    # Opening the source itself (or a hard link to it) with O_TRUNC would wipe it
+    _check_not_same_file(source, destination, source_stat)
+    # Not O_APPEND: copy_file_range refuses to write to files opened for appending
+    source_fd = os.open(source, os.O_RDONLY)
+    try:
+        destination_fd = os.open(target, os.O_WRONLY | os.O_CREAT | (0 if resumable else os.O_TRUNC), 0o644)
+        try:
+            offset = os.lseek(destination_fd, 0, os.SEEK_END)
+            if offset > size or offset and int(os.fstat(destination_fd).st_mtime) < int(source_stat.st_mtime):
+                # Left over from a different version of the source file
+                os.ftruncate(destination_fd, 0)
+                offset = os.lseek(destination_fd, 0, os.SEEK_SET)
+            if offset:
+                progress.add(offset)
+            _copy_data(source_fd, destination_fd, offset, size, progress)
+        finally:
+            os.close(destination_fd)
+    finally:
+        os.close(source_fd)
+    shutil.copystat(source, target)
+    if resumable:
+        os.replace(target, destination)
+
+
+def _batches(items, size_of):
+    """Groups items into lists of at most BATCH_FILES items and about BATCH_BYTES bytes."""
+    batch, batch_bytes = [], 0
+    for item in items:
+        if batch and (len(batch) >= BATCH_FILES or batch_bytes + size_of(item) > BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += size_of(item)
+    if batch:
+        yield batch
+
+
+def _scan_tree(root):
+    """Returns (directories, files, symlinks) under root, as paths relative to it.
+
+    files holds (relative path, DirEntry) pairs; directories are listed parents first.
+    """
+    directories, files, symlinks = [], [], []
+    pending = [""]
+    while pending:
+        folder = pending.pop()
+        with os.scandir(os.path.join(root, folder)) as entries:
+            for entry in entries:
+                relative = folder + os.sep + entry.name if folder else entry.name
+                if entry.is_symlink():
+                    symlinks.append(relative)
+                elif entry.is_dir():
+                    directories.append(relative)
+                    pending.append(relative)
+                else:
+                    files.append((relative, entry))
+    return directories, files, symlinks
+
+
+def copy(source, destination, compare="size_mtime", workers=DEFAULT_WORKERS, on_progress=None):
+    """Copies a file or a directory tree and returns a summary dict.
+
+    An existing destination tree is updated in place: files that already
+    match are skipped (compare: "size_mtime", "hash" or "none"), so running
+    the same copy again finishes an interrupted one. Symlinks are copied as
+    links. on_progress(done_bytes, total_bytes) is called as data is copied.
+    Like shutil, copying a file onto itself raises SameFileError, and a
+    tree cannot be copied into itself.
+    """
+    started = time.perf_counter()
+    if compare not in COMPARE_MODES:
+        raise ValueError(f"Unknown compare mode {compare!r}; use one of {', '.join(COMPARE_MODES)}")
+    source_stat = os.stat(source)
+    summary = {"files": 0, "copied": 0, "skipped": 0, "bytes": 0, "errors": []}
+
+    if not stat.S_ISDIR(source_stat.st_mode):
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(source))
+        _check_not_same_file(source, destination, source_stat)
+        jobs = [(source, destination, source_stat)]
+    else:
+        _check_not_inside(source, destination)
+        directories, files, symlinks = _scan_tree(source)
+        os.makedirs(destination, exist_ok=True)
+        for directory in directories:
+            os.makedirs(os.path.join(destination, directory), exist_ok=True)
+        for link in symlinks:
+            target = os.path.join(destination, link)
+            if not os.path.lexists(target):
+                os.symlink(os.readlink(os.path.join(source, link)), target)
+        jobs = [(os.path.join(source, path), os.path.join(destination, path), entry.stat()) for path, entry in files]
+
+    summary["files"] = len(jobs)
+    progress = Progress(sum(job[2].st_size for job in jobs), on_progress)
+
+    def run(batch):
+        results = []
+        for source_path, destination_path, file_stat in batch:
+            if is_unchanged(source_path, destination_path, file_stat, compare):
+                progress.add(file_stat.st_size)
+                results.append("skipped")
+                continue
+            try:
+                copy_file(source_path, destination_path, progress, file_stat)
+                results.append("copied")
+            except OSError as e:
+                results.append(f"{source_path}: {e.strerror or str(e)}")
+        return results
+
+    # Largest files first, so one big file does not start last and run alone
+    jobs.sort(key=lambda job: -job[2].st_size)
+    batches = list(_batches(jobs, lambda job: job[2].st_size))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="copy") as pool:
+        for batch, results in zip(batches, pool.map(run, batches)):
+            for job, result in zip(batch, results):
+                if result == "copied":
+                    summary["copied"] += 1
+                    summary["bytes"] += job[2].st_size
+                elif result == "skipped":
+                    summary["skipped"] += 1
+                else:
+                    summary["errors"].append(result)
+
+    if stat.S_ISDIR(source_stat.st_mode):
+        # Directory times last, since copying files into them changed them
+        for directory in reversed(directories):
+            shutil.copystat(os.path.join(source, directory), os.path.join(destination, directory))
+        shutil.copystat(source, destination)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def delete(path, workers=DEFAULT_WORKERS, on_progress=None):
+    """Deletes a file or a directory tree and returns a summary dict.
+
+    Files are unlinked in parallel, then the emptied directories are removed
+    deepest first. on_progress(done_files, total_files) reports the unlinks.
+    """
+    started = time.perf_counter()
+    if not os.path.isdir(path) or os.path.islink(path):
+        os.remove(path)
+        return {"files": 1, "directories": 0, "errors": [], "seconds": time.perf_counter() - started}
+
+    directories, files, symlinks = _scan_tree(path)
+    paths = [os.path.join(path, relative) for relative, _ in files] + [os.path.join(path, link) for link in symlinks]
+    progress = Progress(len(paths), on_progress)
+    errors = []
+
+    def unlink(batch):
+        for file_path in batch:
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append(f"{file_path}: {e.strerror}")
+        progress.add(len(batch))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="delete") as pool:
+        list(pool.map(unlink, _batches(paths, lambda file_path: 0)))
+
+    # Children always come after their parent in directories, so reversed is deepest first
+    for directory in reversed(directories):
+        try:
+            os.rmdir(os.path.join(path, directory))
+        except OSError as e:
+            errors.append(f"{os.path.join(path, directory)}: {e.strerror}")
+    if not errors:
+        os.rmdir(path)
+    return {"files": len(paths), "directories": len(directories) + (not errors), "errors": errors,
+            "seconds": time.perf_counter() - started}
@@ -0,0 +1,407 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableBinding
+
+# =========================================================================
+# MODEL GATEWAY
+# Every call to the chat model goes through one shared gateway:
+# - Token buckets keep requests and tokens per minute under the API quota,
+#   so bursts wait here instead of coming back as 429 errors.
+# - A cap on requests in flight bounds concurrency against the API.
+# - Errors worth retrying (429, 5xx, timeouts, dropped connections) are
+#   retried with exponential backoff and full jitter.
+# - A request whose first token is slow gets a second, hedged copy; the
+#   first one to answer wins and the other is cancelled.
+# - When the primary model keeps failing, a fallback model answers.
+# Retries and hedges happen before the first token is passed on, so a
+# streamed answer is never repeated.
+# =========================================================================
+
+REQUESTS_PER_MINUTE = 15            # Gemini free tier; raise MODEL_RPM for paid keys
+TOKENS_PER_MINUTE = 1_000_000
+MAX_CONCURRENT_REQUESTS = 8
+MAX_ATTEMPTS = 4                    # Per model, counting the first try
+FALLBACK_ATTEMPTS = 2
+BACKOFF_BASE = 0.5                  # Seconds; doubled on every retry...
+BACKOFF_MAX = 20.0                  # ...up to this, then jittered
+HEDGE_AFTER = 4.0                   # Seconds without a first token before a hedged copy is sent
+REQUEST_TIMEOUT = 60.0
+
+# HTTP statuses worth trying again: rate limited, server errors, gateway timeouts
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    """Tells whether a failed model call may succeed when tried again."""
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    code = getattr(error, "code", None)     # google.api_core errors carry the HTTP status
+    if isinstance(code, int):
+        return code in RETRYABLE_CODES
+    cause = error.__cause__
+    return cause is not None and cause is not error and is_retryable(cause)
+
+
+def backoff_delay(attempt, error=None, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Seconds to wait before retry number attempt + 1: full jitter, at least any retry-after the server asked for."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = getattr(error, "retry_after", None)
+    if isinstance(retry_after, (int, float)):
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 units a second, holding at most one minute's worth.
+
+    reserve() takes the units at once and says how long to wait before using
+    them, so callers are served in the order they asked, and a bucket in
+    debt slows down everyone after it.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Takes amount units and returns the seconds to wait until they are really available."""
+        with self.lock:
+            self._refill()
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def try_take(self, amount):
+        """Takes amount units only if they are available right now."""
+        with self.lock:
+            self._refill()
+            if self.level < amount:
+                return False
+            self.level -= amount
+            return True
+
+    def give_back(self, amount):
+        """Returns units that were reserved but not used (negative amounts charge more)."""
+        with self.lock:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets plus a cap on requests in flight."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrent=MAX_CONCURRENT_REQUESTS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrent = max(1, max_concurrent)
+        self.slots = threading.BoundedSemaphore(self.max_concurrent)
+        self.async_slots = weakref.WeakKeyDictionary()   # One asyncio semaphore per event loop
+        self.waited = 0.0
+
+    def _wait_time(self, tokens):
+        wait_time = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self.waited += wait_time
+        return wait_time
+
+    def acquire(self, tokens):
+        """Waits for the rate limits and a free slot; call release() afterwards."""
+        time.sleep(self._wait_time(tokens))
+        self.slots.acquire()
+
+    def release(self):
+        self.slots.release()
+
+    def _async_slots(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_slots:
+            self.async_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        return self.async_slots[loop]
+
+    async def aacquire(self, tokens):
+        await asyncio.sleep(self._wait_time(tokens))
+        await self._async_slots().acquire()
+
+    def arelease(self):
+        self._async_slots().release()
+
+    def try_acquire_spare(self, tokens):
+        """Takes one request and tokens only if the buckets have them to spare (used for hedges)."""
+        if not self.requests.try_take(1):
+            return False
+        if not self.tokens.try_take(tokens):
+            self.requests.give_back(1)
+            return False
+        return True
+
+
+def _describe(model):
+    """The settings that make two models answer differently, for the response cache key."""
+    if model is None:
+        return None
+    if isinstance(model, RunnableBinding):
+        return {**_describe(model.bound), **model.kwargs}
+    return dict(model._identifying_params)
+
+
+def _usage_tokens(message):
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens", 0) if usage else 0
+
+
+# Threads for hedged copies of blocking calls
+_hedge_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS * 2, thread_name_prefix="model-hedge")
+
+
+class ModelGateway(BaseChatModel):
+    """A chat model that sends every call through rate limits, retries, hedging and a fallback model.
+
+    bind_tools() binds the tools on both models and returns a gateway that
+    shares the same limiter and statistics, so the quota is enforced across
+    every tool set the router binds.
+    """
+
+    primary: object
+    fallback: object = None
+    limiter: object = None
+    max_attempts: int = MAX_ATTEMPTS
+    fallback_attempts: int = FALLBACK_ATTEMPTS
+    hedge_after: float = HEDGE_AFTER          # 0 turns hedging off
+    stats: dict = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.limiter is None:
+            self.limiter = RateLimiter()
+        if self.stats is None:
+            self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedges_won": 0, "fallbacks": 0, "failures": 0}
+
+    @property
+    def _llm_type(self):
+        return "model-gateway"
+
+    @property
+    def _identifying_params(self):
+        return {"primary": _describe(self.primary), "fallback": _describe(self.fallback)}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "primary": self.primary.bind_tools(tools, **kwargs),
+            "fallback": self.fallback.bind_tools(tools, **kwargs) if self.fallback is not None else None,
+        })
+
+    def _models(self):
+        yield self.primary, self.max_attempts
+        if self.fallback is not None:
+            yield self.fallback, self.fallback_attempts
+
+    def summary(self):
+        """Describes the retries, hedges and fallbacks so far."""
+        stats = self.stats
+        return (f"Model calls: {stats['calls']}, retries: {stats['retries']}, hedged: {stats['hedges']} "
+                f"(hedge answered first {stats['hedges_won']} times), fallback model used: {stats['fallbacks']}, "
+                f"failed: {stats['failures']}, waited for rate limits: {self.limiter.waited:.1f}s.")
+
+    # ---------------------------------------------------------------------
+    # Blocking calls (the chat loop)
+    # ---------------------------------------------------------------------
+
+    def _invoke_once(self, model, messages, tokens, stop, kwargs, reserved=False):
+        if reserved:
+            self.limiter.slots.acquire()
+        else:
+            self.limiter.acquire(tokens)
+        try:
+            # No callbacks: the gateway's own run reports the result, the inner call would only repeat it
+            message = model.invoke(messages, {"callbacks": []}, stop=stop, **kwargs)
+        finally:
+            self.limiter.release()
+        self.limiter.tokens.give_back(tokens - (_usage_tokens(message) or tokens))
+        return message
+
+    def _invoke_hedged(self, model, messages, tokens, stop, kwargs):
+        if not self.hedge_after:
+            return self._invoke_once(model, messages, tokens, stop, kwargs)
+        first = _hedge_pool.submit(self._invoke_once, model, messages, tokens, stop, kwargs)
+        pending = {first}
+        done, _ = wait(pending, timeout=self.hedge_after)
+        if not done and self.limiter.try_acquire_spare(tokens):
+            self.stats["hedges"] += 1
+            pending.add(_hedge_pool.submit(self._invoke_once, model, messages, tokens, stop, kwargs, True))
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self.stats["hedges_won"] += 1
+                    return future.result()   # The other call finishes in the background
+                error = future.exception()
+        raise error
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.stats["calls"] += 1
+        tokens = count_tokens_approximately(messages)
+        error = None
+        for index, (model, attempts) in enumerate(self._models()):
+            if index:
+                self.stats["fallbacks"] += 1
+            for attempt in range(attempts):
+                try:
+                    message = self._invoke_hedged(model, messages, tokens, stop, kwargs)
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+                except Exception as e:
+                    error = e
+                    if not is_retryable(e) or attempt + 1 == attempts:
+                        break
+                    self.stats["retries"] += 1
+                    time.sleep(backoff_delay(attempt, e))
+        self.stats["failures"] += 1
+        raise error
+
+    # ---------------------------------------------------------------------
+    # Async streaming calls (server mode)
+    # ---------------------------------------------------------------------
+
+    async def _open_stream(self, model, messages, tokens, stop, kwargs, reserved=False):
+        """Starts one streamed call and waits for its first chunk. Returns (stream, first_chunk)."""
+        if reserved:
+            await self.limiter._async_slots().acquire()
+        else:
+            await self.limiter.aacquire(tokens)
+        try:
+            stream = model.astream(messages, {"callbacks": []}, stop=stop, **kwargs)
+            try:
+                first = await anext(stream)
+            except BaseException:
+                await stream.aclose()
+                raise
+        except BaseException:
+            self.limiter.arelease()
+            raise
+        return stream, first
+
+    async def _open_hedged(self, model, messages, tokens, stop, kwargs):
+        first = asyncio.create_task(self._open_stream(model, messages, tokens, stop, kwargs))
+        pending = {first}
+        if self.hedge_after:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done and self.limiter.try_acquire_spare(tokens):
+                self.stats["hedges"] += 1
+                pending.add(asyncio.create_task(self._open_stream(model, messages, tokens, stop, kwargs, True)))
+        winner, error, extra = None, None, []
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        extra.append(task.result())   # Both answered at the same moment
+        finally:
+            for task in pending:
+                task.cancel()
+            # The losers either fail (cancelled) or hand back a stream that is closed unread
+            results = await asyncio.gather(*pending, return_exceptions=True) if pending else []
+            for result in extra + [result for result in results if isinstance(result, tuple)]:
+                await result[0].aclose()
+                self.limiter.arelease()
+        if winner is None:
+            raise error
+        if winner is not first:
+            self.stats["hedges_won"] += 1
+        return winner.result()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.stats["calls"] += 1
+        tokens = count_tokens_approximately(messages)
+        opened, error = None, None
+        for index, (model, attempts) in enumerate(self._models()):
+            if index:
+                self.stats["fallbacks"] += 1
+            for attempt in range(attempts):
+                try:
+                    opened = await self._open_hedged(model, messages, tokens, stop, kwargs)
+                    break
+                except Exception as e:
+                    error = e
+                    if not is_retryable(e) or attempt + 1 == attempts:
+                        break
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(backoff_delay(attempt, e))
+            if opened is not None:
+                break
+        if opened is None:
+            self.stats["failures"] += 1
+            raise error
+
+        # From the first chunk on, errors reach the caller: the tokens already sent cannot be taken back
+        stream, chunk = opened
+        used = 0
+        try:
+            while True:
+                used += _usage_tokens(chunk)
+                generation = ChatGenerationChunk(message=chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+                yield generation
+                try:
+                    chunk = await anext(stream)
+                except StopAsyncIteration:
+                    break
+        finally:
+            await stream.aclose()
+            self.limiter.arelease()
+            self.limiter.tokens.give_back(tokens - (used or tokens))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = [chunk async for chunk in self._astream(messages, stop, run_manager, **kwargs)]
+        message = chunks[0].message
+        for chunk in chunks[1:]:
+            message += chunk.message
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def make_gemini_gateway(model_name, fallback_name=None, cache=None):
+    """Builds the gateway around Gemini, with the limits from the MODEL_* settings in the environment."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    def gemini(name):
+        # max_retries=1 means one attempt: the gateway retries without blocking the event loop
+        return ChatGoogleGenerativeAI(model=name, temperature=0, max_retries=1,
+                                      timeout=float(os.getenv("MODEL_TIMEOUT", REQUEST_TIMEOUT)))
+
+    primary = gemini(model_name)
+    fallback = None
+    if fallback_name:
+        fallback = gemini(fallback_name)
+        # One client (a single multiplexed gRPC channel) serves both models
+        fallback.client = primary.client
+
+    limiter = RateLimiter(
+        requests_per_minute=float(os.getenv("MODEL_RPM", REQUESTS_PER_MINUTE)),
+        tokens_per_minute=float(os.getenv("MODEL_TPM", TOKENS_PER_MINUTE)),
+        max_concurrent=int(os.getenv("MODEL_MAX_CONCURRENT", MAX_CONCURRENT_REQUESTS)),
+    )
+    return ModelGateway(
+        primary=primary, fallback=fallback, limiter=limiter, cache=cache,
+        max_attempts=int(os.getenv("MODEL_MAX_ATTEMPTS", MAX_ATTEMPTS)),
+        hedge_after=float(os.getenv("MODEL_HEDGE_AFTER", HEDGE_AFTER)),
+    )
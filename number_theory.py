@@ -0,0 +1,213 @@
+import itertools
+import math
+import random
+import time
+
+# =========================================================================
+# NUMBER THEORY ENGINE
+# Primality testing, prime sieving and factorisation for numbers far past
+# what trial division can handle:
+# - Miller-Rabin with fixed bases, which is exact below 3.3 * 10^24 and
+#   adds random bases (a tiny error chance) above that.
+# - A segmented sieve of Eratosthenes over odd numbers in a bytearray, so
+#   ranges are sieved one cache-sized piece at a time with slice writes.
+# - Pollard's rho (Brent's variant) for factors trial division cannot reach.
+# =========================================================================
+
+MIN_SEGMENT_SIZE = 1 << 20       # Odd numbers per sieve segment (1 MiB of flags)...
+MAX_SEGMENT_SIZE = 1 << 23       # ...growing with sqrt(high) so every base prime hits each segment
+MAX_SIEVE_RANGE = 10 ** 9        # Widest range primes_in_range/count_primes accept (a few seconds)
+MAX_SIEVE_HIGH = 10 ** 14        # Above this the sieve's base primes get too many...
+MAX_TESTED_RANGE = 10 ** 5       # ...so narrower ranges are checked number by number
+MAX_FACTOR_SECONDS = 10          # Time budget for one factorisation
+MAX_DIGITS = 200
+
+# Miller-Rabin with the first 13 primes as bases is exact for n below this
+DETERMINISTIC_LIMIT = 3317044064679887385961981
+EXACT_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+RANDOM_ROUNDS = 20               # Extra random bases above DETERMINISTIC_LIMIT
+
+
+class NumberTheoryError(ValueError):
+    """Raised when an input is out of range or a computation runs out of time."""
+
+
+def _small_primes(limit):
+    flags = bytearray([1]) * (limit + 1)
+    flags[0:2] = b"\x00\x00"
+    for p in range(2, math.isqrt(limit) + 1):
+        if flags[p]:
+            flags[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    return list(itertools.compress(range(limit + 1), flags))
+
+
+SMALL_PRIMES = _small_primes(1000)
+
+
+def _check(n):
+    if not isinstance(n, int):
+        raise NumberTheoryError(f"{n!r} is not a whole number.")
+    if len(str(abs(n))) > MAX_DIGITS:
+        raise NumberTheoryError(f"Numbers are limited to {MAX_DIGITS} digits.")
+
+
+# =========================================================================
+# PRIMALITY
+# =========================================================================
+
+def _strong_probable_prime(n, a, d, s):
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def is_prime(n):
+    """Tells whether n is prime; exact below DETERMINISTIC_LIMIT, with error below 4^-20 above it."""
+    _check(n)
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    bases = list(EXACT_BASES)
+    if n >= DETERMINISTIC_LIMIT:
+        bases += [random.randrange(2, n - 1) for _ in range(RANDOM_ROUNDS)]
+    return all(_strong_probable_prime(n, a, d, s) for a in bases)
+
+
+# =========================================================================
+# SEGMENTED SIEVE
+# =========================================================================
+
+def _segments(low, high):
+    """Yields (first_odd, flags) for the odd numbers in [low, high); flags[i] is 1 when first_odd + 2i is prime."""
+    if high > MAX_SIEVE_HIGH:
+        # Too far out to sieve; test each odd number instead
+        if high - low > MAX_TESTED_RANGE:
+            raise NumberTheoryError(f"Above {MAX_SIEVE_HIGH:,} ranges are limited to {MAX_TESTED_RANGE:,} numbers.")
+        start = max(low, 3) | 1
+        yield start, bytearray(is_prime(n) for n in range(start, high, 2))
+        return
+    if high - low > MAX_SIEVE_RANGE:
+        raise NumberTheoryError(f"Ranges are limited to {MAX_SIEVE_RANGE:,} numbers.")
+    root = math.isqrt(max(high, 4))
+    base_primes = _small_primes(root)[1:]   # Odd primes up to sqrt(high)
+    # The loop over base primes runs in Python once per segment, so fewer, larger segments win
+    segment_size = min(MAX_SEGMENT_SIZE, max(MIN_SEGMENT_SIZE, root))
+    start = max(low, 3) | 1
+    while start < high:
+        count = min(segment_size, (high - start + 1) // 2)
+        flags = bytearray([1]) * count
+        end = start + 2 * count        # First odd number past this segment
+        for p in base_primes:
+            if p * p >= end:
+                break
+            # First odd multiple of p that is >= start and >= p*p
+            first = max(p * p, (start + p - 1) // p * p)
+            if first % 2 == 0:
+                first += p
+            index = (first - start) // 2
+            if index < count:
+                flags[index::p] = bytes(len(range(index, count, p)))
+        yield start, flags
+        start = end
+
+
+def count_primes(low, high):
+    """Counts the primes p with low <= p < high."""
+    total = 1 if low <= 2 < high else 0
+    for _, flags in _segments(low, high):
+        total += flags.count(1)
+    return total
+
+
+def primes_in_range(low, high, max_results=None):
+    """Returns (primes, total) for low <= p < high; at most max_results primes are listed, all are counted."""
+    total = 1 if low <= 2 < high else 0
+    primes = [2] if total and max_results != 0 else []
+    for start, flags in _segments(low, high):
+        found = flags.count(1)
+        if max_results is None or len(primes) < max_results:
+            index = flags.find(1)
+            while index != -1 and (max_results is None or len(primes) < max_results):
+                primes.append(start + 2 * index)
+                index = flags.find(1, index + 1)
+        total += found
+    return primes, total
+
+
+# =========================================================================
+# FACTORISATION
+# =========================================================================
+
+def _pollard_brent(n, deadline):
+    """Returns a non-trivial factor of the odd composite n."""
+    while True:
+        y, c, m = random.randrange(1, n), random.randrange(1, n), 128
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                if time.monotonic() > deadline:
+                    raise NumberTheoryError(f"Could not factor within {MAX_FACTOR_SECONDS} seconds.")
+                ys = y
+                # Multiply m differences together and take one gcd for all of them
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # The batch overshot; step through it one at a time
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+        if 1 < g < n:
+            return g
+
+
+def factorize(n):
+    """Returns the prime factorisation of n as a sorted list of (prime, exponent)."""
+    _check(n)
+    if n < 2:
+        raise NumberTheoryError("Only whole numbers of 2 or more can be factored.")
+    factors = {}
+    for p in SMALL_PRIMES:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    deadline = time.monotonic() + MAX_FACTOR_SECONDS
+    pending = [n] if n > 1 else []
+    while pending:
+        m = pending.pop()
+        if is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+            continue
+        root = math.isqrt(m)
+        if root * root == m:
+            pending += [root, root]
+            continue
+        d = _pollard_brent(m, deadline)
+        pending += [d, m // d]
+    return sorted(factors.items())
+
+
+def format_factors(factors):
+    return " × ".join(f"{p}^{e}" if e > 1 else str(p) for p, e in factors)
@@ -0,0 +1,294 @@
+import bisect
+import csv
+import math
+import mmap
+import operator
+import os
+import struct
+from array import array
+from itertools import repeat
+
+# =========================================================================
+# NUMERIC STATISTICS
+# Summaries of large sets of numbers, given inline or as a file (CSV,
+# plain text or raw binary). Values are kept in a compact array of
+# doubles instead of a list of Python floats; binary files are memory
+# mapped and converted a chunk at a time. The values are sorted in runs
+# into a second array, and the median, every percentile and the
+# histogram come from binary searches in those runs.
+# =========================================================================
+
+# Raw binary formats and their array typecodes (native byte order)
+BINARY_FORMATS = {
+    "float64": "d", "float32": "f",
+    "int8": "b", "uint8": "B", "int16": "h", "uint16": "H",
+    "int32": "i", "uint32": "I", "int64": "q", "uint64": "Q",
+}
+BINARY_CHUNK = 1024 * 1024        # Bytes of a binary file converted at a time
+RUN_SIZE = 64 * 1024              # Values sorted at a time, the only ones boxed into Python floats
+DEFAULT_PERCENTILES = (25, 50, 75, 90, 99)
+DEFAULT_BINS = 10
+MAX_BINS = 50
+
+# Lowest score for each grade, highest grade first; anything lower fails
+GRADE_THRESHOLDS = ((85, "A1"), (70, "B"), (60, "C"), (50, "D"))
+FAIL_GRADE = "Fail"
+
+
+class StatsError(ValueError):
+    """Raised when the input holds no usable numbers or cannot be read."""
+
+
+def grade_for(score):
+    """Returns the letter grade for one score."""
+    for threshold, grade in GRADE_THRESHOLDS:
+        if score >= threshold:
+            return grade
+    return FAIL_GRADE
+
+
+# =========================================================================
+# LOADING
+# =========================================================================
+
+def _to_float(text):
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    # nan and inf are not measurements, and would turn the median and histogram into nan
+    return value if math.isfinite(value) else None
+
+
+def parse_numbers(text):
+    """Reads numbers separated by commas, semicolons or whitespace. Returns (values, skipped)."""
+    values = array("d")
+    skipped = 0
+    for token in text.replace(",", " ").replace(";", " ").split():
+        value = _to_float(token)
+        if value is None:
+            skipped += 1
+        else:
+            values.append(value)
+    return values, skipped
+
+
+def _read_binary(path, binary_format):
+    typecode = BINARY_FORMATS.get(binary_format)
+    if typecode is None:
+        raise StatsError(f"Unknown binary format {binary_format!r}; use one of {', '.join(BINARY_FORMATS)}.")
+    values = array("d")
+    skipped = 0
+    if os.path.getsize(path) == 0:
+        return values, 0
+    itemsize = array(typecode).itemsize
+    chunk = BINARY_CHUNK - BINARY_CHUNK % itemsize
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            usable = len(view) - len(view) % itemsize
+            for start in range(0, usable, chunk):
+                with view[start:min(start + chunk, usable)] as block, block.cast(typecode) as items:
+                    if typecode not in "df":
+                        values.extend(items)
+                    elif all(map(math.isfinite, items)):
+                        if typecode == "d":
+                            values.frombytes(block)   # Already doubles: a plain copy
+                        else:
+                            values.extend(items)
+                    else:
+                        # Drop NaNs and infinities
+                        count = len(values)
+                        values.extend(filter(math.isfinite, items))
+                        skipped += len(items) - (len(values) - count)
+    return values, skipped
+
+
+def _read_csv(path, column):
+    """Streams one column of a CSV file. column is a header name or a 1-based number; empty means the first numeric column."""
+    values = array("d")
+    skipped = 0
+    with open(path, newline="") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t ")
+        except csv.Error:
+            dialect = csv.excel
+        rows = csv.reader(f, dialect)
+        first = next(rows, None)
+        if first is None:
+            return values, 0
+
+        index = None
+        has_header = any(cell.strip() and _to_float(cell) is None for cell in first)
+        if column.strip().isdigit():
+            index = int(column) - 1
+            if index < 0:
+                raise StatsError("Column numbers start at 1.")
+        elif column:
+            names = [cell.strip().lower() for cell in first]
+            if not has_header or column.strip().lower() not in names:
+                raise StatsError(f"No column named {column!r}; the columns are: {', '.join(first)}")
+            index = names.index(column.strip().lower())
+        if not has_header:
+            rows = _chain_row(first, rows)
+        if index is None:
+            # First column whose first data cell is a number
+            for row in rows:
+                numeric = [i for i, cell in enumerate(row) if _to_float(cell) is not None]
+                if numeric:
+                    index = numeric[0]
+                    rows = _chain_row(row, rows)
+                    break
+            else:
+                return values, 0
+
+        append = values.append
+        for row in rows:
+            value = _to_float(row[index]) if index < len(row) else None
+            if value is None:
+                skipped += 1
+            else:
+                append(value)
+    return values, skipped
+
+
+def _chain_row(row, rows):
+    yield row
+    yield from rows
+
+
+def _read_text(path):
+    values = array("d")
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            line_values, line_skipped = parse_numbers(line)
+            values.extend(line_values)
+            skipped += line_skipped
+    return values, skipped
+
+
+def load_file(path, column="", binary_format=""):
+    """Reads the numbers in a file. Returns (values, skipped) where values is an array of doubles.
+
+    binary_format (like "float64" or "int32") reads the file as raw numbers;
+    .csv and .tsv files are read one column at a time; other files are read
+    as text with numbers separated by commas or whitespace.
+    """
+    if binary_format:
+        return _read_binary(path, binary_format)
+    if path.lower().endswith((".csv", ".tsv")):
+        return _read_csv(path, column)
+    return _read_text(path)
+
+
+# =========================================================================
+# SUMMARIES
+# =========================================================================
+
+def _order_key(value):
+    """An integer that sorts like the double value."""
+    bits = struct.unpack("<q", struct.pack("<d", value))[0]
+    return bits if bits >= 0 else bits ^ 0x7FFFFFFFFFFFFFFF
+
+
+def _from_order_key(key):
+    bits = key if key >= 0 else key ^ 0x7FFFFFFFFFFFFFFF
+    return struct.unpack("<d", struct.pack("<q", bits))[0]
+
+
+class SortedRuns:
+    """The values sorted in runs of RUN_SIZE, all kept in one array of doubles.
+
+    Sorting run by run boxes only RUN_SIZE values into Python floats at a
+    time. Ranks come from a binary search in every run.
+    """
+
+    def __init__(self, values):
+        # Allocated at full size once; growing it would copy it along the way
+        self.values = array("d", [0.0]) * len(values)
+        self.runs = []            # (start, end) of each sorted run in self.values
+        for start in range(0, len(values), RUN_SIZE):
+            end = min(start + RUN_SIZE, len(values))
+            self.values[start:end] = array("d", sorted(values[start:end]))
+            self.runs.append((start, end))
+        self.min = min(self.values[start] for start, _ in self.runs)
+        self.max = max(self.values[end - 1] for _, end in self.runs)
+
+    def __len__(self):
+        return len(self.values)
+
+    def count_below(self, value):
+        return sum(bisect.bisect_left(self.values, value, start, end) - start for start, end in self.runs)
+
+    def count_at_most(self, value):
+        return sum(bisect.bisect_right(self.values, value, start, end) - start for start, end in self.runs)
+
+    def kth(self, k):
+        """The k-th smallest value, counting from 0."""
+        if len(self.runs) == 1:
+            return self.values[k]
+        # Bisect the doubles between min and max (at most 64 steps) for the
+        # smallest one with more than k values at or below it
+        low, high = _order_key(self.min), _order_key(self.max)
+        while low < high:
+            middle = (low + high) // 2
+            if self.count_at_most(_from_order_key(middle)) > k:
+                high = middle
+            else:
+                low = middle + 1
+        return _from_order_key(low) + 0.0     # -0.0 and 0.0 count as equal; report 0.0
+
+
+def _percentile(ordered, percent):
+    """Linear interpolation between the closest ranks, like NumPy's default."""
+    position = (len(ordered) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    low = ordered.kth(lower)
+    high = ordered.kth(upper) if upper != lower else low
+    return low + (high - low) * (position - lower)
+
+
+def describe(values, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS):
+    """Returns count, sum, mean, std (sample), min, max, median, percentiles and a histogram."""
+    count = len(values)
+    if count == 0:
+        raise StatsError("There are no numbers to summarize.")
+    total = math.fsum(values)
+    mean = total / count
+    # Deviations from the mean keep the variance accurate for large, close
+    # values; they are streamed into sumprod, not stored
+    variance = math.sumprod(map(operator.sub, values, repeat(mean)),
+                            map(operator.sub, values, repeat(mean))) / (count - 1) if count > 1 else 0.0
+    ordered = SortedRuns(values)
+
+    summary = {
+        "count": count, "sum": total, "mean": mean, "std": math.sqrt(variance),
+        "min": ordered.min, "max": ordered.max, "median": _percentile(ordered, 50),
+        "percentiles": {p: _percentile(ordered, p) for p in percentiles},
+        "histogram": [],
+    }
+    bins = max(0, min(bins, MAX_BINS))
+    if bins and ordered.max > ordered.min:
+        width = (ordered.max - ordered.min) / bins
+        edges = [ordered.min + width * i for i in range(bins)] + [ordered.max]
+        # Bins are [low, high), except the last one, which includes the maximum
+        positions = [ordered.count_below(edge) for edge in edges[:-1]] + [count]
+        summary["histogram"] = [(edges[i], edges[i + 1], positions[i + 1] - positions[i]) for i in range(bins)]
+    elif bins:
+        summary["histogram"] = [(ordered.min, ordered.min, count)]
+    return summary
+
+
+def grade_counts(values):
+    """Counts how many values get each grade, best grade first."""
+    counts = {}
+    remaining = len(values)       # Values below every threshold seen so far
+    for threshold, grade in GRADE_THRESHOLDS:
+        below = sum(map(operator.lt, values, repeat(threshold)))
+        counts[grade] = remaining - below
+        remaining = below
+    counts[FAIL_GRADE] = remaining
+    return counts
@@ -0,0 +1,39 @@
+import os
+
+# =========================================================================
+# PARALLEL TOOLS
+# When the model asks for several tools in one message (say disk usage,
+# system info and a file listing), they are independent. The agent sends
+# each call to the tool node as its own task, and LangGraph runs the tasks
+# of a step at the same time, up to the graph's max_concurrency. Results
+# come back in the order the model asked for them, and a tool that raises
+# only turns its own result into an error message.
+# =========================================================================
+
+# How many tool calls may run at once; MAX_PARALLEL_TOOLS in .env overrides it
+DEFAULT_MAX_PARALLEL_TOOLS = 8
+
+
+def max_parallel_tools():
+    """The limit on tool calls running at once, for the agent's max_concurrency."""
+    return max(1, int(os.getenv("MAX_PARALLEL_TOOLS", DEFAULT_MAX_PARALLEL_TOOLS)))
+
+
+def make_tool_node(tools):
+    """The agent's tool node; every exception is caught so one failing tool never aborts the others."""
+    from langgraph.prebuilt import ToolNode
+
+    return ToolNode(tools, handle_tool_errors=True)
+
+
+def use_tool_threads(loop, turns=1):
+    """Gives loop a default executor big enough for max_concurrency tools in each of turns turns.
+
+    Sync tools called from async code run on the loop's default executor,
+    which asyncio caps at min(32, CPUs + 4) threads, below the limit on
+    small machines.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_parallel_tools() * max(1, turns),
+                                                 thread_name_prefix="tool"))
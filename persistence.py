@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+
+# =========================================================================
+# PERSISTENCE HELPERS
+# Small building blocks shared by the stores that save data to disk:
+# atomic file replacement and append-only JSON-lines journals.
+# =========================================================================
+
+
+def atomic_write_text(path, text):
+    """Writes text to path so readers see either the old or the new file, never half of one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class Journal:
+    """An append-only file of JSON records, one per line."""
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+
+    def read(self):
+        """Returns the records in the journal and whether a damaged tail was found.
+
+        A crash in the middle of an append can leave a partial last line;
+        everything from the first unreadable line on is ignored.
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records, False
+        with open(self.path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    return records, True
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    return records, True
+        return records, False
+
+    def append(self, record):
+        """Appends one record and makes sure it reached the disk."""
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def rewrite(self, records):
+        """Atomically replaces the whole journal with the given records."""
+        self.close()
+        atomic_write_text(self.path, "".join(json.dumps(record) + "\n" for record in records))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
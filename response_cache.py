@@ -0,0 +1,162 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+# =========================================================================
+# RESPONSE CACHES
+# Two levels of caching:
+# 1. Tool results: pure tools (same input, same answer) keep their recent
+#    results in memory, with least-recently-used eviction.
+# 2. Model responses: answers from the chat model are kept on disk, keyed
+#    by the conversation so far plus the bound tool schemas, so a repeated
+#    prompt is answered without calling the API.
+# =========================================================================
+
+TOOL_CACHE_SIZE = 1024
+LLM_CACHE_PATH = "llm_cache.sqlite"
+LLM_CACHE_TTL = 7 * 24 * 3600       # Seconds a cached model response stays valid
+LLM_CACHE_MAX_ENTRIES = 5000
+
+# Message fields that change from run to run without changing the conversation
+IGNORED_KEYS = ("id", "tool_call_id", "response_metadata", "usage_metadata")
+
+
+class ToolResultCache:
+    """An in-memory LRU cache for the results of pure tools."""
+
+    def __init__(self, max_size=TOOL_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def memoize(self, func):
+        """Decorator for functions whose result depends only on their arguments.
+
+        Put it below @tool so the tool keeps the function's signature and docstring.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__qualname__, json.dumps([args, kwargs], sort_keys=True, default=repr))
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return self.entries[key]
+                self.misses += 1
+            result = func(*args, **kwargs)
+            with self.lock:
+                self.entries[key] = result
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+            return result
+
+        return wrapper
+
+    def clear(self):
+        """Forgets every cached result (the hit and miss counts are kept)."""
+        with self.lock:
+            self.entries.clear()
+
+
+def _normalise_prompt(prompt):
+    """Removes the parts of serialised messages that differ between identical conversations."""
+    def clean(value):
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items() if k not in IGNORED_KEYS}
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        if isinstance(value, str):
+            return " ".join(value.split())
+        return value
+
+    try:
+        return json.dumps(clean(json.loads(prompt)), sort_keys=True)
+    except ValueError:
+        return prompt
+
+
+class DiskLLMCache(BaseCache):
+    """A SQLite-backed cache of chat model responses with a TTL and a size cap."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def _key(prompt, llm_string):
+        text = _normalise_prompt(prompt) + "\0" + llm_string
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+        with warnings.catch_warnings():
+            # loads() warns that it is in beta on every call
+            warnings.simplefilter("ignore")
+            return loads(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, dumps(list(return_val)), now, now),
+            )
+            # Expire old entries, then evict the least recently used ones over the cap
+            self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.db.commit()
+
+    def clear(self, **kwargs):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+
+def make_llm_cache():
+    """Builds the model response cache from the LLM_CACHE* settings in the environment.
+
+    Returns None when LLM_CACHE=off, so the model is called every time.
+    """
+    if os.getenv("LLM_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    return DiskLLMCache(
+        path=os.getenv("LLM_CACHE_PATH", LLM_CACHE_PATH),
+        ttl=float(os.getenv("LLM_CACHE_TTL", LLM_CACHE_TTL)),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", LLM_CACHE_MAX_ENTRIES)),
+    )
@@ -0,0 +1,194 @@
+import heapq
+import threading
+import time
+
+from persistence import Journal
+
+# =========================================================================
+# TIMER AND REMINDER SCHEDULER
+# Timers wait in a heap ordered by due time and are fired by a background
+# thread, so setting a timer returns immediately. Every change is appended
+# to a journal file, so pending timers survive a restart; timers that came
+# due while the assistant was closed fire as soon as it starts again.
+# Each timer records the session that set it, and a session only sees and
+# cancels its own.
+# =========================================================================
+
+JOURNAL_PATH = "timers.journal"
+COMPACT_MIN_OPERATIONS = 1000
+
+
+class Scheduler:
+    """Fires timers at their due time and calls on_fire(timer) for each one.
+
+    `clock` returns the current time in seconds. Passing a fake clock and
+    calling run_due() directly lets the scheduler run without the thread.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, clock=time.time, on_fire=None, fsync=True):
+        self.journal = Journal(path, fsync=fsync)
+        self.clock = clock
+        self.on_fire = on_fire
+        self.timers = {}          # timer ID -> timer
+        self.heap = []            # (due, timer ID); cancelled timers are skipped lazily
+        self.next_id = 1
+        self.operations = 0
+        self.condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self.timers)
+
+    # ---------------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------------
+
+    def load(self, path=None):
+        """Restores pending timers from the journal and returns how many there are.
+
+        With path, timers are kept in that journal instead of the one given when
+        the scheduler was made (the server keeps its sessions' timers apart).
+        """
+        with self.condition:
+            if path is not None and path != self.journal.path:
+                self.journal.close()
+                self.journal = Journal(path, fsync=self.journal.fsync)
+            self.timers = {}
+            self.next_id = 1
+            records, damaged = self.journal.read()
+            for record in records:
+                self._apply(record)
+            self.heap = [(timer["due"], timer["id"]) for timer in self.timers.values()]
+            heapq.heapify(self.heap)
+            self.operations = len(records)
+            if damaged:
+                self._compact()
+            self.condition.notify()
+            return len(self.timers)
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "snapshot":
+            self.timers = {timer["id"]: timer for timer in record["timers"]}
+            self.next_id = record["next_id"]
+        elif op == "add":
+            timer = record["timer"]
+            self.timers[timer["id"]] = timer
+            self.next_id = max(self.next_id, timer["id"] + 1)
+        elif op == "remove":
+            self.timers.pop(record["id"], None)
+
+    def _write(self, record):
+        self._apply(record)
+        self.journal.append(record)
+        self.operations += 1
+        if self.operations >= max(COMPACT_MIN_OPERATIONS, 2 * len(self.timers)):
+            self._compact()
+
+    def _compact(self):
+        self.journal.rewrite([{"op": "snapshot", "next_id": self.next_id, "timers": list(self.timers.values())}])
+        self.operations = 1
+        # Drop cancelled and fired entries from the heap as well
+        self.heap = [(timer["due"], timer["id"]) for timer in self.timers.values()]
+        heapq.heapify(self.heap)
+
+    # ---------------------------------------------------------------------
+    # Timers
+    # ---------------------------------------------------------------------
+
+    def add(self, due, message, kind="timer", todo_id=None, owner=None):
+        """Schedules a timer at `due` (seconds since the epoch) for the session owner and returns it."""
+        with self.condition:
+            timer = {
+                "id": self.next_id,
+                "due": due,
+                "message": message,
+                "kind": kind,
+                "todo_id": todo_id,
+                "owner": owner,
+                "created": self.clock(),
+            }
+            self._write({"op": "add", "timer": timer})
+            heapq.heappush(self.heap, (due, timer["id"]))
+            # Wake the thread in case this timer is due before the one it waits for
+            self.condition.notify()
+            return timer
+
+    @staticmethod
+    def _owned_by(timer, owner):
+        # Timers saved before timers had owners belong to everyone
+        return owner is None or timer.get("owner") in (None, owner)
+
+    def cancel(self, timer_id, owner=None):
+        """Cancels a pending timer. Returns the timer, or None if the ID is unknown or belongs to another owner."""
+        with self.condition:
+            timer = self.timers.get(timer_id)
+            if timer is not None and not self._owned_by(timer, owner):
+                timer = None
+            if timer is not None:
+                self._write({"op": "remove", "id": timer_id})
+            return timer
+
+    def pending(self, owner=None):
+        """Returns the pending timers (with owner, only that session's), soonest first."""
+        with self.condition:
+            timers = [timer for timer in self.timers.values() if self._owned_by(timer, owner)]
+            return sorted(timers, key=lambda timer: (timer["due"], timer["id"]))
+
+    def _next_due(self):
+        while self.heap and self.heap[0][1] not in self.timers:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def run_due(self, now=None):
+        """Fires every timer that is due by `now` and returns them in firing order."""
+        now = self.clock() if now is None else now
+        fired = []
+        with self.condition:
+            while True:
+                due = self._next_due()
+                if due is None or due > now:
+                    break
+                _, timer_id = heapq.heappop(self.heap)
+                fired.append(self.timers[timer_id])
+                self._write({"op": "remove", "id": timer_id})
+        # Call back outside the lock so a callback can schedule new timers
+        for timer in fired:
+            if self.on_fire is not None:
+                try:
+                    self.on_fire(timer)
+                except Exception as e:
+                    print(f"\nError in timer #{timer['id']}: {str(e)}")
+        return fired
+
+    # ---------------------------------------------------------------------
+    # Background thread
+    # ---------------------------------------------------------------------
+
+    def start(self):
+        """Starts the thread that fires timers when they come due."""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self.condition:
+            self._stopped = True
+            self.condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.journal.close()
+
+    def _run(self):
+        while True:
+            self.run_due()
+            with self.condition:
+                if self._stopped:
+                    return
+                due = self._next_due()
+                timeout = None if due is None else max(0.0, due - self.clock())
+                if timeout is None or timeout > 0:
+                    self.condition.wait(timeout)
@@ -0,0 +1,340 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import agent
+import console
+import parallel_tools
+import todo_store
+import tracing
+from session import (
+    new_session_memory, restore_session_state, session_memory, session_state, shell_job_manager, timer_scheduler,
+)
+
+# =========================================================================
+# HEADLESS SERVER
+# Runs the assistant without the chat prompt, for scripts and services.
+# Requests come in as JSON lines on stdin or as POST /chat on a local
+# HTTP port, and the answer streams back token by token as JSON lines.
+# A fixed number of workers run turns concurrently with the agent's async
+# API; the request queue is bounded, so when it is full stdin is no longer
+# read and HTTP clients get "503 busy" (backpressure). Each session gets
+# its own memory, to-do list and conversation thread.
+# =========================================================================
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_PORT = 8765
+MAX_SESSIONS = 1000               # Least recently used sessions are closed past this
+SESSION_DIR = "sessions"          # Per-session to-do journals of older versions, imported once
+TIMERS_PATH = os.path.join(SESSION_DIR, "timers.journal")   # Kept apart from the chat loop's timers
+LATENCY_SAMPLES = 10000           # Recent turn times kept for the statistics
+
+
+class Session:
+    """One client conversation: its own memory, to-do list and checkpointer thread."""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)[:40]
+        name = f"{safe}-{hashlib.sha256(session_id.encode()).hexdigest()[:8]}"
+        # Name, preferences, to-dos and summary are saved in the session's own namespace
+        self.state = session_state.namespace(f"session:{session_id}")
+        todo_list = todo_store.TodoStore(
+            os.path.join(SESSION_DIR, f"{name}.todo.journal"),
+            legacy_path=os.path.join(SESSION_DIR, f"{name}.todo.json"),  # Never imports the chat loop's list
+            state=self.state,
+        )
+        todo_list.load()
+        self.memory = new_session_memory(todo_list, self.state)
+        restore_session_state(self.memory)
+        self.lock = asyncio.Lock()    # One turn at a time per conversation
+
+
+class Server:
+    """Runs chat turns for many sessions on a bounded pool of async workers."""
+
+    def __init__(self, agent_executor, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.agent_executor = agent_executor
+        self.workers = max(1, workers)
+        self.queue = asyncio.Queue(max(1, queue_size))
+        self.sessions = OrderedDict()
+        self.started = time.perf_counter()
+        self.served = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    # ---------------------------------------------------------------------
+    # Sessions
+    # ---------------------------------------------------------------------
+
+    def session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id)
+            for old_id in list(self.sessions)[:max(0, len(self.sessions) - MAX_SESSIONS)]:
+                if not self.sessions[old_id].lock.locked():
+                    self.close_session(old_id)
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.memory["todo_list"].close()
+            session_state.forget(session.state.namespace)    # Saved, just no longer cached
+            self.agent_executor.checkpointer.delete_thread(session.memory["thread_id"])
+
+    # ---------------------------------------------------------------------
+    # Turns
+    # ---------------------------------------------------------------------
+
+    async def run_turn(self, request, emit):
+        """Runs one request and reports it through emit(event): token and tool events, then done or error."""
+        request_id = request.get("id")
+        session_id = str(request.get("session") or "default")
+        started = time.perf_counter()
+
+        async def send(event, **fields):
+            await emit({"id": request_id, "session": session_id, "event": event, **fields})
+
+        try:
+            if request.get("close"):
+                session = self.sessions.get(session_id)
+                if session is not None:
+                    async with session.lock:
+                        self.close_session(session_id)
+                await send("closed")
+                return
+            message = request.get("message")
+            if not isinstance(message, str) or not message.strip():
+                raise ValueError("The request needs a non-empty 'message'.")
+
+            session = self.session(session_id)
+            parts = []
+            async with session.lock:
+                with session_memory.use(session.memory):
+                    async for chunk, metadata in self.agent_executor.astream(
+                        {"messages": [{"role": "user", "content": message}]},
+                        {"configurable": {"thread_id": session.memory["thread_id"]},
+                         "callbacks": tracing.tracer.callbacks()},
+                        stream_mode="messages",
+                    ):
+                        # Tokens of the summariser in the memory hook are not part of the answer
+                        node = metadata.get("langgraph_node")
+                        if node == "agent":
+                            text = console.message_text(chunk.content)
+                            if text:
+                                parts.append(text)
+                                await send("token", text=text)
+                        elif node == "tools" and chunk.type == "tool":
+                            await send("tool", name=chunk.name)
+            seconds = time.perf_counter() - started
+            self.served += 1
+            self.latencies.append(seconds)
+            await send("done", text="".join(parts), seconds=round(seconds, 3))
+        except Exception as e:
+            self.failed += 1
+            try:
+                await send("error", error=str(e))
+            except Exception:
+                pass   # The client has gone away
+
+    async def worker(self):
+        while True:
+            request, emit, finished = await self.queue.get()
+            try:
+                await self.run_turn(request, emit)
+            finally:
+                if finished is not None:
+                    finished.set()
+                self.queue.task_done()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "served": self.served,
+            "failed": self.failed,
+            "queued": self.queue.qsize(),
+            "sessions": len(self.sessions),
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(self.served / elapsed, 2) if elapsed else 0.0,
+            "p50_seconds": round(statistics.median(latencies), 3) if latencies else None,
+            "p95_seconds": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+        }
+
+    # ---------------------------------------------------------------------
+    # stdin / stdout
+    # ---------------------------------------------------------------------
+
+    async def serve_stdin(self, output):
+        """Reads one JSON request per line until end of input, writing events to output."""
+
+        async def emit(event):
+            output.write(json.dumps(event) + "\n")
+            output.flush()
+
+        parallel_tools.use_tool_threads(asyncio.get_running_loop(), self.workers)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        lines = asyncio.Queue(1)
+        threading.Thread(target=_read_lines, args=(asyncio.get_running_loop(), lines),
+                         name="stdin-reader", daemon=True).start()
+        while True:
+            line = await lines.get()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Each line must be a JSON object.")
+            except ValueError as e:
+                await emit({"id": None, "event": "error", "error": f"Invalid request: {str(e)}"})
+                continue
+            # Waits while the queue is full, which stops reading stdin
+            await self.queue.put((request, emit, None))
+        await self.queue.join()
+        for task in workers:
+            task.cancel()
+
+    # ---------------------------------------------------------------------
+    # HTTP
+    # ---------------------------------------------------------------------
+
+    async def serve_http(self, host, port):
+        """Serves POST /chat (streams JSON lines) and GET /stats until interrupted."""
+        parallel_tools.use_tool_threads(asyncio.get_running_loop(), self.workers)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self.handle_http, host, port)
+        print(f"Listening on http://{host}:{port} (POST /chat, GET /stats)", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def handle_http(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            method, path = request_line[:2] if len(request_line) >= 2 else ("", "")
+
+            if method == "GET" and path == "/stats":
+                await _respond(writer, "200 OK", self.stats())
+            elif method == "POST" and path == "/chat":
+                try:
+                    request = json.loads(body)
+                    if not isinstance(request, dict):
+                        raise ValueError("The body must be a JSON object.")
+                except ValueError as e:
+                    await _respond(writer, "400 Bad Request", {"error": f"Invalid request: {str(e)}"})
+                    return
+                await self.stream_chat(request, writer)
+            else:
+                await _respond(writer, "404 Not Found", {"error": "Use POST /chat or GET /stats."})
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream_chat(self, request, writer):
+        async def emit(event):
+            data = (json.dumps(event) + "\n").encode()
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+
+        finished = asyncio.Event()
+        try:
+            self.queue.put_nowait((request, emit, finished))
+        except asyncio.QueueFull:
+            await _respond(writer, "503 Service Unavailable", {"error": "The server is busy, try again shortly."},
+                           extra_headers="Retry-After: 1\r\n")
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        await finished.wait()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def _read_lines(loop, lines):
+    """Hands stdin to the event loop line by line; a daemon thread, so Ctrl-C never waits for input."""
+    for line in sys.stdin:
+        asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+    asyncio.run_coroutine_threadsafe(lines.put(""), loop).result()
+
+
+async def _respond(writer, status, payload, extra_headers=""):
+    data = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                 f"{extra_headers}Connection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="main.py --serve", description="Runs the assistant as a headless server.")
+    parser.add_argument("--http", type=int, nargs="?", const=DEFAULT_PORT, metavar="PORT",
+                        help=f"serve HTTP on 127.0.0.1 (default port {DEFAULT_PORT}) instead of stdin")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--queue-size", type=int, default=int(os.getenv("SERVER_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+    parser.add_argument("--fake-model", action="store_true", help="answer with a local echo model (no API calls)")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="seconds before the fake model's first token")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="share of fake model calls that fail")
+    args = parser.parse_args(argv)
+
+    # stdout carries the protocol; anything tools print goes to stderr instead
+    output = sys.stdout
+    sys.stdout = sys.stderr
+
+    if args.fake_model:
+        import fake_model
+        import model_gateway
+        # Through the gateway like Gemini, but without rate limits: the fake has no quota
+        fake = fake_model.FakeChatModel(latency=args.fake_latency, token_delay=0.01, error_rate=args.fake_error_rate)
+        limiter = model_gateway.RateLimiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12,
+                                            max_concurrent=args.workers)
+        agent_executor = agent.build_agent(model_gateway.ModelGateway(primary=fake, limiter=limiter))
+    else:
+        agent_executor = agent.get_agent()
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    timer_scheduler.load(TIMERS_PATH)
+    timer_scheduler.start()
+
+    server = Server(agent_executor, args.workers, args.queue_size)
+    try:
+        if args.http is not None:
+            asyncio.run(server.serve_http("127.0.0.1", args.http))
+        else:
+            asyncio.run(server.serve_stdin(output))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for session_id in list(server.sessions):
+            server.close_session(session_id)
+        session_state.close()
+        shell_job_manager.shutdown()
+        timer_scheduler.stop()
+        stats = server.stats()
+        print(f"Served {stats['served']} requests ({stats['failed']} failed) in {stats['seconds']:.1f}s: "
+              f"{stats['requests_per_second']} requests/s, p50 {stats['p50_seconds']}s, "
+              f"p95 {stats['p95_seconds']}s.", file=sys.stderr)
+        if agent.gateway is not None:
+            print(agent.gateway.summary(), file=sys.stderr)
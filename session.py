@@ -0,0 +1,181 @@
+import contextlib
+import contextvars
+import getpass
+import os
+import uuid
+from collections.abc import MutableMapping
+
+import file_reader
+import scheduler
+import shell_jobs
+import state_store
+import todo_store
+
+# This module only uses the standard library and our own small modules,
+# so the assistant can load saved data and show the first prompt before
+# the heavy LangChain imports have finished.
+
+# =========================================================================
+# GLOBAL MEMORY SYSTEM
+# This dictionary stores temporary information during the session
+# =========================================================================
+def new_session_memory(todo_list=None, state=None):
+    """Returns the memory of a new session; with state (a StateView) it is kept across restarts"""
+    return {
+        "assistant_name": "Jarvis",  # Default name
+        "todo_list": todo_list if todo_list is not None else todo_store.TodoStore(state=state),  # To-do items, keyed by stable ID
+        "user_preferences": state.view("preference:") if state is not None else {},  # Any user preferences
+        "thread_id": str(uuid.uuid4()),    # Conversation thread kept by the checkpointer
+        "state": state,                    # Where the name and conversation summary are saved
+    }
+
+def restore_session_state(memory):
+    """Puts the saved assistant name back into a session's memory"""
+    if memory["state"] is not None:
+        memory["assistant_name"] = memory["state"].get("assistant_name", memory["assistant_name"])
+
+class SessionMemory(MutableMapping):
+    """The memory of the session being served, used like a dict.
+
+    The chat loop has a single session. Server mode runs each request inside
+    use(memory), and since the current session is kept in a context variable
+    (which LangChain copies into the threads that run tools), every tool only
+    sees the memory of the session that called it.
+    """
+
+    def __init__(self, default):
+        self._current = contextvars.ContextVar("session_memory", default=default)
+
+    def __getitem__(self, key):
+        return self._current.get()[key]
+
+    def __setitem__(self, key, value):
+        self._current.get()[key] = value
+
+    def __delitem__(self, key):
+        del self._current.get()[key]
+
+    def __iter__(self):
+        return iter(self._current.get())
+
+    def __len__(self):
+        return len(self._current.get())
+
+    @contextlib.contextmanager
+    def use(self, memory):
+        """Makes memory the current session's memory inside the with block"""
+        token = self._current.set(memory)
+        try:
+            yield memory
+        finally:
+            self._current.reset(token)
+
+def user_name():
+    """The namespace of the chat loop's saved state: ASSISTANT_USER, or the login name"""
+    try:
+        return os.getenv("ASSISTANT_USER") or getpass.getuser()
+    except Exception:
+        return "default"
+
+# Name, preferences, to-dos and conversation summaries of every user, kept
+# across restarts. Opened on first use; changes are written every few seconds.
+session_state = state_store.StateStore(os.getenv("STATE_PATH", state_store.STATE_PATH))
+
+session_memory = SessionMemory(new_session_memory(state=session_state.namespace(f"user:{user_name()}")))
+
+def session_owner():
+    """The namespace of the current session ("user:..." or "session:..."), which owns its jobs and timers"""
+    state = session_memory["state"]
+    return state.namespace if state is not None else None
+
+# Shell commands run as background jobs so a slow command never blocks the chat.
+# Jobs and timers are shared by every session of the process and tagged with
+# the session_owner() that started them, so each session only sees its own.
+shell_job_manager = shell_jobs.JobManager()
+
+def format_shell_job(job):
+    """Describes a shell job's status together with the output not shown yet"""
+    stdout, stderr = job.take_new_output(file_reader.OUTPUT_BUDGET // 2)
+    if job.running:
+        result = f"Job #{job.id} is still running ({job.elapsed():.0f}s so far)."
+    elif job.status == "failed":
+        result = f"Job #{job.id} could not be started: {job.error}"
+    else:
+        result = f"Job #{job.id} {job.status} after {job.elapsed():.1f}s with exit code {job.returncode}."
+    if stdout:
+        result += f"\nstdout:\n{stdout}"
+    if stderr:
+        result += f"\nstderr:\n{stderr}"
+    if job.running:
+        result += f"\nUse check_background_command({job.id}) for more output."
+    return result
+
+def announce_timer(timer):
+    """Shows a timer or reminder when it fires (called from the scheduler thread)"""
+    if timer["todo_id"]:
+        # Look in the to-do list of the session that set the reminder, even if it has ended since
+        owner = timer.get("owner")
+        if owner is not None:
+            item = todo_store.saved_item(session_state.namespace(owner), timer["todo_id"])
+        else:
+            item = session_memory["todo_list"].get(timer["todo_id"])
+        if item is None or item["completed"]:
+            return  # Nothing left to remind about
+    print(f"\n⏰ {timer['message']}", flush=True)
+
+# Timers and reminders fire in the background and are kept across restarts
+timer_scheduler = scheduler.Scheduler(on_fire=announce_timer)
+
+# Helper functions for todo list persistence.
+# Every change is recorded in the session state store (or appended to the
+# journal) as it happens, so saving only writes out what is still buffered.
+def save_todo_list():
+    """Saves the to-do list to a file"""
+    try:
+        session_memory["todo_list"].compact()
+    except Exception as e:
+        print(f"Error saving to-do list: {str(e)}")
+
+def load_todo_list():
+    """Loads the to-do list from a file"""
+    try:
+        count = session_memory["todo_list"].load()
+        if count:
+            return f"Loaded {count} items from your saved to-do list."
+        else:
+            return "No saved to-do list found."
+    except Exception as e:
+        return f"Error loading to-do list: {str(e)}"
+
+# The rolling summary of a long conversation is saved too, so the next
+# conversation can start from it (see conversation_memory.py)
+def save_conversation_summary(summary):
+    """Saves the current session's conversation summary"""
+    if session_memory["state"] is not None:
+        session_memory["state"]["conversation_summary"] = summary
+
+def load_conversation_summary():
+    """Returns the current session's saved conversation summary, or an empty string"""
+    if session_memory["state"] is None:
+        return ""
+    return session_memory["state"].get("conversation_summary", "")
+
+def format_todo_page(status="all", search="", added_from="", added_to="", sort_by="id",
+                     descending=False, cursor="", limit=todo_store.DEFAULT_PAGE_SIZE):
+    """Runs a to-do query and formats the single page of results for the model"""
+    try:
+        page, total, next_cursor = session_memory["todo_list"].query(
+            status, search, added_from, added_to, sort_by, descending, cursor, limit
+        )
+    except ValueError as e:
+        return f"Error querying to-do list: {str(e)}"
+    if not page:
+        return "No to-do items match."
+
+    lines = [f"To-do items (showing {len(page)} of {total} matching):"]
+    for item in page:
+        status_mark = "✓" if item["completed"] else "☐"
+        lines.append(f"#{item['id']}. {status_mark} {item['task']} (added: {item['added']})")
+    if next_cursor:
+        lines.append(f"More items available. Next page cursor: {next_cursor}")
+    return "\n".join(lines)
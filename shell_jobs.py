@@ -0,0 +1,249 @@
+import asyncio
+import datetime
+import itertools
+import os
+import signal
+import threading
+
+# =========================================================================
+# SHELL JOB ENGINE
+# Runs shell commands as asyncio subprocesses on a background event loop,
+# so the assistant never blocks on a slow command. Each job keeps only
+# the last part of its stdout and stderr in a ring buffer, has a timeout,
+# and can be polled for new output or cancelled while it runs. Jobs belong
+# to the session that started them, and other sessions cannot see them.
+# Only the newest finished jobs of each session are kept, for a while.
+# =========================================================================
+
+MAX_CAPTURE_BYTES = 256 * 1024    # Output kept per stream for each job
+READ_SIZE = 4096
+KILL_GRACE_SECONDS = 3            # Time between SIGTERM and SIGKILL
+MAX_FINISHED_JOBS = 20            # Finished jobs kept per session, newest first...
+FINISHED_JOB_TTL = 3600           # ...for at most this many seconds after they ended
+
+
+class RingBuffer:
+    """Keeps the last `capacity` bytes written, and counts everything ever written."""
+
+    def __init__(self, capacity=MAX_CAPTURE_BYTES):
+        self.capacity = capacity
+        self.data = bytearray()
+        self.total = 0            # Bytes written since the start, used as a stream offset
+        self.lock = threading.Lock()
+
+    def write(self, chunk):
+        with self.lock:
+            self.data += chunk
+            self.total += len(chunk)
+            if len(self.data) > self.capacity:
+                del self.data[:len(self.data) - self.capacity]
+
+    def read(self, since=0):
+        """Returns (bytes written after offset `since`, bytes lost to the ring, new offset)."""
+        with self.lock:
+            first_kept = self.total - len(self.data)
+            start = max(since, first_kept)
+            return bytes(self.data[start - first_kept:]), start - since, self.total
+
+
+class Job:
+    def __init__(self, job_id, command, timeout, owner=None):
+        self.id = job_id
+        self.command = command
+        self.timeout = timeout
+        self.owner = owner        # The session that started the job
+        self.status = "starting"  # starting, running, finished, timed out, cancelled, failed
+        self.returncode = None
+        self.error = None
+        self.started = datetime.datetime.now()
+        self.ended = None
+        self.stdout = RingBuffer()
+        self.stderr = RingBuffer()
+        self.stdout_seen = 0      # Offsets of the output already shown to the assistant
+        self.stderr_seen = 0
+        self.done = threading.Event()
+        self.task = None
+        self.cancel_requested = False
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def elapsed(self):
+        end = self.ended or datetime.datetime.now()
+        return (end - self.started).total_seconds()
+
+    def take_new_output(self, budget):
+        """Returns (stdout, stderr) text produced since the last call.
+
+        Each stream is cut to its last `budget` characters; a note says how
+        much was skipped so the assistant knows the output is incomplete.
+        """
+        result = []
+        for name in ("stdout", "stderr"):
+            data, lost, offset = getattr(self, name).read(getattr(self, f"{name}_seen"))
+            setattr(self, f"{name}_seen", offset)
+            text = data.decode("utf-8", errors="replace")
+            if len(text) > budget:
+                lost += len(text) - budget
+                text = text[-budget:]
+            if lost:
+                text = f"[... {lost} earlier bytes not shown ...]\n{text}"
+            result.append(text)
+        return tuple(result)
+
+
+class JobManager:
+    """Starts, tracks and cancels shell jobs on a private event loop thread."""
+
+    def __init__(self):
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="shell-jobs", daemon=True).start()
+            return self._loop
+
+    def start(self, command, timeout, owner=None):
+        """Starts a command in the background and returns its Job right away."""
+        loop = self._ensure_loop()
+        job = Job(next(self._ids), command, timeout, owner)
+        with self._lock:
+            self._prune()
+            self.jobs[job.id] = job
+
+        def schedule():
+            job.task = loop.create_task(self._run(job))
+
+        loop.call_soon_threadsafe(schedule)
+        return job
+
+    def _prune(self):
+        """Forgets finished jobs past FINISHED_JOB_TTL, and all but each session's newest MAX_FINISHED_JOBS."""
+        expired = datetime.datetime.now() - datetime.timedelta(seconds=FINISHED_JOB_TTL)
+        kept = {}                 # owner -> finished jobs kept so far
+        # Newest first, so the oldest finished jobs are the ones dropped
+        for job in reversed(list(self.jobs.values())):
+            if job.running:
+                continue
+            kept[job.owner] = kept.get(job.owner, 0) + 1
+            if job.ended < expired or kept[job.owner] > MAX_FINISHED_JOBS:
+                del self.jobs[job.id]
+
+    def wait(self, job, seconds):
+        """Waits up to `seconds` for a job to end. Returns True if it has ended."""
+        return job.done.wait(seconds)
+
+    def get(self, job_id, owner=None):
+        """Returns a job, or None if the ID is unknown or (with owner) the job belongs to another session."""
+        job = self.jobs.get(job_id)
+        if job is None or owner is not None and job.owner != owner:
+            return None
+        return job
+
+    def owned(self, owner=None):
+        """Returns the jobs of one session (all jobs without owner), oldest first."""
+        with self._lock:
+            return [job for job in self.jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id, owner=None):
+        """Stops a running job. Returns the job, or None if get(job_id, owner) finds none."""
+        job = self.get(job_id, owner)
+        if job is None:
+            return None
+        if job.running and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel, job)
+        return job
+
+    @staticmethod
+    def _cancel(job):
+        job.cancel_requested = True
+        # Cancelling while the process is being created would leave it running
+        # unwatched, so a starting job is stopped by _run once it has started
+        if job.status != "starting" and job.task is not None:
+            job.task.cancel()
+
+    def shutdown(self):
+        """Cancels all running jobs and waits briefly for them to stop."""
+        with self._lock:
+            running = [job for job in self.jobs.values() if job.running]
+        for job in running:
+            self.cancel(job.id)
+        for job in running:
+            job.done.wait(KILL_GRACE_SECONDS + 1)
+
+    async def _run(self, job):
+        process = None
+        readers = None
+        try:
+            process = await asyncio.create_subprocess_shell(
+                job.command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.DEVNULL,
+                # Own process group, so a timeout also stops the command's children
+                start_new_session=hasattr(os, "killpg"),
+            )
+            job.status = "running"
+            if job.cancel_requested:
+                raise asyncio.CancelledError
+            readers = asyncio.gather(
+                self._pump(process.stdout, job.stdout),
+                self._pump(process.stderr, job.stderr),
+            )
+            try:
+                await asyncio.wait_for(process.wait(), job.timeout)
+                job.status = "finished"
+            except asyncio.TimeoutError:
+                job.status = "timed out"
+                await self._stop(process)
+            job.returncode = process.returncode
+            # Collect the last output; a leftover child could keep the pipes open
+            try:
+                await asyncio.wait_for(readers, KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            if process is not None:
+                await self._stop(process)
+                job.returncode = process.returncode
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            if readers is not None and not readers.done():
+                readers.cancel()
+            job.ended = datetime.datetime.now()
+            job.done.set()
+
+    @staticmethod
+    async def _pump(stream, buffer):
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                return
+            buffer.write(chunk)
+
+    @staticmethod
+    async def _stop(process):
+        """Terminates the process (group), killing it if it does not exit in time."""
+        for sig in (signal.SIGTERM, getattr(signal, "SIGKILL", signal.SIGTERM)):
+            if process.returncode is not None:
+                return
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(process.pid, sig)
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                continue
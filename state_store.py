@@ -0,0 +1,401 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+# =========================================================================
+# SESSION STATE STORE
+# One SQLite file for what a user's sessions should remember across
+# restarts: the assistant's name, preferences, to-do items and the
+# conversation summary. Every key lives in a namespace (one per user, or
+# per server session), so sessions never see each other's data.
+#
+# Reads go through an in-memory cache, so a lookup hits SQLite (a primary
+# key seek) only the first time a key is used and nothing is loaded up
+# front. Filtering, sorting and counting many values (a long to-do list)
+# is left to SQLite as well, through indexes on JSON fields and a word
+# index (word -> keys) kept beside the table, so searches and filters do
+# not scan every value. Writes land in the cache and a buffer right away
+# and are written behind, in one transaction every few seconds and at
+# exit. A crash can lose the last few seconds of changes, but never half
+# a batch: each flush is a single transaction, and SQLite recovers the
+# file on the next start.
+# =========================================================================
+
+STATE_PATH = "assistant_state.sqlite"
+FLUSH_INTERVAL = 2.0      # Seconds between write-behind flushes
+
+_MISSING = object()       # Cached "no such key", so misses are not looked up twice
+_DELETED = object()       # Buffered delete
+
+
+class StateStore:
+    """Namespaced JSON values in SQLite, with a read cache and write-behind."""
+
+    def __init__(self, path=STATE_PATH, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.cache = {}           # namespace -> {key: value or _MISSING}
+        self.pending = {}         # (namespace, key) -> value or _DELETED, not written yet
+        self.counts = {}          # (namespace, prefix) -> number of keys, kept up to date by set and delete
+        self.indexes = {}         # index name -> SQL expressions over value (see create_index)
+        self.word_fields = {}     # key prefix -> (field, split) whose words are indexed (see index_words)
+        self.flushes = 0
+        self.lock = threading.RLock()
+        self._db = None
+        self._flusher = None
+        self._stop = threading.Event()
+
+    @property
+    def db(self):
+        # Opened on first use, so starting the assistant does not create the file
+        if self._db is None:
+            try:
+                self._db = self._open()
+            except sqlite3.DatabaseError:
+                # Not a database any more (overwritten or truncated): keep it aside and start over
+                os.replace(self.path, self.path + ".damaged")
+                self._db = self._open()
+            for name in self.indexes:
+                self._create_index(name)
+            for prefix in self.word_fields:
+                self._build_word_index(prefix)
+        return self._db
+
+    def _open(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            db.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS state (
+                    namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                    PRIMARY KEY (namespace, key)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS state_words (
+                    namespace TEXT NOT NULL, word TEXT NOT NULL, key TEXT NOT NULL,
+                    PRIMARY KEY (namespace, word, key)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS state_words_by_key ON state_words (namespace, key);
+                CREATE TABLE IF NOT EXISTS state_vocabulary (
+                    namespace TEXT NOT NULL, word TEXT NOT NULL, uses INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, word)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS state_word_fields (prefix TEXT PRIMARY KEY, field TEXT NOT NULL);
+            """)
+        except sqlite3.DatabaseError:
+            db.close()
+            raise
+        # SQLite's lower() only knows ASCII; queries use this one to match Python's
+        db.create_function("unicode_lower", 1, lambda text: text.lower() if isinstance(text, str) else text,
+                           deterministic=True)
+        return db
+
+    def namespace(self, name):
+        """The keys of one user or session, as a dict-like StateView."""
+        return StateView(self, name)
+
+    # ---------------------------------------------------------------------
+    # Indexes
+    # ---------------------------------------------------------------------
+
+    def create_index(self, name, *expressions):
+        """Indexes the values by SQL expressions, e.g. "json_extract(value, '$.added')".
+
+        Queries use the index when their where or order_by has the very same
+        expressions. It is created when the file is opened.
+        """
+        with self.lock:
+            self.indexes[name] = expressions
+            if self._db is not None:
+                self._create_index(name)
+
+    def _create_index(self, name):
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+            return
+        with self.db:
+            self.db.execute(f"CREATE INDEX {name} ON state (namespace, {', '.join(self.indexes[name])})")
+        # Without statistics SQLite prefers the key range to the new index
+        self.db.execute("ANALYZE")
+
+    def index_words(self, prefix, field, split):
+        """Keeps a word index for the values under prefix: split(value[field]) -> their keys.
+
+        select() and count() use it for their words argument. Values saved
+        before the index existed are indexed once, when the file is opened.
+        """
+        with self.lock:
+            self.word_fields[prefix] = (field, split)
+            if self._db is not None:
+                self._build_word_index(prefix)
+
+    def _build_word_index(self, prefix):
+        field, split = self.word_fields[prefix]
+        row = self.db.execute("SELECT field FROM state_word_fields WHERE prefix = ?", (prefix,)).fetchone()
+        if row is not None and row[0] == field:
+            return
+        with self.db:
+            self.db.execute("DELETE FROM state_words WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff"))
+            rows = self.db.execute("SELECT namespace, key, value FROM state WHERE key >= ? AND key < ?",
+                                   (prefix, prefix + "\U0010ffff"))
+            self.db.executemany("INSERT INTO state_words (namespace, word, key) VALUES (?, ?, ?)",
+                                [(namespace, word, key) for namespace, key, text in rows.fetchall()
+                                 for word in self._split_words(prefix, json.loads(text))])
+            self.db.execute("DELETE FROM state_vocabulary")
+            self.db.execute("INSERT INTO state_vocabulary (namespace, word, uses) "
+                            "SELECT namespace, word, count(*) FROM state_words GROUP BY namespace, word")
+            self.db.execute("INSERT OR REPLACE INTO state_word_fields (prefix, field) VALUES (?, ?)", (prefix, field))
+        self.db.execute("ANALYZE")
+
+    def _split_words(self, prefix, value):
+        field, split = self.word_fields[prefix]
+        text = value.get(field) if isinstance(value, dict) else None
+        return set(split(text)) if isinstance(text, str) else set()
+
+    def _update_words(self, batch):
+        """Brings the word index up to date with a batch being flushed (inside its transaction)."""
+        added, removed = [], []
+        for (namespace, key), value in batch.items():
+            prefix = next((prefix for prefix in self.word_fields if key.startswith(prefix)), None)
+            if prefix is None:
+                continue
+            old = {row[0] for row in self.db.execute(
+                "SELECT word FROM state_words WHERE namespace = ? AND key = ?", (namespace, key))}
+            new = self._split_words(prefix, value) if value is not _DELETED else set()
+            added += [(namespace, word, key) for word in new - old]
+            removed += [(namespace, word, key) for word in old - new]
+        self.db.executemany("INSERT INTO state_words (namespace, word, key) VALUES (?, ?, ?)", added)
+        self.db.executemany("DELETE FROM state_words WHERE namespace = ? AND word = ? AND key = ?", removed)
+        self.db.executemany("INSERT INTO state_vocabulary (namespace, word, uses) VALUES (?, ?, 1) "
+                            "ON CONFLICT (namespace, word) DO UPDATE SET uses = uses + 1",
+                            [(namespace, word) for namespace, word, _ in added])
+        self.db.executemany("UPDATE state_vocabulary SET uses = uses - 1 WHERE namespace = ? AND word = ?",
+                            [(namespace, word) for namespace, word, _ in removed])
+        if removed:
+            self.db.execute("DELETE FROM state_vocabulary WHERE uses <= 0")
+
+    # ---------------------------------------------------------------------
+    # Reads
+    # ---------------------------------------------------------------------
+
+    def get(self, namespace, key, default=None):
+        with self.lock:
+            value = self.pending.get((namespace, key), _MISSING)
+            if value is _MISSING:
+                cached = self.cache.setdefault(namespace, {})
+                value = cached.get(key, None)
+                if value is None and key not in cached:
+                    row = self.db.execute("SELECT value FROM state WHERE namespace = ? AND key = ?",
+                                          (namespace, key)).fetchone()
+                    value = json.loads(row[0]) if row else _MISSING
+                    cached[key] = value
+            return default if value is _MISSING or value is _DELETED else value
+
+    def items(self, namespace, prefix=""):
+        """Returns {key: value} for the keys of namespace that start with prefix, in key order."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT key, value FROM state WHERE namespace = ? AND key >= ? AND key < ? ORDER BY key",
+                (namespace, prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+            cached = self.cache.setdefault(namespace, {})
+            result = {}
+            for key, text in rows:
+                result[key] = cached[key] = json.loads(text)
+            # Changes still in the buffer are newer than the file
+            for (pending_namespace, key), value in self.pending.items():
+                if pending_namespace == namespace and key.startswith(prefix):
+                    if value is _DELETED:
+                        result.pop(key, None)
+                    else:
+                        result[key] = value
+            return dict(sorted(result.items()))
+
+    def _condition(self, namespace, prefix, where, params, words):
+        """The SQL condition and parameters shared by select() and count()."""
+        # The key range only filters (the unary + keeps SQLite from using it),
+        # so the indexes on the condition and the order pick the rows
+        sql = "namespace = ? AND +key >= ? AND +key < ?" + (f" AND {where}" if where else "")
+        params = [namespace, prefix, prefix + "\U0010ffff", *params]
+        # Each word may be part of a longer indexed word: look it up in the
+        # vocabulary, then take the keys of the words found
+        for word in words:
+            sql += (" AND key IN (SELECT key FROM state_words WHERE namespace = ? AND word IN "
+                    "(SELECT word FROM state_vocabulary WHERE namespace = ? AND instr(word, ?) > 0))")
+            params += [namespace, namespace, word]
+        return sql, params
+
+    def select(self, namespace, prefix="", where="", params=(), order_by="key", limit=-1, words=()):
+        """Returns the values under prefix that match an SQL condition, in order.
+
+        where and order_by are SQL over the JSON text in the value column, e.g.
+        "json_extract(value, '$.completed') = 0". words must each be part of a
+        word in the value (see index_words). Buffered changes are written
+        first, so the query sees them.
+        """
+        with self.lock:
+            self.flush()
+            sql, params = self._condition(namespace, prefix, where, params, words)
+            rows = self.db.execute(f"SELECT value FROM state WHERE {sql} ORDER BY {order_by} LIMIT ?",
+                                   (*params, limit)).fetchall()
+            return [json.loads(row[0]) for row in rows]
+
+    def count(self, namespace, prefix="", where="", params=(), words=()):
+        """Counts the keys under prefix (whose values match where, if given), without reading them.
+
+        Without a condition the count is asked from SQLite once and then kept
+        up to date as keys are set and deleted, so it never waits for a flush.
+        """
+        with self.lock:
+            filtered = where or words
+            if not filtered and (namespace, prefix) in self.counts:
+                return self.counts[(namespace, prefix)]
+            self.flush()
+            sql, params = self._condition(namespace, prefix, where, params, words)
+            count = self.db.execute(f"SELECT count(*) FROM state WHERE {sql}", params).fetchone()[0]
+            if not filtered:
+                self.counts[(namespace, prefix)] = count
+            return count
+
+    def _update_counts(self, namespace, key, exists):
+        """Adjusts the kept counts that include key, which exists (or not) after a change."""
+        counted = [counted for counted in self.counts if counted[0] == namespace and key.startswith(counted[1])]
+        if counted and (self.get(namespace, key, _MISSING) is not _MISSING) != exists:
+            for counted_prefix in counted:
+                self.counts[counted_prefix] += 1 if exists else -1
+
+    # ---------------------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------------------
+
+    def set(self, namespace, key, value):
+        json.dumps(value)     # Fail now rather than at the next flush
+        with self.lock:
+            self._update_counts(namespace, key, True)
+            self.cache.setdefault(namespace, {})[key] = value
+            self.pending[(namespace, key)] = value
+            self._start_flusher()
+
+    def delete(self, namespace, key):
+        with self.lock:
+            self._update_counts(namespace, key, False)
+            self.cache.setdefault(namespace, {})[key] = _MISSING
+            self.pending[(namespace, key)] = _DELETED
+            self._start_flusher()
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="state-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"\n(Could not save session state: {str(e)})")
+
+    def flush(self):
+        """Writes the buffered changes in one transaction. Returns how many were written."""
+        with self.lock:
+            if not self.pending:
+                return 0
+            batch = self.pending
+            self.pending = {}
+            try:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+                        [(namespace, key, json.dumps(value)) for (namespace, key), value in batch.items()
+                         if value is not _DELETED],
+                    )
+                    self.db.executemany(
+                        "DELETE FROM state WHERE namespace = ? AND key = ?",
+                        [(namespace, key) for (namespace, key), value in batch.items() if value is _DELETED],
+                    )
+                    if self.word_fields:
+                        self._update_words(batch)
+            except Exception:
+                # Keep the changes for the next try
+                self.pending = {**batch, **self.pending}
+                raise
+            self.flushes += 1
+            return len(batch)
+
+    def forget(self, namespace):
+        """Drops the cached values of a namespace (they stay in the file), e.g. when its session ends."""
+        with self.lock:
+            self.cache.pop(namespace, None)
+            self.counts = {counted: count for counted, count in self.counts.items() if counted[0] != namespace}
+
+    def close(self):
+        """Flushes what is left and stops the background flusher."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+            atexit.unregister(self.close)
+        with self.lock:
+            self.flush()
+            if self._db is not None:
+                # Keeps the statistics the query planner picks indexes by up to date
+                self._db.execute("PRAGMA optimize")
+                self._db.close()
+                self._db = None
+        self._stop.clear()
+
+
+class StateView(MutableMapping):
+    """The keys of one namespace that start with prefix, used like a dict."""
+
+    def __init__(self, store, namespace, prefix=""):
+        self.store = store
+        self.namespace = namespace
+        self.prefix = prefix
+
+    def view(self, prefix):
+        """A view of the keys under prefix, e.g. view("preference:")."""
+        return StateView(self.store, self.namespace, self.prefix + prefix)
+
+    def get(self, key, default=None):
+        return self.store.get(self.namespace, self.prefix + key, default)
+
+    def __getitem__(self, key):
+        value = self.store.get(self.namespace, self.prefix + key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.store.get(self.namespace, self.prefix + key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        self.store.set(self.namespace, self.prefix + key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.store.delete(self.namespace, self.prefix + key)
+
+    def items(self):
+        start = len(self.prefix)
+        return [(key[start:], value) for key, value in self.store.items(self.namespace, self.prefix).items()]
+
+    def create_index(self, name, *expressions):
+        self.store.create_index(name, *expressions)
+
+    def index_words(self, field, split):
+        self.store.index_words(self.prefix, field, split)
+
+    def select(self, where="", params=(), order_by="key", limit=-1, words=()):
+        return self.store.select(self.namespace, self.prefix, where, params, order_by, limit, words)
+
+    def count(self, where="", params=(), words=()):
+        return self.store.count(self.namespace, self.prefix, where, params, words)
+
+    def __iter__(self):
+        return iter([key for key, _ in self.items()])
+
+    def __len__(self):
+        return self.count()
@@ -0,0 +1,35 @@
+import pytest
+
+import benchmark
+import benchmark_suites
+import todo_store
+
+
+@pytest.fixture
+def bench():
+    bench = benchmark.Benchmark({"todo": benchmark.SCENARIOS["todo"]})
+    yield bench
+    bench.close()
+
+
+def test_todo_scenario_is_deterministic(bench, monkeypatch):
+    # The list each run leaves behind, read just before the run closes it
+    lists = []
+    close = todo_store.TodoStore.close
+
+    def record_and_close(todo_list):
+        lists.append([(item["id"], item["task"], item["completed"]) for item in todo_list])
+        close(todo_list)
+
+    monkeypatch.setattr(todo_store.TodoStore, "close", record_and_close)
+    for _ in range(3):
+        turns = bench.run("todo")
+        assert [turn["steps"] for turn in turns] == [4, 3, 3]
+    assert lists == [[(2, "call the bank", True), (3, "book flights", False)]] * 3
+
+
+@pytest.mark.parametrize("suite", sorted(benchmark_suites.SUITES))
+def test_suites_run_at_a_small_scale(suite):
+    results = benchmark.run_suites([suite], scale=0.001)
+    assert results[suite]
+    assert all(ms >= 0 for ms in results[suite].values())
@@ -0,0 +1,34 @@
+import math
+
+import pytest
+
+import calculator
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("(3+4)*sqrt(9)/log(100, 10)", 10.5),
+    ("r = 2; pi * r^2", math.pi * 4),
+    ("v = [1, 2, 3]; mean(v)", 2),
+    ("prod([2, 3, 4])", 24),
+    ("[1, 2] * 3", [3, 6]),
+])
+def test_evaluate(expression, expected):
+    assert calculator.evaluate(expression) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("expression", [
+    "10**4500",
+    "x = 10**3000; x = x*x; x = x*x; x = x*x; x = x*x; x = x*x",
+    "prod([10**3000, 10**3000])",
+    "factorial(1000) * factorial(1000)",
+    "[10**3000, 1] * [10**3000, 1]",
+    "x = 10**3999; x + x*9",
+])
+def test_oversized_results_are_refused(expression):
+    with pytest.raises(calculator.CalculationError, match="too large"):
+        calculator.evaluate(expression)
+
+
+def test_largest_allowed_result_can_be_printed():
+    result = calculator.evaluate(f"10**{calculator.MAX_RESULT_DIGITS - 1}")
+    assert len(str(result)) == calculator.MAX_RESULT_DIGITS
@@ -0,0 +1,87 @@
+import asyncio
+import io
+
+import pytest
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+import console
+import fake_model
+
+
+@tool
+async def wait_for(seconds: float) -> str:
+    """Waits for the given number of seconds."""
+    await asyncio.sleep(seconds)
+    return f"Waited {seconds}s."
+
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+SCRIPT = {
+    "hello": [{"content": "Hi, how can I help you today?"}],
+    "wait a little": [
+        {"tool_calls": [{"name": "wait_for", "args": {"seconds": 0.5}}]},
+        {"content": "Done waiting."},
+    ],
+    "wait forever": [
+        {"tool_calls": [{"name": "wait_for", "args": {"seconds": 60}}]},
+        {"content": "Never gets here."},
+    ],
+}
+
+
+@pytest.fixture
+def graph():
+    model = fake_model.ReplayChatModel(token_delay=0.01, script=SCRIPT)
+    return create_react_agent(model, [wait_for], checkpointer=InMemorySaver())
+
+
+def _config(thread_id="chat"):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_answer_is_streamed_token_by_token(graph):
+    written = []
+
+    class Output(io.StringIO):
+        def write(self, text):
+            written.append(text)
+            return super().write(text)
+
+    output = Output()
+    answer = asyncio.run(console.stream_turn(graph, "hello", _config(), output))
+    assert answer == "Hi, how can I help you today?"
+    # Redirected output gets the answer only, one word at a time
+    assert output.getvalue() == answer
+    assert written == ["Hi,", " how", " can", " I", " help", " you", " today?"]
+
+
+def test_status_line_shows_the_running_tool_and_is_wiped(graph):
+    terminal = Terminal()
+    answer = asyncio.run(console.stream_turn(graph, "wait a little", _config(), terminal))
+    assert answer == "Done waiting."
+    shown = terminal.getvalue()
+    assert "Running wait_for" in shown
+    # The status line was wiped before the answer was printed
+    assert shown.endswith("\r\033[K" + answer)
+
+
+def test_cancelled_turn_leaves_a_valid_conversation(graph):
+    async def cancel_then_continue():
+        turn = asyncio.create_task(console.stream_turn(graph, "wait forever", _config(), io.StringIO()))
+        await asyncio.sleep(0.3)
+        turn.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+        state = await graph.aget_state(_config())
+        last = state.values["messages"][-1]
+        assert last.type == "tool" and last.content == console.CANCELLED_TOOL_RESULT
+        # The next turn goes on from there, without waiting for the cancelled tool
+        return await asyncio.wait_for(console.stream_turn(graph, "hello", _config(), io.StringIO()), 5)
+
+    assert asyncio.run(cancel_then_continue()) == "Hi, how can I help you today?"
@@ -0,0 +1,83 @@
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt import create_react_agent
+
+import conversation_memory
+import fake_model
+
+TURNS = 1000
+
+
+class PromptRecordingModel(fake_model.FakeChatModel):
+    """The echo model, noting the size of every prompt it is sent."""
+
+    prompt_tokens: list = []
+
+    def _tokens(self, messages):
+        self.prompt_tokens.append(count_tokens_approximately(messages))
+        return super()._tokens(messages)
+
+
+def test_prompt_size_stays_flat_over_a_long_conversation():
+    model = PromptRecordingModel(prompt_tokens=[])
+    saved = []
+    checkpointer = conversation_memory.BoundedMemorySaver()
+    graph = create_react_agent(
+        model, [], checkpointer=checkpointer,
+        pre_model_hook=conversation_memory.make_memory_hook(model, save_summary=saved.append),
+    )
+    config = {"configurable": {"thread_id": "long"}}
+    # About 100 tokens per message, so the budget is reached every few dozen turns
+    for turn in range(TURNS):
+        graph.invoke({"messages": [{"role": "user", "content": f"turn {turn} " + "words " * 60}]}, config)
+
+    messages = graph.get_state(config).values["messages"]
+    assert messages[-1].content.startswith(f"You said: turn {TURNS - 1} ")
+    assert saved, "the oldest turns were never summarised"
+
+    # Answers and summaries both go through the model; every prompt stays within the budget
+    assert max(model.prompt_tokens) <= conversation_memory.MAX_PROMPT_TOKENS
+    first, last = model.prompt_tokens[:TURNS // 2], model.prompt_tokens[TURNS // 2:]
+    assert max(last) <= max(first)
+    assert count_tokens_approximately(messages) <= conversation_memory.MAX_PROMPT_TOKENS
+    assert len(checkpointer.storage["long"][""]) <= checkpointer.keep
+
+
+class FailingSummaryModel(PromptRecordingModel):
+    """Fails every summary request while failing is set; answers as usual."""
+
+    failing: bool = True
+    summary_requests: int = 0
+
+    def _tokens(self, messages):
+        if messages[0].content.startswith(conversation_memory.SUMMARY_INSTRUCTIONS[:40]):
+            self.summary_requests += 1
+            if self.failing:
+                raise fake_model.FakeModelError("503 Service Unavailable")
+        return super()._tokens(messages)
+
+
+def test_history_is_kept_when_summarising_fails():
+    model = FailingSummaryModel(prompt_tokens=[])
+    saved = []
+    graph = create_react_agent(
+        model, [], checkpointer=conversation_memory.BoundedMemorySaver(),
+        pre_model_hook=conversation_memory.make_memory_hook(model, save_summary=saved.append),
+    )
+    config = {"configurable": {"thread_id": "failing"}}
+
+    def say(turn):
+        graph.invoke({"messages": [{"role": "user", "content": f"turn {turn} " + "words " * 60}]}, config)
+
+    for turn in range(60):
+        say(turn)
+    # Every turn retried the summary, and no turn was dropped meanwhile
+    messages = graph.get_state(config).values["messages"]
+    assert model.summary_requests > 1 and not saved
+    assert len(messages) == 120 and messages[0].content.startswith("turn 0 ")
+    assert max(model.prompt_tokens) <= conversation_memory.MAX_PROMPT_TOKENS
+
+    model.failing = False
+    say(60)
+    messages = graph.get_state(config).values["messages"]
+    assert saved and messages[0].id == conversation_memory.SUMMARY_ID
+    assert count_tokens_approximately(messages) <= conversation_memory.MAX_PROMPT_TOKENS
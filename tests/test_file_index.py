@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+import file_index
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def _age(root):
+    """Moves every directory's mtime an hour back, so the next change in one is always seen."""
+    hour_ago = time.time() - 3600
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, (hour_ago, hour_ago))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    _write(root / "a.txt", 100)
+    _write(root / "sub" / "b.log", 2000)
+    _write(root / "sub" / "deep" / "c.txt", 10)
+    _write(root / "other" / "d.TXT", 500)
+    _age(root)
+    return str(root)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = file_index.FileIndex(str(tmp_path / "index.sqlite"), workers=2)
+    yield index
+    index.close()
+
+
+def test_initial_build(index, tree):
+    assert index.last_refresh(tree) is None
+    summary = index.refresh(tree)
+    assert (summary["directories"], summary["listed"], summary["removed"]) == (4, 4, 0)
+    assert (summary["files"], summary["size"]) == (4, 2610)
+    assert index.last_refresh(tree) is not None
+    # Nothing changed, so nothing is listed again
+    assert index.refresh(tree)["listed"] == 0
+
+
+def test_refresh_lists_only_changed_directories(index, tree):
+    index.refresh(tree)
+    _write(os.path.join(tree, "sub", "deep", "new.txt"), 7)
+    summary = index.refresh(tree)
+    assert (summary["listed"], summary["files"], summary["size"]) == (1, 5, 2617)
+    assert os.path.join(tree, "sub", "deep", "new.txt") in [path for path, _, _ in index.query(tree)[0]]
+
+    os.remove(os.path.join(tree, "sub", "b.log"))
+    summary = index.refresh(tree)
+    assert (summary["listed"], summary["files"], summary["size"]) == (1, 4, 617)
+    assert index.query(tree, extension="log") == ([], 0, 0)
+
+
+def test_removed_directories_are_dropped(index, tree):
+    index.refresh(tree)
+    os.remove(os.path.join(tree, "sub", "deep", "c.txt"))
+    os.rmdir(os.path.join(tree, "sub", "deep"))
+    summary = index.refresh(tree)
+    assert (summary["removed"], summary["files"]) == (1, 3)
+    assert index.summarize(tree, group_by="directory") == [
+        (os.path.join(tree, "sub"), 1, 2000), (os.path.join(tree, "other"), 1, 500), (tree, 1, 100)]
+
+
+def test_files_edited_in_place_need_a_full_refresh(index, tree):
+    index.refresh(tree)
+    _write(os.path.join(tree, "a.txt"), 300)
+    assert index.refresh(tree)["size"] == 2610
+    assert index.refresh(tree, full=True)["size"] == 2810
+
+
+def test_queries(index, tree):
+    index.refresh(tree)
+    files, count, size = index.query(tree, limit=2)
+    assert [os.path.basename(path) for path, _, _ in files] == ["b.log", "d.TXT"]
+    assert (count, size) == (4, 2610)
+
+    files, count, size = index.query(tree, extension=".txt", sort_by="name", descending=False)
+    assert [os.path.basename(path) for path, _, _ in files] == ["a.txt", "c.txt", "d.TXT"]
+    assert (count, size) == (3, 610)
+    assert index.query(tree, min_size="0.05kb", max_size="1k")[1:] == (2, 600)
+    assert [os.path.basename(path) for path, _, _ in index.query(tree, name_glob="?.txt")[0]] == ["a.txt", "c.txt"]
+    # A subdirectory of the indexed root, but not a directory whose name merely starts the same
+    assert index.query(os.path.join(tree, "sub"))[1:] == (2, 2010)
+    assert index.query(tree + "-not-indexed")[1:] == (0, 0)
+
+    assert index.summarize(tree) == [("log", 1, 2000), ("txt", 3, 610)]
+    assert index.summarize(tree, min_size="50") == [("log", 1, 2000), ("txt", 2, 600)]
+    with pytest.raises(ValueError):
+        index.query(tree, sort_by="color")
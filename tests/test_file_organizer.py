@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import file_organizer
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_organize_by_extension(tmp_path):
+    for name in ["a.txt", "b.txt", "c.csv", "README"]:
+        _write(tmp_path / name, name)
+    summary = file_organizer.organize(str(tmp_path))
+    assert summary["moved"] == 4 and not summary["errors"]
+    assert sorted(os.listdir(tmp_path / "txt")) == ["a.txt", "b.txt"]
+    assert os.listdir(tmp_path / "no_extension") == ["README"]
+    assert not os.path.exists(tmp_path / file_organizer.JOURNAL_NAME)
+
+
+def test_name_clash_found_at_plan_time_gets_a_number(tmp_path):
+    _write(tmp_path / "a.txt", "new")
+    _write(tmp_path / "txt" / "a.txt", "old")
+    file_organizer.organize(str(tmp_path))
+    assert _read(tmp_path / "txt" / "a.txt") == "old"
+    assert _read(tmp_path / "txt" / "a (2).txt") == "new"
+
+
+def test_file_that_appears_after_planning_is_not_overwritten(tmp_path):
+    _write(tmp_path / "a.txt", "moved")
+    moves = file_organizer.plan(str(tmp_path))
+    assert moves == [("a.txt", os.path.join("txt", "a.txt"))]
+    _write(tmp_path / "txt" / "a.txt", "created meanwhile")
+    moved, skipped, errors = file_organizer._move_batch(str(tmp_path), moves)
+    assert (moved, skipped, errors) == (1, 0, [])
+    assert _read(tmp_path / "txt" / "a.txt") == "created meanwhile"
+    assert _read(tmp_path / "txt" / "a (2).txt") == "moved"
+    assert not os.path.exists(tmp_path / "a.txt")
+
+
+def test_resumed_journal_with_a_stale_plan_keeps_user_data(tmp_path):
+    _write(tmp_path / "a.txt", "first")
+    _write(tmp_path / "b.txt", "second")
+    moves = file_organizer.plan(str(tmp_path))
+    # An interrupted run wrote its plan, moved a.txt, and stopped
+    journal = file_organizer.Journal(str(tmp_path / file_organizer.JOURNAL_NAME))
+    journal.append({"op": "plan", "rule": "extension", "recursive": False})
+    journal.append({"op": "batch", "number": 0, "moves": moves})
+    journal.close()
+    os.makedirs(tmp_path / "txt")
+    os.rename(tmp_path / "a.txt", tmp_path / "txt" / "a.txt")
+    # Meanwhile the user saved a file where b.txt was planned to go
+    _write(tmp_path / "txt" / "b.txt", "user data")
+
+    summary = file_organizer.organize(str(tmp_path))
+    assert summary["resumed"] and summary["skipped"] == 1 and not summary["errors"]
+    assert _read(tmp_path / "txt" / "a.txt") == "first"
+    assert _read(tmp_path / "txt" / "b.txt") == "user data"
+    assert _read(tmp_path / "txt" / "b (2).txt") == "second"
+
+
+def test_move_finishes_a_link_left_by_an_interrupted_run(tmp_path):
+    _write(tmp_path / "a.txt", "data")
+    os.makedirs(tmp_path / "txt")
+    os.link(tmp_path / "a.txt", tmp_path / "txt" / "a.txt")
+    target = file_organizer._move(str(tmp_path / "a.txt"), str(tmp_path / "txt" / "a.txt"))
+    assert target == str(tmp_path / "txt" / "a.txt")
+    assert os.listdir(tmp_path / "txt") == ["a.txt"] and not os.path.exists(tmp_path / "a.txt")
+
+
+def test_group_named_like_a_file_gets_another_folder(tmp_path):
+    _write(tmp_path / "a.txt", "text")
+    _write(tmp_path / "txt", "a file called txt")
+    summary = file_organizer.organize(str(tmp_path))
+    assert summary["moved"] == 2 and not summary["errors"]
+    assert _read(tmp_path / "txt (2)" / "a.txt") == "text"
+    assert _read(tmp_path / "no_extension" / "txt") == "a file called txt"
+
+
+def test_failed_run_does_not_leave_its_journal(tmp_path):
+    _write(tmp_path / "a.txt", "text")
+    moves = file_organizer.plan(str(tmp_path))
+    journal = file_organizer.Journal(str(tmp_path / file_organizer.JOURNAL_NAME))
+    journal.append({"op": "plan", "rule": "extension", "recursive": False})
+    journal.append({"op": "batch", "number": 0, "moves": moves})
+    journal.close()
+    # A file now sits where the journal's plan wants a folder
+    _write(tmp_path / "txt", "a file called txt")
+    with pytest.raises(OSError):
+        file_organizer.organize(str(tmp_path))
+    assert not os.path.exists(tmp_path / file_organizer.JOURNAL_NAME)
+
+    summary = file_organizer.organize(str(tmp_path))
+    assert not summary["resumed"] and summary["moved"] == 2
+    assert _read(tmp_path / "txt (2)" / "a.txt") == "text"
@@ -0,0 +1,36 @@
+import pytest
+
+import file_reader
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "server.log"
+    with open(path, "w") as f:
+        for i in range(1, 20001):
+            f.write(f"{i} {'ERROR disk full' if i % 7 == 0 else 'INFO ok'}\n")
+    return str(path)
+
+
+def test_search_continues_with_offset_and_line(log_file, monkeypatch):
+    everything, next_offset, next_line = file_reader.search(log_file, "ERROR", max_matches=10000, budget=10 ** 6)
+    assert next_offset is None and next_line is None
+    assert [number for number, _, _ in everything] == list(range(7, 20001, 7))
+
+    pages = []
+    matches, offset, line = file_reader.search(log_file, "ERROR", max_matches=100)
+    pages += matches
+    # Continuations must not count the lines before the offset again
+    monkeypatch.setattr(file_reader, "_count_newlines", lambda f, end: pytest.fail("rescanned"))
+    while offset is not None:
+        matches, offset, line = file_reader.search(log_file, "ERROR", start_offset=offset,
+                                                   start_line=line, max_matches=100)
+        pages += matches
+    assert pages == everything
+
+
+def test_search_from_an_offset_alone_counts_the_lines(log_file):
+    first, offset, line = file_reader.search(log_file, "ERROR", max_matches=3)
+    assert [number for number, _, _ in first] == [7, 14, 21]
+    matches, _, _ = file_reader.search(log_file, "ERROR", start_offset=offset, max_matches=1)
+    assert matches[0][0] == line == 28
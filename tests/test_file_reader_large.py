@@ -0,0 +1,80 @@
+import tracemalloc
+
+import pytest
+
+import file_reader
+
+FILE_SIZE = 1024 ** 3           # 1 GB
+MEMORY_LIMIT = 64 * 1024 ** 2   # Far below the file size, well above the read and search blocks
+LONG_LINE = 40 * 1024 ** 2      # A line longer than the biggest search block
+
+
+@pytest.fixture(scope="module")
+def huge_log(tmp_path_factory):
+    """A generated 1 GB log: plain log lines, one 40 MB line in the middle and an error at the end.
+
+    Returns (path, number of lines, number of the long line).
+    """
+    path = tmp_path_factory.mktemp("large") / "huge.log"
+    line = b"2025-01-01 12:00:00 INFO request served in 12 ms\n"
+    block = line * (1024 ** 2 // len(line))
+    lines = 0
+    with open(path, "wb") as f:
+        while f.tell() < FILE_SIZE // 2:
+            f.write(block)
+            lines += block.count(b"\n")
+        f.write(b"x" * LONG_LINE + b"\n")
+        lines += 1
+        long_line = lines
+        while f.tell() < FILE_SIZE:
+            f.write(block)
+            lines += block.count(b"\n")
+        f.write(b"2025-01-01 23:59:59 ERROR disk full\n")
+        lines += 1
+    yield str(path), lines, long_line
+    path.unlink()
+
+
+def _peak_memory(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_read_lines_at_the_end_in_constant_memory(huge_log):
+    path, lines, _ = huge_log
+    (result, next_line), peak = _peak_memory(file_reader.read_lines, path, start_line=lines - 1, num_lines=5)
+    assert [number for number, _ in result] == [lines - 1, lines]
+    assert result[-1][1].endswith("ERROR disk full")
+    assert next_line is None
+    assert peak < MEMORY_LIMIT
+
+
+def test_read_the_long_line_in_constant_memory(huge_log):
+    path, _, long_line = huge_log
+    (result, next_line), peak = _peak_memory(file_reader.read_lines, path, start_line=long_line, num_lines=3)
+    # Shortened to the output budget, and the next line starts after it
+    assert result == [(long_line, "x" * file_reader.OUTPUT_BUDGET + " ...")]
+    assert next_line == long_line + 1
+    assert peak < MEMORY_LIMIT
+
+
+def test_tail_and_read_bytes_in_constant_memory(huge_log):
+    path, _, _ = huge_log
+    result, peak = _peak_memory(file_reader.tail, path, num_lines=3)
+    assert result[-1].endswith("ERROR disk full")
+    assert peak < MEMORY_LIMIT
+    (text, next_offset, size), peak = _peak_memory(file_reader.read_bytes, path, offset=FILE_SIZE // 2)
+    assert size > FILE_SIZE and next_offset == FILE_SIZE // 2 + len(text)
+    assert peak < MEMORY_LIMIT
+
+
+def test_search_the_whole_file_in_constant_memory(huge_log):
+    path, lines, _ = huge_log
+    (matches, next_offset, _), peak = _peak_memory(file_reader.search, path, "ERROR")
+    assert [(number, text) for number, _, text in matches] == [(lines, "2025-01-01 23:59:59 ERROR disk full")]
+    assert next_offset is None
+    assert peak < MEMORY_LIMIT
@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+import file_transfer
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_copy_tree(tmp_path):
+    _write(tmp_path / "src" / "a.txt", "alpha")
+    _write(tmp_path / "src" / "sub" / "b.txt", "beta")
+    summary = file_transfer.copy(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert summary["copied"] == 2 and not summary["errors"]
+    assert _read(tmp_path / "dst" / "sub" / "b.txt") == "beta"
+    # A second run finds everything unchanged
+    assert file_transfer.copy(str(tmp_path / "src"), str(tmp_path / "dst"))["skipped"] == 2
+
+
+@pytest.mark.parametrize("compare", file_transfer.COMPARE_MODES)
+def test_copy_file_onto_itself_keeps_the_data(tmp_path, compare):
+    path = str(tmp_path / "a.txt")
+    _write(path, "keep me")
+    with pytest.raises(shutil.SameFileError):
+        file_transfer.copy(path, path, compare=compare)
+    with pytest.raises(shutil.SameFileError):
+        file_transfer.copy(path, str(tmp_path), compare=compare)
+    assert _read(path) == "keep me"
+
+
+@pytest.mark.parametrize("destination", ["src", "src/sub", "src/sub/new"])
+def test_copy_tree_into_itself_is_refused(tmp_path, destination):
+    _write(tmp_path / "src" / "a.txt", "alpha")
+    _write(tmp_path / "src" / "sub" / "b.txt", "beta")
+    with pytest.raises(shutil.Error):
+        file_transfer.copy(str(tmp_path / "src"), str(tmp_path / destination), compare="none")
+    assert _read(tmp_path / "src" / "a.txt") == "alpha"
+    assert _read(tmp_path / "src" / "sub" / "b.txt") == "beta"
+    assert not os.path.exists(tmp_path / "src" / "sub" / "new")
+
+
+def test_hard_linked_destination_is_reported_not_truncated(tmp_path):
+    _write(tmp_path / "src" / "a.txt", "alpha")
+    os.makedirs(tmp_path / "dst")
+    os.link(tmp_path / "src" / "a.txt", tmp_path / "dst" / "a.txt")
+    summary = file_transfer.copy(str(tmp_path / "src"), str(tmp_path / "dst"), compare="none")
+    assert len(summary["errors"]) == 1 and "same file" in summary["errors"][0]
+    assert _read(tmp_path / "src" / "a.txt") == "alpha"
+
+
+def test_user_partial_files_are_copied(tmp_path, monkeypatch):
+    # Every file goes through the engine's own temp name
+    monkeypatch.setattr(file_transfer, "RESUME_MIN_SIZE", 1)
+    _write(tmp_path / "src" / "a.txt", "alpha")
+    _write(tmp_path / "src" / "x.partial", "download in progress")
+    _write(tmp_path / "src" / "sub" / "notes.txt.partial", "draft")
+    summary = file_transfer.copy(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert summary["files"] == summary["copied"] == 3 and not summary["errors"]
+    assert _read(tmp_path / "dst" / "x.partial") == "download in progress"
+    assert _read(tmp_path / "dst" / "sub" / "notes.txt.partial") == "draft"
+    assert sorted(os.listdir(tmp_path / "dst")) == ["a.txt", "sub", "x.partial"]
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import model_gateway
+
+
+class StubServer:
+    """A local HTTP model API that answers after a delay, or fails, as scripted.
+
+    script[path] is a list of (delay, status) for the next requests to that
+    path; once it runs out, requests are answered at once with 200.
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                path = self.path[1:]
+                prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompt"]
+                with stub.lock:
+                    stub.requests[path] = stub.requests.get(path, 0) + 1
+                    steps = stub.script.get(path) or [(0, 200)]
+                    delay, status = steps.pop(0)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(delay)
+                    body = json.dumps({"content": f"{path}: {prompt}"} if status == 200 else {}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}/{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubServerModel(BaseChatModel):
+    """A chat model that asks the stub server; HTTP errors carry their status in .code."""
+
+    url: str
+
+    @property
+    def _llm_type(self):
+        return "stub-server"
+
+    def _call(self, messages):
+        request = urllib.request.Request(self.url, data=json.dumps({"prompt": messages[-1].content}).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)["content"]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._call(messages)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        content = await asyncio.to_thread(self._call, messages)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+
+@pytest.fixture
+def stub():
+    stub = StubServer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(model_gateway, "backoff_delay", lambda attempt, error=None: 0.01)
+
+
+def _gateway(stub, fallback=False, **kwargs):
+    limiter = kwargs.pop("limiter", None) or model_gateway.RateLimiter(requests_per_minute=6000)
+    return model_gateway.ModelGateway(
+        primary=StubServerModel(url=stub.url("primary")),
+        fallback=StubServerModel(url=stub.url("fallback")) if fallback else None,
+        limiter=limiter, **{"hedge_after": 0, **kwargs},
+    )
+
+
+def _ask(gateway, text="hi"):
+    return gateway.invoke([HumanMessage(content=text)]).content
+
+
+async def _astream(gateway, text="hi"):
+    """Returns the streamed answer and the seconds it took.
+
+    Timed here, since asyncio.run() also waits for the losing hedge's thread.
+    """
+    started = time.perf_counter()
+    content = "".join([chunk.content async for chunk in gateway.astream([HumanMessage(content=text)])])
+    return content, time.perf_counter() - started
+
+
+def test_server_errors_are_retried(stub):
+    stub.script["primary"] = [(0, 503), (0, 429), (0, 502)]
+    gateway = _gateway(stub)
+    assert _ask(gateway) == "primary: hi"
+    assert stub.requests["primary"] == 4
+    assert gateway.stats["retries"] == 3 and gateway.stats["failures"] == 0
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.script["primary"] = [(0, 400)]
+    gateway = _gateway(stub)
+    with pytest.raises(urllib.error.HTTPError):
+        _ask(gateway)
+    assert stub.requests["primary"] == 1
+    assert gateway.stats["failures"] == 1
+
+
+def test_fallback_answers_when_the_primary_keeps_failing(stub):
+    stub.script["primary"] = [(0, 500)] * model_gateway.MAX_ATTEMPTS
+    gateway = _gateway(stub, fallback=True)
+    assert _ask(gateway) == "fallback: hi"
+    assert stub.requests["primary"] == model_gateway.MAX_ATTEMPTS
+    assert gateway.stats["fallbacks"] == 1
+
+
+def test_slow_calls_are_hedged(stub):
+    stub.script["primary"] = [(2.0, 200)]
+    gateway = _gateway(stub, hedge_after=0.2)
+    started = time.perf_counter()
+    assert _ask(gateway) == "primary: hi"
+    assert time.perf_counter() - started < 1.5
+    assert gateway.stats["hedges"] == gateway.stats["hedges_won"] == 1
+
+
+def test_streamed_calls_are_retried_and_hedged(stub):
+    stub.script["primary"] = [(0, 503), (2.0, 200)]
+    gateway = _gateway(stub, hedge_after=0.2)
+    content, seconds = asyncio.run(_astream(gateway))
+    assert content == "primary: hi"
+    assert seconds < 1.5
+    assert gateway.stats["retries"] == 1 and gateway.stats["hedges_won"] == 1
+
+
+def test_calls_in_flight_are_capped(stub):
+    stub.script["primary"] = [(0.2, 200)] * 12
+    limiter = model_gateway.RateLimiter(requests_per_minute=6000, max_concurrent=3)
+    gateway = _gateway(stub, limiter=limiter)
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        answers = list(pool.map(lambda i: _ask(gateway, str(i)), range(12)))
+    assert answers == [f"primary: {i}" for i in range(12)]
+    assert stub.max_in_flight <= 3
@@ -0,0 +1,101 @@
+import bisect
+import math
+import random
+import statistics
+import struct
+import tracemalloc
+
+import pytest
+
+import numeric_stats
+
+
+def test_describe():
+    values, skipped = numeric_stats.parse_numbers("1, 2; 3 4 x")
+    assert (list(values), skipped) == ([1, 2, 3, 4], 1)
+    summary = numeric_stats.describe(values)
+    assert summary["median"] == 2.5 and summary["percentiles"][25] == 1.75
+    assert sum(count for _, _, count in summary["histogram"]) == 4
+
+
+def test_non_finite_values_are_skipped():
+    values, skipped = numeric_stats.parse_numbers("1 inf 2 -inf nan 3 1e999")
+    assert (list(values), skipped) == ([1, 2, 3], 4)
+    summary = numeric_stats.describe(values)
+    assert summary["median"] == 2
+    assert all(low <= high for low, high, _ in summary["histogram"])
+
+
+def test_non_finite_binary_values_are_skipped(tmp_path):
+    path = tmp_path / "values.bin"
+    path.write_bytes(struct.pack("=5d", 1.0, float("inf"), 2.0, float("nan"), float("-inf")))
+    values, skipped = numeric_stats.load_file(str(path), binary_format="float64")
+    assert (list(values), skipped) == ([1, 2], 3)
+
+
+def test_csv_columns(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("name,score,age\nann,90,31\nbob,inf,40\ncid,70,25\n")
+    assert numeric_stats.load_file(str(path), column="score") == (numeric_stats.array("d", [90, 70]), 1)
+    assert list(numeric_stats.load_file(str(path), column="3")[0]) == [31, 40, 25]
+    with pytest.raises(numeric_stats.StatsError, match="start at 1"):
+        numeric_stats.load_file(str(path), column="0")
+
+
+def _describe_with_a_list(values, percentiles):
+    """describe() as it was before the sorted runs, for comparison."""
+    ordered = sorted(values)
+
+    def percentile(percent):
+        position = (len(ordered) - 1) * percent / 100
+        lower = math.floor(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return ordered[0], ordered[-1], {p: percentile(p) for p in percentiles}
+
+
+@pytest.mark.parametrize("run_size", [1, 7, 1000])
+def test_sorted_runs_give_the_same_summary(monkeypatch, run_size):
+    monkeypatch.setattr(numeric_stats, "RUN_SIZE", run_size)
+    generator = random.Random(run_size)
+    values = numeric_stats.array("d", [generator.choice([-1e9, -2.5, 0.0, -0.0, 3.0, 1e-300])
+                                       for _ in range(200)] + [generator.uniform(-100, 100) for _ in range(300)])
+    percentiles = (0, 1, 25, 50, 75, 99, 100)
+    summary = numeric_stats.describe(values, percentiles, bins=7)
+    low, high, expected = _describe_with_a_list(values, percentiles)
+    assert (summary["min"], summary["max"], summary["percentiles"]) == (low, high, expected)
+    ordered = sorted(values)
+    for edge_low, edge_high, count in summary["histogram"][:-1]:
+        assert count == bisect.bisect_left(ordered, edge_high) - bisect.bisect_left(ordered, edge_low)
+    assert sum(count for _, _, count in summary["histogram"]) == len(values)
+    assert summary["std"] == pytest.approx(statistics.stdev(values))
+
+
+def test_describe_keeps_values_unboxed():
+    values = numeric_stats.array("d", range(1_000_000))
+    tracemalloc.start()
+    try:
+        summary = numeric_stats.describe(values)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert summary["median"] == 499_999.5
+    # One more array of doubles for the sorted copy, and one run of floats at a time;
+    # a sorted list would take about 4 times the array
+    assert peak < 1.5 * len(values) * 8
+
+
+@pytest.mark.parametrize("binary_format, values", [
+    ("int32", [5, -3, 7, 0, 2, 9, -8]),
+    ("float32", [1.5, float("nan"), 2.5, float("inf"), 3.5, -0.5, float("nan")]),
+    ("float64", [1.5, float("nan"), 2.5, float("inf"), 3.5, -0.5, float("nan")]),
+])
+def test_binary_files_are_read_in_chunks(tmp_path, monkeypatch, binary_format, values):
+    monkeypatch.setattr(numeric_stats, "BINARY_CHUNK", 8)
+    typecode = numeric_stats.BINARY_FORMATS[binary_format]
+    path = tmp_path / "values.bin"
+    path.write_bytes(numeric_stats.array(typecode, values).tobytes() + b"\x01")   # And a stray byte
+    loaded, skipped = numeric_stats.load_file(str(path), binary_format=binary_format)
+    finite = [value for value in values if math.isfinite(value)]
+    assert (list(loaded), skipped) == (finite, len(values) - len(finite))
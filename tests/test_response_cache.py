@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration
+
+import response_cache
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = response_cache.ToolResultCache(max_size=2)
+    calls = []
+
+    @cache.memoize
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(1), square(2), square(1)] == [1, 4, 1]
+    # 2 is now the least recently used, so it goes when 3 comes in
+    assert square(3) == 9
+    assert [square(1), square(2)] == [1, 4]
+    assert calls == [1, 2, 3, 2]
+    assert len(cache.entries) == 2
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_key_covers_every_argument():
+    cache = response_cache.ToolResultCache()
+    calls = []
+
+    @cache.memoize
+    def join(a, b="-", *rest, upper=False):
+        calls.append((a, b, rest, upper))
+        text = b.join((a, *rest))
+        return text.upper() if upper else text
+
+    @cache.memoize
+    def other(a, b="-", *rest, upper=False):
+        return "other"
+
+    assert join("x", ",", "y") == "x,y"
+    assert join("x", ";", "y") == "x;y"
+    assert join("x", ",", "z") == "x,z"
+    assert join("x", ",", "y", upper=True) == "X,Y"
+    assert join(a="x", b=",") == "x"
+    assert join("x", ",") == "x"
+    # Same arguments on another function are a separate entry
+    assert other("x", ",", "y") == "other"
+    assert len(calls) == 6
+    assert join("x", ",", "y") == "x,y"
+    assert len(calls) == 6
+
+    cache.clear()
+    assert join("x", ",", "y") == "x,y"
+    assert len(calls) == 7
+
+
+def _prompt(text, message_id):
+    return dumps([HumanMessage(text, id=message_id)])
+
+
+def _answer(text):
+    return [ChatGeneration(message=AIMessage(text))]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite")
+
+
+def test_disk_cache_persists_across_instances(cache_path):
+    first = response_cache.DiskLLMCache(cache_path)
+    assert first.lookup(_prompt("hello", "1"), "model-a") is None
+    first.update(_prompt("hello", "1"), "model-a", _answer("hi there"))
+    first.db.close()
+
+    second = response_cache.DiskLLMCache(cache_path)
+    # Message ids and spacing differ between runs, but the conversation is the same
+    cached = second.lookup(_prompt("hello ", "2"), "model-a")
+    assert [generation.message.content for generation in cached] == ["hi there"]
+    assert second.lookup(_prompt("hello", "1"), "model-b") is None
+    assert second.lookup(_prompt("goodbye", "1"), "model-a") is None
+    assert (second.hits, second.misses) == (1, 2)
+    second.db.close()
+
+
+def test_disk_cache_expires_and_evicts(cache_path, monkeypatch):
+    cache = response_cache.DiskLLMCache(cache_path, ttl=60, max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    for n, text in enumerate(["a", "b"]):
+        now[0] += 1
+        cache.update(_prompt(text, str(n)), "model", _answer(text))
+    now[0] += 1
+    assert cache.lookup(_prompt("a", "x"), "model") is not None
+    # "b" is the least recently used, so it makes room for "c"
+    now[0] += 1
+    cache.update(_prompt("c", "2"), "model", _answer("c"))
+    assert cache.lookup(_prompt("b", "x"), "model") is None
+    assert cache.lookup(_prompt("c", "x"), "model") is not None
+
+    now[0] += 61
+    assert cache.lookup(_prompt("c", "x"), "model") is None
+    cache.db.close()
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import scheduler
+
+
+class Clock:
+    """A virtual clock that only moves when told to."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def make_scheduler(tmp_path, clock):
+    made = []
+
+    def make(**kwargs):
+        timers = scheduler.Scheduler(str(tmp_path / "timers.journal"), clock=clock, fsync=False, **kwargs)
+        timers.load()
+        made.append(timers)
+        return timers
+
+    yield make
+    for timers in made:
+        timers.journal.close()
+
+
+def test_timers_fire_in_due_order_only_when_due(make_scheduler, clock):
+    fired = []
+    timers = make_scheduler(on_fire=lambda timer: fired.append(timer["message"]))
+    timers.add(clock.now + 60, "tea")
+    timers.add(clock.now + 10, "eggs")
+    timers.add(clock.now + 60, "toast")
+
+    assert timers.run_due() == []
+    clock.now += 10
+    timers.run_due()
+    assert fired == ["eggs"]
+    clock.now += 3600
+    timers.run_due()
+    # Timers due at the same time fire in the order they were set
+    assert fired == ["eggs", "tea", "toast"]
+    assert len(timers) == 0
+
+
+def test_cancelled_timers_never_fire(make_scheduler, clock):
+    timers = make_scheduler()
+    first = timers.add(clock.now + 5, "first")
+    timers.add(clock.now + 5, "second")
+    assert timers.cancel(first["id"])["message"] == "first"
+    assert timers.cancel(first["id"]) is None
+    clock.now += 5
+    assert [timer["message"] for timer in timers.run_due()] == ["second"]
+
+
+def test_callbacks_can_set_new_timers(make_scheduler, clock):
+    fired = []
+
+    def snooze(timer):
+        fired.append(timer["message"])
+        if len(fired) < 3:
+            timers.add(clock.now + 60, timer["message"])
+
+    timers = make_scheduler(on_fire=snooze)
+    timers.add(clock.now, "wake up")
+    for _ in range(5):
+        timers.run_due()
+        clock.now += 60
+    assert fired == ["wake up"] * 3
+
+
+def test_pending_timers_survive_a_restart(make_scheduler, clock):
+    timers = make_scheduler()
+    timers.add(clock.now + 30, "soon")
+    timers.add(clock.now + 7200, "later")
+    timers.cancel(timers.add(clock.now + 60, "cancelled")["id"])
+    timers.journal.close()
+
+    # Closed for an hour: the timer that came due meanwhile fires right away
+    clock.now += 3600
+    restarted = make_scheduler()
+    assert [timer["message"] for timer in restarted.pending()] == ["soon", "later"]
+    assert [timer["message"] for timer in restarted.run_due()] == ["soon"]
+    assert restarted.add(clock.now, "new")["id"] == 4
+
+
+def test_journal_is_compacted(make_scheduler, clock, monkeypatch):
+    monkeypatch.setattr(scheduler, "COMPACT_MIN_OPERATIONS", 10)
+    timers = make_scheduler()
+    for i in range(50):
+        timers.add(clock.now + i, f"timer {i}")
+    clock.now += 25
+    timers.run_due()
+    records, _ = timers.journal.read()
+    # 50 adds and 26 removals, but a snapshot replaced the older records
+    assert len(records) < 76
+    assert [timer["message"] for timer in timers.pending()] == [f"timer {i}" for i in range(26, 50)]
+
+
+def test_thread_fires_due_timers_and_sleeps_until_the_next(make_scheduler, clock):
+    fired = threading.Event()
+    timers = make_scheduler(on_fire=lambda timer: fired.set())
+    timers.add(clock.now + 3600, "later")
+    timers.start()
+    try:
+        # Added while the thread waits for the later timer: it is woken up for this one
+        timers.add(clock.now, "now")
+        assert fired.wait(5)
+        assert [timer["message"] for timer in timers.pending()] == ["later"]
+    finally:
+        timers.stop()
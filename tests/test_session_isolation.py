@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+import assistant_tools
+import scheduler
+import session
+import shell_jobs
+import state_store
+import todo_store
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Two server-style sessions with their own state namespaces, and private job and timer engines."""
+    store = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    jobs = shell_jobs.JobManager()
+    timers = scheduler.Scheduler(str(tmp_path / "timers.journal"), on_fire=session.announce_timer, fsync=False)
+    monkeypatch.setattr(session, "session_state", store)
+    monkeypatch.setattr(assistant_tools, "shell_job_manager", jobs)
+    monkeypatch.setattr(assistant_tools, "timer_scheduler", timers)
+    memories = {}
+    for name in ("alice", "bob"):
+        state = store.namespace(f"session:{name}")
+        todo_list = todo_store.TodoStore(str(tmp_path / f"{name}.journal"), str(tmp_path / f"{name}.json"),
+                                         fsync=False, state=state)
+        todo_list.load()
+        memories[name] = session.new_session_memory(todo_list, state)
+    yield memories, timers
+    jobs.shutdown()
+    store.close()
+
+
+def _as(memory, tool, **args):
+    with session.session_memory.use(memory):
+        return tool.invoke(args)
+
+
+def test_shell_jobs_are_private(sessions):
+    memories, _ = sessions
+    jobs = assistant_tools.shell_job_manager
+    started = _as(memories["alice"], assistant_tools.start_background_command, command="sleep 5")
+    job_id = int(started.split("#")[1].split(":")[0])
+    while jobs.jobs[job_id].status == "starting":
+        time.sleep(0.01)
+
+    assert "sleep 5" in _as(memories["alice"], assistant_tools.list_background_commands)
+    assert _as(memories["bob"], assistant_tools.list_background_commands) == "No background jobs have been started."
+    assert "no background job" in _as(memories["bob"], assistant_tools.check_background_command, job_id=job_id)
+    assert "no background job" in _as(memories["bob"], assistant_tools.cancel_background_command, job_id=job_id)
+    assert "still running" in _as(memories["alice"], assistant_tools.check_background_command, job_id=job_id)
+    assert "stopped" in _as(memories["alice"], assistant_tools.cancel_background_command, job_id=job_id)
+
+
+def test_timers_are_private(sessions):
+    memories, timers = sessions
+    set_result = _as(memories["alice"], assistant_tools.countdown_timer, seconds=600, label="tea")
+    timer_id = int(set_result.split("#")[1].split(" ")[0])
+
+    assert "tea" in _as(memories["alice"], assistant_tools.list_timers)
+    assert _as(memories["bob"], assistant_tools.list_timers) == "There are no pending timers or reminders."
+    assert "no pending timer" in _as(memories["bob"], assistant_tools.cancel_timer, timer_id=timer_id)
+    assert len(timers) == 1
+    assert "Cancelled" in _as(memories["alice"], assistant_tools.cancel_timer, timer_id=timer_id)
+
+
+def test_reminder_checks_the_owning_sessions_to_do(sessions, capsys):
+    memories, timers = sessions
+    memories["alice"]["todo_list"].add("file taxes")
+    memories["alice"]["todo_list"].complete(1)
+    memories["bob"]["todo_list"].add("buy milk")
+    for name in ("alice", "bob"):
+        _as(memories[name], assistant_tools.set_reminder, in_minutes=1, todo_id=1)
+
+    # Fired on the scheduler thread, where no session is current
+    timers.run_due(now=timers.clock() + 120)
+    shown = capsys.readouterr().out
+    assert "buy milk" in shown
+    assert "file taxes" not in shown
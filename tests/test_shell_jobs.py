@@ -0,0 +1,60 @@
+import datetime
+import time
+
+import pytest
+
+import shell_jobs
+
+
+@pytest.fixture
+def jobs():
+    manager = shell_jobs.JobManager()
+    yield manager
+    manager.shutdown()
+
+
+def test_output_and_exit_code(jobs):
+    job = jobs.start("echo out; echo err >&2; exit 3", timeout=10)
+    assert jobs.wait(job, 10)
+    assert (job.status, job.returncode) == ("finished", 3)
+    assert job.take_new_output(100) == ("out\n", "err\n")
+    assert job.take_new_output(100) == ("", "")
+
+
+def test_timeout_stops_the_command(jobs):
+    job = jobs.start("sleep 30", timeout=0.2)
+    assert jobs.wait(job, 5)
+    assert job.status == "timed out"
+
+
+@pytest.mark.parametrize("delay", [0, 0.2])
+def test_cancel_is_quick_even_while_starting(jobs, delay):
+    job = jobs.start("sleep 30", timeout=60)
+    time.sleep(delay)
+    started = time.perf_counter()
+    jobs.cancel(job.id)
+    assert jobs.wait(job, 5)
+    assert job.status == "cancelled"
+    assert time.perf_counter() - started < 2
+
+
+def test_only_the_newest_finished_jobs_are_kept(jobs, monkeypatch):
+    monkeypatch.setattr(shell_jobs, "MAX_FINISHED_JOBS", 2)
+    running = jobs.start("sleep 30", timeout=60, owner="a")
+    other = jobs.start("true", timeout=10, owner="b")
+    finished = []
+    for _ in range(4):
+        finished.append(jobs.start("true", timeout=10, owner="a"))
+        assert jobs.wait(finished[-1], 10)
+    jobs.start("true", timeout=10, owner="a")
+    # The two oldest finished jobs of session a are gone; its running job and session b's are kept
+    assert [job.id for job in jobs.owned("a")][:3] == [running.id, finished[2].id, finished[3].id]
+    assert jobs.get(finished[0].id) is None and jobs.get(other.id, owner="b") is other
+
+
+def test_finished_jobs_expire(jobs):
+    old = jobs.start("true", timeout=10)
+    assert jobs.wait(old, 10)
+    old.ended -= datetime.timedelta(seconds=shell_jobs.FINISHED_JOB_TTL + 1)
+    recent = jobs.start("true", timeout=10)
+    assert jobs.get(old.id) is None and jobs.get(recent.id) is recent
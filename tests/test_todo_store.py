@@ -0,0 +1,174 @@
+import pytest
+
+import state_store
+import todo_store
+
+TASKS = ["walk the dog", "buy milk", "call mom", "answer mail", "book flights", "Ärzte anrufen"]
+
+
+@pytest.fixture(params=["journal", "state"])
+def make_store(request, tmp_path):
+    """Makes to-do stores saved to a journal, or to the session state store."""
+    stores = []
+    state = state_store.StateStore(str(tmp_path / "state.sqlite")) if request.param == "state" else None
+
+    def make():
+        store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"), fsync=False,
+                                     state=state.namespace("user:test") if state else None)
+        store.load()
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+    if state is not None:
+        state.close()
+
+
+@pytest.fixture
+def todos(make_store):
+    store = make_store()
+    for task in TASKS:
+        store.add(task)
+    return store
+
+
+def _all_pages(store, **query):
+    seen, cursor = [], ""
+    while True:
+        page, total, cursor = store.query(cursor=cursor, limit=2, **query)
+        seen += [item["id"] for item in page]
+        if not cursor:
+            return seen, total
+
+
+def test_changes_are_saved(make_store):
+    store = make_store()
+    first, second, third = (store.add(task) for task in TASKS[:3])
+    assert store.complete(second["id"])["completed"]
+    assert store.delete(first["id"])["task"] == TASKS[0]
+    assert store.complete(99) is None and store.delete(99) is None
+
+    reopened = make_store()
+    assert len(reopened) == 2
+    assert reopened.get(first["id"]) is None
+    assert reopened.get(second["id"])["completed"] and not reopened.get(third["id"])["completed"]
+    assert reopened.add("new")["id"] == 4     # IDs are never reused
+    assert reopened.clear() == 3 and len(make_store()) == 0
+
+
+@pytest.mark.parametrize("sort_by", todo_store.SORT_FIELDS)
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_cover_every_item_once(todos, sort_by, descending):
+    todos.complete(3)
+    seen, total = _all_pages(todos, sort_by=sort_by, descending=descending)
+    assert total == len(TASKS)
+    assert sorted(seen) == list(range(1, len(TASKS) + 1))
+
+
+def test_sort_order(todos):
+    page, _, _ = todos.query(sort_by="task", limit=10)
+    assert [item["task"] for item in page] == sorted(TASKS, key=str.lower)
+    page, _, _ = todos.query(sort_by="id", descending=True, limit=3)
+    assert [item["id"] for item in page] == [6, 5, 4]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"search": "mail"}, [4]),
+    ({"search": "ca mo"}, [3]),           # Parts of words, every word must match
+    ({"search": "ÄRZTE"}, [6]),
+    ({"search": "nothing"}, []),
+    ({"status": "completed"}, [2]),
+    ({"status": "open", "search": "b"}, [5]),
+])
+def test_filters(todos, query, expected):
+    todos.complete(2)
+    page, total, _ = todos.query(**query)
+    assert [item["id"] for item in page] == expected and total == len(expected)
+
+
+def test_cursor_from_another_sort_order_is_rejected(todos):
+    _, _, cursor = todos.query(sort_by="id", limit=2)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        todos.query(sort_by="task", cursor=cursor)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        todos.query(sort_by="id", descending=True, cursor=cursor)
+
+
+@pytest.mark.parametrize("cursor", ["[2, 2]", "not json", '{"after": 3}',
+                                    '{"sort_by": "task", "descending": false, "after": [2, 2]}'])
+def test_malformed_cursor_is_rejected(todos, cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        todos.query(sort_by="task", cursor=cursor)
+
+
+def test_state_store_list_is_not_loaded_into_memory(tmp_path):
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"),
+                                 state=state.namespace("user:test"))
+    store.load()
+    for i in range(500):
+        store.add(f"task {i}")
+    state.close()
+
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"),
+                                 state=state.namespace("user:test"))
+    assert store.load() == 500
+    assert store.items == {} and state.cache.get("user:test", {}).keys() <= {"todo_imported"}
+    assert store.get(250)["task"] == "task 249"
+    page, total, _ = store.query(search="task 49", limit=5)
+    assert total == 15 and [item["id"] for item in page] == [50, 150, 250, 350, 450]
+    state.close()
+
+
+def test_counting_the_state_store_list_does_not_flush(tmp_path):
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"),
+                                 state=state.namespace("user:test"))
+    store.load()
+    flushes = state.flushes
+    for i in range(1, 51):
+        store.add(f"task {i}")
+        assert len(store) == i
+    store.complete(3)
+    store.delete(4)
+    store.delete(4)
+    assert len(store) == 49 and state.flushes == flushes
+    # The kept count agrees with the file
+    state.flush()
+    assert state.db.execute("SELECT count(*) FROM state WHERE key LIKE 'todo:%'").fetchone()[0] == 49
+    state.close()
+
+
+def test_state_store_word_index_follows_changes(tmp_path):
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"),
+                                 state=state.namespace("user:test"))
+    store.load()
+    for task in TASKS:
+        store.add(task)
+    store.delete(2)
+    store.complete(5)
+    assert store.query(search="mil")[1] == 0
+    assert [item["id"] for item in store.query(search="fli")[0]] == [5]
+    vocabulary = {row[0] for row in state.db.execute("SELECT word FROM state_vocabulary")}
+    assert "book" in vocabulary and "milk" not in vocabulary
+    state.close()
+
+
+def test_items_saved_before_the_word_index_are_indexed(tmp_path):
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    saved = state.namespace("user:test")
+    for item_id, task in enumerate(TASKS, 1):
+        saved[f"todo:{item_id}"] = {"id": item_id, "task": task, "added": "2025-01-01 10:00", "completed": False}
+    saved["todo_imported"] = True
+    state.close()
+
+    state = state_store.StateStore(str(tmp_path / "state.sqlite"))
+    store = todo_store.TodoStore(str(tmp_path / "todo.journal"), str(tmp_path / "todo.json"),
+                                 state=state.namespace("user:test"))
+    assert store.load() == len(TASKS)
+    assert [item["id"] for item in store.query(search="ÄRZTE")[0]] == [6]
+    state.close()
@@ -0,0 +1,390 @@
+import datetime
+import json
+import os
+import re
+import threading
+
+from persistence import Journal
+
+# =========================================================================
+# TO-DO STORE
+# Items live in a dict keyed by a stable ID, and every change is appended
+# to a journal file instead of rewriting the whole list. The journal is
+# compacted into a single snapshot record once it has grown enough.
+# Given a namespace of the session state store instead, each item is saved
+# there under its own key, and the journal is only read once to import it.
+# =========================================================================
+
+JOURNAL_PATH = "todo_list.journal"
+LEGACY_PATH = "todo_list.json"     # Format used before the journal existed
+COMPACT_MIN_OPERATIONS = 1000      # Never compact more often than this
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+STATUSES = ("all", "open", "completed")
+SORT_FIELDS = ("id", "added", "task", "completed_at")
+
+# How the saved items are sorted and filtered in SQLite; the indexes below
+# are made of these very expressions, so queries can use them
+ITEM_ID = "json_extract(value, '$.id')"
+ITEM_ADDED = "coalesce(json_extract(value, '$.added'), '')"
+ITEM_COMPLETED = "json_extract(value, '$.completed')"
+SAVED_INDEXES = {
+    "todo_by_id": (ITEM_ID,),
+    "todo_by_added": (ITEM_ADDED, ITEM_ID),
+    "todo_by_status": (ITEM_COMPLETED, ITEM_ID),
+}
+
+
+def _words(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def saved_item(state, item_id):
+    """Reads one item straight from a session's StateView, without loading its list."""
+    return state.get(f"todo:{item_id}")
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+
+class TodoStore:
+    """A persistent to-do list with O(1) access to items by ID."""
+
+    def __init__(self, path=JOURNAL_PATH, legacy_path=LEGACY_PATH, fsync=True, state=None):
+        self.journal = Journal(path, fsync=fsync)
+        self.legacy_path = legacy_path
+        self.state = state        # A StateView to save to instead of the journal
+        self.saved = state.view("todo:") if state is not None else None
+        if self.saved is not None:
+            for name, expressions in SAVED_INDEXES.items():
+                self.saved.create_index(name, *expressions)
+            self.saved.index_words("task", _words)
+        self.items = {}           # item ID -> item, in the order they were added (journal only)
+        self._next_id = 1
+        self.operations = 0       # Journal records written since the last compaction
+        self.index = {}           # word -> IDs of the items whose task contains it (journal only)
+        self.lock = threading.Lock()
+
+    # With a state store nothing is kept in memory: items are read by key,
+    # and queries run in SQLite on its indexes (see _query_saved)
+
+    @property
+    def next_id(self):
+        if self.state is not None:
+            return self.state.get("todo_next_id", 1)
+        return self._next_id
+
+    @next_id.setter
+    def next_id(self, value):
+        if self.state is not None:
+            self.state["todo_next_id"] = value
+        else:
+            self._next_id = value
+
+    def __len__(self):
+        return len(self.saved) if self.state is not None else len(self.items)
+
+    def __iter__(self):
+        if self.state is not None:
+            return iter(sorted(self.saved.values(), key=lambda item: item["id"]))
+        return iter(list(self.items.values()))
+
+    def get(self, item_id):
+        if self.state is not None:
+            return self.saved.get(str(item_id))
+        return self.items.get(item_id)
+
+    # ---------------------------------------------------------------------
+    # Loading and compaction
+    # ---------------------------------------------------------------------
+
+    def load(self):
+        """Rebuilds the list from the journal, or imports it into the state store. Returns the item count."""
+        with self.lock:
+            self.items = {}
+            self.index = {}
+            if self.state is None:
+                self.next_id = 1
+                return self._load_journal()
+            if not self.state.get("todo_imported"):
+                # First start with the state store: bring over the journal (or the old JSON file)
+                self.next_id = 1
+                self._load_journal()
+                self._save_all()
+                self.state["todo_imported"] = True
+                self.items = {}
+                self.index = {}
+            return len(self.saved)
+
+    def _load_journal(self):
+        records, damaged = self.journal.read()
+        if not records and not os.path.exists(self.journal.path) and os.path.exists(self.legacy_path):
+            self._import_legacy()
+            return len(self.items)
+        for record in records:
+            self._apply(record)
+        self.operations = len(records)
+        if damaged:
+            # Cut off the half-written record left by a crash
+            self._compact()
+        return len(self.items)
+
+    def _import_legacy(self):
+        with open(self.legacy_path, "r") as f:
+            for item in json.load(f):
+                item = dict(item, id=self.next_id)
+                self.items[item["id"]] = item
+                self._index_item(item)
+                self.next_id += 1
+        self._compact()
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "snapshot":
+            self.items = {item["id"]: item for item in record["items"]}
+            self.next_id = record["next_id"]
+            self._rebuild_index()
+        elif op == "add":
+            item = record["item"]
+            self.items[item["id"]] = item
+            self.next_id = max(self.next_id, item["id"] + 1)
+            self._index_item(item)
+        elif op == "update":
+            if record["id"] in self.items:
+                self.items[record["id"]].update(record["fields"])
+        elif op == "delete":
+            item = self.items.pop(record["id"], None)
+            if item is not None:
+                self._unindex_item(item)
+
+    def _index_item(self, item):
+        for word in _words(item["task"]):
+            self.index.setdefault(word, set()).add(item["id"])
+
+    def _unindex_item(self, item):
+        for word in _words(item["task"]):
+            ids = self.index.get(word)
+            if ids is not None:
+                ids.discard(item["id"])
+                if not ids:
+                    del self.index[word]
+
+    def _rebuild_index(self):
+        self.index = {}
+        for item in self.items.values():
+            self._index_item(item)
+
+    def _write(self, record):
+        if self.state is not None:
+            self._save(record)
+            return
+        self._apply(record)
+        self.journal.append(record)
+        self.operations += 1
+        if self.operations >= max(COMPACT_MIN_OPERATIONS, 2 * len(self.items)):
+            self._compact()
+
+    def _save(self, record):
+        """Applies a record to the items in the state store (written behind, in batches)."""
+        op = record["op"]
+        if op == "add":
+            item = record["item"]
+            self.saved[str(item["id"])] = item
+            self.next_id = max(self.next_id, item["id"] + 1)
+        elif op == "update":
+            key = str(record["id"])
+            self.saved[key] = {**self.saved[key], **record["fields"]}
+        elif op == "delete":
+            self.saved.pop(str(record["id"]), None)
+
+    def _save_all(self):
+        for key in set(self.saved) - {str(item_id) for item_id in self.items}:
+            del self.saved[key]
+        for item in self.items.values():
+            self.saved[str(item["id"])] = item
+        self.state["todo_next_id"] = self.next_id
+
+    def _compact(self):
+        if self.state is not None:
+            self._save_all()
+            return
+        self.journal.rewrite([{"op": "snapshot", "next_id": self.next_id, "items": list(self.items.values())}])
+        self.operations = 1
+
+    def compact(self):
+        """Rewrites the journal as a single snapshot, or saves pending changes to the state store."""
+        with self.lock:
+            if self.state is not None:
+                self.state.store.flush()
+                return
+            self._compact()
+
+    def close(self):
+        self.journal.close()
+
+    # ---------------------------------------------------------------------
+    # Changes
+    # ---------------------------------------------------------------------
+
+    def add(self, task):
+        """Adds a task and returns the new item."""
+        with self.lock:
+            item = {"id": self.next_id, "task": task, "added": _now(), "completed": False}
+            self._write({"op": "add", "item": item})
+            return item
+
+    def complete(self, item_id):
+        """Marks an item as completed. Returns the item, or None if the ID is unknown."""
+        with self.lock:
+            if self.get(item_id) is None:
+                return None
+            self._write({"op": "update", "id": item_id, "fields": {"completed": True, "completed_at": _now()}})
+            return self.get(item_id)
+
+    def delete(self, item_id):
+        """Removes an item. Returns the removed item, or None if the ID is unknown."""
+        with self.lock:
+            item = self.get(item_id)
+            if item is None:
+                return None
+            self._write({"op": "delete", "id": item_id})
+            return item
+
+    def clear(self):
+        """Removes every item and returns how many there were."""
+        with self.lock:
+            count = len(self)
+            self.items = {}
+            self.index = {}
+            self._compact()
+            return count
+
+    # ---------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------
+
+    def _search(self, text):
+        """Returns the IDs of items whose task contains every word of text.
+
+        Each query word may be part of a longer word ("rep" finds "report"),
+        so it is matched against the index vocabulary rather than the items.
+        """
+        result = None
+        for term in _words(text):
+            matches = set(self.index.get(term, ()))
+            for word, ids in self.index.items():
+                if term in word:
+                    matches |= ids
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result if result is not None else set(self.items)
+
+    def query(self, status="all", search="", added_from="", added_to="", sort_by="id",
+              descending=False, cursor="", limit=DEFAULT_PAGE_SIZE):
+        """Returns one page of matching items as (items, total_matches, next_cursor).
+
+        Dates are compared as text, so added_to="2025-01-31" includes the whole day.
+        The cursor is the opaque value returned by the previous page; it stays
+        valid even when items are added or deleted between calls, but only with
+        the same sort_by and descending (ValueError otherwise).
+        """
+        if status not in STATUSES:
+            raise ValueError(f"Status must be one of {', '.join(STATUSES)}.")
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Sorting is possible by {', '.join(SORT_FIELDS)}.")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = _parse_cursor(cursor, sort_by, descending) if cursor else None
+
+        with self.lock:
+            query = self._query_saved if self.state is not None else self._query_items
+            # One item more than the page, to know whether another page follows
+            page, total = query(status, search, added_from, added_to, sort_by, descending, after, limit + 1)
+
+        next_cursor = ""
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = json.dumps({"sort_by": sort_by, "descending": descending,
+                                      "after": list(_sort_key(page[-1], sort_by))})
+        return page, total, next_cursor
+
+    def _query_items(self, status, search, added_from, added_to, sort_by, descending, after, limit):
+        ids = self._search(search) if search.strip() else self.items.keys()
+        matches = []
+        for item_id in ids:
+            item = self.items[item_id]
+            if status == "open" and item["completed"]:
+                continue
+            if status == "completed" and not item["completed"]:
+                continue
+            if added_from and item["added"] < added_from:
+                continue
+            if added_to and item["added"][:len(added_to)] > added_to:
+                continue
+            matches.append(item)
+
+        matches.sort(key=lambda item: _sort_key(item, sort_by), reverse=descending)
+        total = len(matches)
+        if after is not None:
+            if descending:
+                matches = [item for item in matches if _sort_key(item, sort_by) < after]
+            else:
+                matches = [item for item in matches if _sort_key(item, sort_by) > after]
+        return matches[:limit], total
+
+    def _query_saved(self, status, search, added_from, added_to, sort_by, descending, after, limit):
+        """The same query as _query_items, run by SQLite on the saved items."""
+        conditions, params = [], []
+        if status != "all":
+            conditions.append(f"{ITEM_COMPLETED} = ?")
+            params.append(status == "completed")
+        if added_from:
+            conditions.append(f"{ITEM_ADDED} >= ?")
+            params.append(added_from)
+        if added_to:
+            # The same as comparing the first len(added_to) characters, but it can use the index
+            conditions.append(f"{ITEM_ADDED} < ?")
+            params.append(added_to + "\U0010ffff")
+        # Each query word is looked up in the word index, like _search does
+        words = sorted(_words(search))
+        total = self.saved.count(" AND ".join(conditions), params, words)
+
+        # Sorted like _sort_key: by the field (lower case, missing as ""), then by ID.
+        # Dates have nothing to lower, so only tasks need unicode_lower and a sort.
+        if sort_by == "id":
+            field = ITEM_ID
+        elif sort_by == "added":
+            field = ITEM_ADDED
+        elif sort_by == "completed_at":
+            field = "coalesce(json_extract(value, '$.completed_at'), '')"
+        else:
+            field = "coalesce(unicode_lower(json_extract(value, '$.task')), '')"
+        if after is not None:
+            conditions.append(f"({field}, {ITEM_ID}) {'<' if descending else '>'} (?, ?)")
+            params += after
+        direction = " DESC" if descending else ""
+        order_by = f"{field}{direction}" if field == ITEM_ID else f"{field}{direction}, {ITEM_ID}{direction}"
+        page = self.saved.select(" AND ".join(conditions), params, order_by, limit, words)
+        return page, total
+
+
+def _sort_key(item, sort_by):
+    value = item.get(sort_by) or ""
+    return (value.lower() if isinstance(value, str) else value, item["id"])
+
+
+def _parse_cursor(cursor, sort_by, descending):
+    """Returns the sort key a cursor points after, checking it was made for this sort order."""
+    try:
+        fields = json.loads(cursor)
+        value, item_id = fields["after"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor.")
+    # Keys of another sort order cannot be compared with this one's (e.g. ids with task names)
+    value_type = int if sort_by == "id" else str
+    if (fields.get("sort_by") != sort_by or fields.get("descending") != bool(descending)
+            or type(value) is not value_type or type(item_id) is not int):
+        raise ValueError("Invalid cursor.")
+    return (value, item_id)
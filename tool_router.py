@@ -0,0 +1,136 @@
+import json
+import re
+import threading
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# =========================================================================
+# TOOL ROUTER
+# Binding every tool to every model call sends all of their JSON schemas
+# each turn, even for "tell me a joke". The router looks at the latest
+# user message (and the tools used just before it) and binds only the
+# tool groups that look relevant. Groups are matched through a keyword
+# index built from each tool's name and docstring plus the hints below.
+# =========================================================================
+
+# Extra words that point to a group but do not appear in its docstrings
+GROUP_KEYWORDS = {
+    "math": "calculate compute math plus minus times multiplied divided sum difference product "
+            "quotient square root power exponent logarithm sine cosine tangent angle radians "
+            "degrees formula equation percent",
+    "general": "grade grades score scores marks average mean median statistics stats deviation percentile "
+               "histogram csv column dataset data prime primes numbers factor factors divisor divisors composite",
+    "files": "file folder directory read write open copy move delete remove create size lines "
+             "tail grep search text content path log logs largest biggest changed modified find index",
+    "system": "system computer platform disk space storage date time today clock machine",
+    "process": "run shell command terminal execute script build install job background timer "
+               "countdown remind reminder alarm minutes notes note organize tidy extension",
+    "memory": "remember name call yourself todo task tasks done complete finish preference prefer "
+              "favorite forget",
+    "fun": "joke funny laugh advice tip quote motivation motivate inspire dice roll random bored",
+}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "from", "that", "this", "into", "are", "was", "its", "it's",
+    "can", "use", "used", "uses", "all", "any", "one", "two", "per", "via", "like", "given",
+    "specified", "returns", "return", "shows", "show", "gets", "get", "information", "also",
+    "more", "most", "each", "than", "then", "when", "what", "which", "their", "there", "your",
+    "you", "please", "about", "some", "list",
+}
+
+# Arithmetic written out in the message, like "17*23" or "4 ^ 2"
+MATH_PATTERN = re.compile(r"\d\s*[-+*/^%]\s*\d")
+PREFIX_LENGTH = 5            # "reminders" matches "remind", "files" matches "file"
+RECENT_MESSAGES = 6          # How far back earlier tool use keeps a group selected
+
+
+def _words(text):
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+class ToolRouter:
+    """Chooses which tool groups to bind for each model call, and counts the tokens saved."""
+
+    def __init__(self, tool_groups):
+        self.tool_groups = tool_groups
+        self.group_of_tool = {tool.name: group for group, tools in tool_groups.items() for tool in tools}
+
+        # Inverted index: word (and word prefix) -> groups it points to
+        self.index = {}
+        for group, tools in tool_groups.items():
+            text = GROUP_KEYWORDS.get(group, "")
+            for tool in tools:
+                text += f" {tool.name.replace('_', ' ')} {tool.description}"
+            for word in _words(text):
+                self.index.setdefault(word, set()).add(group)
+                if len(word) >= PREFIX_LENGTH:
+                    self.index.setdefault(word[:PREFIX_LENGTH], set()).add(group)
+
+        # Rough size of each tool's schema in the prompt (4 characters per token)
+        self.schema_tokens = {
+            tool.name: len(json.dumps(convert_to_openai_tool(tool))) // 4
+            for tools in tool_groups.values() for tool in tools
+        }
+        self.all_tools_tokens = sum(self.schema_tokens.values())
+
+        self.calls = 0
+        self.tokens_sent = 0
+        self.lock = threading.Lock()
+
+    def select_groups(self, messages):
+        """Returns the names of the groups relevant to the latest user message."""
+        groups = set()
+        last_human = None
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].type == "human":
+                last_human = i
+                break
+        if last_human is None:
+            return set(self.tool_groups)
+
+        text = _message_text(messages[last_human])
+        for word in _words(text):
+            groups |= self.index.get(word, set())
+            if len(word) >= PREFIX_LENGTH:
+                groups |= self.index.get(word[:PREFIX_LENGTH], set())
+        if MATH_PATTERN.search(text):
+            groups.add("math")
+
+        # Follow-ups like "do it again" need the tools that were just used
+        for message in messages[max(0, last_human - RECENT_MESSAGES):]:
+            for call in getattr(message, "tool_calls", None) or []:
+                if call["name"] in self.group_of_tool:
+                    groups.add(self.group_of_tool[call["name"]])
+        return groups
+
+    def bind(self, model):
+        """Returns a create_react_agent model callable that binds only the selected tools."""
+        bound_models = {}
+
+        def select_model(state, runtime):
+            groups = frozenset(self.select_groups(state["messages"]))
+            tools = [tool for group in self.tool_groups if group in groups for tool in self.tool_groups[group]]
+            with self.lock:
+                if groups not in bound_models:
+                    bound_models[groups] = model.bind_tools(tools) if tools else model
+                self.calls += 1
+                self.tokens_sent += sum(self.schema_tokens[tool.name] for tool in tools)
+                return bound_models[groups]
+
+        return select_model
+
+    def summary(self):
+        """Describes how many schema tokens routing saved so far."""
+        if not self.calls:
+            return "Tool routing: no model calls yet."
+        saved = self.calls * self.all_tools_tokens - self.tokens_sent
+        average = self.tokens_sent / self.calls
+        return (f"Tool routing: {self.calls} model calls sent on average {average:.0f} of "
+                f"{self.all_tools_tokens} tool schema tokens, saving about {saved} tokens.")
@@ -0,0 +1,301 @@
+import contextvars
+import os
+import secrets
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+import file_index
+from persistence import Journal
+
+# =========================================================================
+# TRACING
+# Times every turn, model call and tool call as a span and keeps recent
+# durations for the /stats command. The spans come from LangChain
+# callbacks, so tools and models need no changes; tools only report extra
+# counters (like bytes read) through count(). With TRACE=export each turn
+# is also appended to traces.jsonl as one OTLP/JSON line, which the
+# OpenTelemetry collector's otlpjsonfile receiver can read. When tracing
+# is off no callback is attached at all and count() returns at once.
+#
+# Only the standard library is imported at the top, because file_reader
+# reports its counters here and is loaded before LangChain is.
+# =========================================================================
+
+MODES = ("off", "stats", "export")
+TRACE_PATH = "traces.jsonl"
+STATS_SAMPLES = 1000              # Recent durations kept per span name
+SERVICE_NAME = "ai-assistant"
+
+# The span of the tool that is running in this context, for count()
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def count(name, amount):
+    """Adds amount to a counter of the running tool's span (a no-op when tracing is off)."""
+    span = _current_span.get()
+    if span is not None:
+        span.counters[name] = span.counters.get(name, 0) + amount
+
+
+class Span:
+    """One timed operation: a turn, a model call or a tool call."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "kind", "name", "started", "start_ns", "end_ns",
+                 "attributes", "counters", "error", "first_token")
+
+    def __init__(self, kind, name, parent=None):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.counters = {}
+        self.error = None
+        self.first_token = None     # Seconds until the first streamed token (model calls)
+
+    def seconds(self):
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self):
+        attributes = [{"key": "assistant.span.kind", "value": {"stringValue": self.kind}}]
+        for key, value in {**self.attributes, **self.counters}.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                attributes.append({"key": key, "value": {"stringValue": str(value)}})
+            elif isinstance(value, int):
+                attributes.append({"key": key, "value": {"intValue": str(value)}})
+            else:
+                attributes.append({"key": key, "value": {"doubleValue": value}})
+        span = {
+            "traceId": self.trace_id, "spanId": self.span_id, "name": self.name,
+            "kind": 3 if self.kind == "model" else 1,     # SPAN_KIND_CLIENT for API calls, else INTERNAL
+            "startTimeUnixNano": str(self.start_ns), "endTimeUnixNano": str(self.end_ns),
+            "attributes": attributes,
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, int(percent / 100 * len(sorted_values)))]
+
+
+def _format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+class Tracer:
+    """Collects spans for turns, model calls and tool calls, and keeps latency statistics."""
+
+    def __init__(self, mode=None, path=None):
+        # None means "read TRACE / TRACE_PATH from the environment on first use",
+        # since this module is imported before main.py has loaded .env
+        self.mode = mode
+        self.path = path
+        self.journal = None
+        self.durations = defaultdict(lambda: deque(maxlen=STATS_SAMPLES))
+        self.totals = defaultdict(int)
+        self.runs = {}            # LangChain run ID -> its span, or the nearest traced ancestor's
+        self.open_spans = {}      # LangChain run ID -> span that still has to be finished
+        self.traces = {}          # trace ID -> finished spans of a turn still running
+        self.lock = threading.Lock()
+        self._handler = None
+
+    def _configure(self):
+        if self.mode is None:
+            mode = os.getenv("TRACE", "off").lower()
+            self.mode = mode if mode in MODES else "off"
+        if self.journal is None:
+            self.journal = Journal(self.path or os.getenv("TRACE_PATH", TRACE_PATH), fsync=False)
+
+    def set_mode(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"Unknown tracing mode {mode!r}; use one of {', '.join(MODES)}.")
+        self._configure()
+        self.mode = mode
+
+    def callbacks(self):
+        """The callbacks to pass in the agent's config: none at all when tracing is off."""
+        self._configure()
+        if self.mode == "off":
+            return []
+        if self._handler is None:
+            self._handler = _make_callback_handler(self)
+        return [self._handler]
+
+    # ---------------------------------------------------------------------
+    # Spans
+    # ---------------------------------------------------------------------
+
+    def start(self, run_id, parent_run_id, kind, name):
+        with self.lock:
+            parent = self.runs.get(parent_run_id)
+            if kind == "chain":
+                if parent_run_id is not None:
+                    # Graph nodes are not traced; their children hang off the turn
+                    self.runs[run_id] = parent
+                    return None
+                kind, name = "turn", "turn"
+            span = Span(kind, name, parent)
+            self.runs[run_id] = span
+            self.open_spans[run_id] = span
+            return span
+
+    def finish(self, run_id, error=None):
+        with self.lock:
+            span = self.open_spans.pop(run_id, None)
+            self.runs.pop(run_id, None)
+            if span is None:
+                return None
+            span.end_ns = time.time_ns()
+            if error is not None:
+                span.error = str(error) or type(error).__name__
+            seconds = span.seconds()
+
+            self.durations[span.kind if span.kind != "tool" else f"tool {span.name}"].append(seconds)
+            if span.first_token is not None:
+                self.durations["first token"].append(span.first_token)
+            for key, value in span.counters.items():
+                self.totals[key] += value
+            if span.kind == "model":
+                self.totals["model calls"] += 1
+                self.totals["input tokens"] += span.attributes.get("gen_ai.usage.input_tokens", 0)
+                self.totals["output tokens"] += span.attributes.get("gen_ai.usage.output_tokens", 0)
+
+            finished = self.traces.setdefault(span.trace_id, [])
+            finished.append(span)
+            if span.parent_id is not None:
+                return span
+            # The root span ends the trace
+            del self.traces[span.trace_id]
+            if span.kind == "turn":
+                span.attributes["assistant.model_calls"] = sum(1 for s in finished if s.kind == "model")
+                span.attributes["assistant.tool_calls"] = sum(1 for s in finished if s.kind == "tool")
+        if self.mode == "export":
+            self.journal.append({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [s.to_otlp() for s in finished]}],
+            }]})
+        return span
+
+    def first_token(self, run_id):
+        span = self.open_spans.get(run_id)
+        if span is not None and span.first_token is None:
+            span.first_token = time.perf_counter() - span.started
+
+    # ---------------------------------------------------------------------
+    # Statistics
+    # ---------------------------------------------------------------------
+
+    def report(self):
+        """Describes p50/p95 latency per turn, model call and tool, plus token and file counters."""
+        self._configure()
+        if self.mode == "off" and not self.durations:
+            return "Tracing is off. Type '/trace stats' (or set TRACE=stats in .env) to start collecting."
+        if not self.durations:
+            return "No turns traced yet."
+        with self.lock:
+            rows = [(name, sorted(samples)) for name, samples in self.durations.items()]
+            totals = dict(self.totals)
+        order = {"turn": 0, "model": 1, "first token": 2}
+        rows.sort(key=lambda row: (order.get(row[0], 3), row[0]))
+        width = max(len(name) for name, _ in rows) + 2
+        lines = [f"{'Latency':<{width}}{'p50':>10}{'p95':>10}{'count':>8}"]
+        for name, samples in rows:
+            lines.append(f"{name:<{width}}{_format_seconds(statistics.median(samples)):>10}"
+                         f"{_format_seconds(_percentile(samples, 95)):>10}{len(samples):>8}")
+        lines.append(f"Tokens: {totals.get('input tokens', 0):,} in, {totals.get('output tokens', 0):,} out "
+                     f"over {totals.get('model calls', 0)} model calls.")
+        lines.append(f"File I/O in tools: {file_index.format_size(totals.get('file_bytes_read', 0))} read, "
+                     f"{file_index.format_size(totals.get('file_bytes_written', 0))} written.")
+        if self.mode == "export":
+            lines.append(f"Spans are being written to {self.journal.path}.")
+        return "\n".join(lines)
+
+
+def _model_name(params):
+    params = params or {}
+    name = params.get("model") or params.get("model_name")
+    if name is None and isinstance(params.get("primary"), dict):
+        name = params["primary"].get("model")      # A ModelGateway
+    return str(name or params.get("_type", "model"))
+
+
+def _usage(response):
+    """Input and output tokens from an LLMResult, estimated at 4 characters a token when missing."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+            return None, len(generation.text) // 4
+    return None, 0
+
+
+def _make_callback_handler(tracer):
+    """Builds the LangChain callback handler that feeds tracer (LangChain is only imported here)."""
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.messages.utils import count_tokens_approximately
+
+    class TracingCallbackHandler(BaseCallbackHandler):
+        run_inline = True      # Called right where the event happens, so count() sees the tool's span
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+            tracer.start(run_id, parent_run_id, "chain", "")
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            tracer.finish(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            tracer.finish(run_id, error)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+            name = _model_name(kwargs.get("invocation_params"))
+            span = tracer.start(run_id, parent_run_id, "model", f"model {name}")
+            span.attributes["gen_ai.request.model"] = name
+            span.attributes["gen_ai.usage.input_tokens"] = count_tokens_approximately(messages[0])
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            tracer.first_token(run_id)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            span = tracer.open_spans.get(run_id)
+            if span is not None:
+                input_tokens, output_tokens = _usage(response)
+                if input_tokens is not None:
+                    span.attributes["gen_ai.usage.input_tokens"] = input_tokens
+                span.attributes["gen_ai.usage.output_tokens"] = output_tokens
+                if span.first_token is not None:
+                    span.attributes["assistant.time_to_first_token_ms"] = round(span.first_token * 1000, 1)
+            tracer.finish(run_id)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            tracer.finish(run_id, error)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+            name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+            span = tracer.start(run_id, parent_run_id, "tool", name)
+            span.attributes["gen_ai.tool.name"] = name
+            _current_span.set(span)
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            _current_span.set(None)
+            tracer.finish(run_id)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            _current_span.set(None)
+            tracer.finish(run_id, error)
+
+    return TracingCallbackHandler()
+
+
+# TRACE in .env: off (default), stats (in memory for /stats) or export (also to traces.jsonl)
+tracer = Tracer()